@@ -1,5 +1,7 @@
 import json
 import uuid
+import base64
+import hashlib
 from datetime import datetime, timedelta
 from pathlib import Path
 import random
@@ -61,6 +63,9 @@ AUTHORITY_EMAIL = os.getenv("AUTHORITY_USUARIO_CORREO", "autoridad@utec.edu.pe")
 AUTHORITY_PASSWORD = os.getenv("AUTHORITY_USUARIO_CONTRASENA", "autoridad123")
 
 USUARIOS_TOTAL = int(os.getenv("USUARIOS_TOTAL", "30"))
+# Costo scrypt de los datos de ejemplo (mínimo del servicio de usuarios; el
+# login los re-hashea con los parámetros calibrados de la Lambda).
+SEED_SCRYPT_N = 2 ** 14
 EMPLEADOS_TOTAL = int(os.getenv("EMPLEADOS_TOTAL", "50"))
 INCIDENTES_TOTAL = int(os.getenv("INCIDENTES_TOTAL", "20"))
 REGISTROS_TOTAL = int(os.getenv("REGISTROS_TOTAL", "10"))
@@ -85,6 +90,19 @@ def generar_telefono():
     return f"+51 9{random.randint(10000000, 99999999)}"
 
 
+def hashear_contrasena(contrasena):
+    """Mismo formato que Usuarios/CRUD/contrasenas.py: scrypt$n=..,r=..,p=..$sal$hash"""
+    sal = os.urandom(16)
+    derivada = hashlib.scrypt(
+        contrasena.encode("utf-8"), salt=sal, n=SEED_SCRYPT_N, r=8, p=1,
+        maxmem=128 * 8 * (SEED_SCRYPT_N + 1) + 2 * 1024 * 1024, dklen=32
+    )
+    return (
+        f"scrypt$n={SEED_SCRYPT_N},r=8,p=1"
+        f"${base64.b64encode(sal).decode('ascii')}${base64.b64encode(derivada).decode('ascii')}"
+    )
+
+
 def generar_usuarios(cantidad=None):
     usuarios = []
     roles_no_autoridad = ["estudiante", "personal_administrativo"]
@@ -130,6 +148,18 @@ def generar_usuarios(cantidad=None):
     return usuarios
 
 
+def proteger_contrasenas(usuarios):
+    """
+    Reemplaza las contraseñas en texto plano por su hash y devuelve las
+    credenciales de prueba (correo -> contraseña) por separado.
+    """
+    credenciales = []
+    for usuario in usuarios:
+        credenciales.append({"correo": usuario["correo"], "contrasena": usuario["contrasena"]})
+        usuario["contrasena"] = hashear_contrasena(usuario["contrasena"])
+    return credenciales
+
+
 def generar_empleados(cantidad=None):
     empleados = []
     cantidad = max(1, cantidad or EMPLEADOS_TOTAL)
@@ -331,8 +361,11 @@ def main():
     # Generar usuarios primero (son referenciados por otros)
     print("📊 Generando usuarios...")
     usuarios = generar_usuarios()
+    credenciales = proteger_contrasenas(usuarios)
     validar_con_esquema(usuarios, "usuarios")
     guardar_json(usuarios, "usuarios.json")
+    # Solo para pruebas manuales: no se carga en DynamoDB
+    guardar_json(credenciales, "credenciales.json")
     print()
     
     # Generar empleados
@@ -26,6 +26,15 @@ TABLE_INCIDENTES = os.getenv('TABLE_INCIDENTES')
 TABLE_EMPLEADOS = os.getenv('TABLE_EMPLEADOS')
 TABLE_LOGS = os.getenv('TABLE_LOGS')
 TABLE_CONEXIONES = os.getenv('TABLE_CONEXIONES')
+TABLE_METRICAS_LOGS = os.getenv('TABLE_METRICAS_LOGS')
+TABLE_RATE_LIMIT = os.getenv('TABLE_RATE_LIMIT')
+TABLE_REVOCACIONES = os.getenv('TABLE_REVOCACIONES')
+TABLE_BUSQUEDA = os.getenv('TABLE_BUSQUEDA')
+TABLE_TRABAJOS = os.getenv('TABLE_TRABAJOS')
+TABLE_CONTADORES = os.getenv('TABLE_CONTADORES')
+TABLE_SUSCRIPCIONES = os.getenv('TABLE_SUSCRIPCIONES')
+TABLE_COALESCENCIA = os.getenv('TABLE_COALESCENCIA')
+TABLE_BANDEJA = os.getenv('TABLE_BANDEJA')
 
 # Nombre del bucket
 S3_BUCKET_NAME = f"alerta-utec-data-{AWS_ACCOUNT_ID}"
@@ -285,6 +294,91 @@ def populate_table(filename, table_config):
         return False
 
 
+def populate_busqueda():
+    """Construye el índice de búsqueda a partir de usuarios.json y empleados.json"""
+    print(f"\n🔎 Indexando búsqueda: {TABLE_BUSQUEDA}")
+    if not table_exists(TABLE_BUSQUEDA):
+        print(f"   ⚠️  Tabla '{TABLE_BUSQUEDA}' no existe")
+        return False
+
+    # Se reutiliza el mismo módulo que mantienen los handlers de Usuarios
+    import sys
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Usuarios"))
+    from CRUD import busqueda
+
+    if not delete_all_items_from_table(TABLE_BUSQUEDA, "prefijo", "clave"):
+        print(f"   ❌ Error al limpiar la tabla")
+        return False
+
+    total = 0
+    errores = 0
+    for usuario in load_json_file("usuarios.json") or []:
+        total += 1
+        if not busqueda.reindexar("usuario", usuario["correo"], nuevo=busqueda.datos_usuario(usuario)):
+            errores += 1
+    for empleado in load_json_file("empleados.json") or []:
+        total += 1
+        if not busqueda.reindexar("empleado", empleado["empleado_id"], nuevo=busqueda.datos_empleado(empleado)):
+            errores += 1
+
+    print(f"   ✅ Entidades indexadas: {total - errores}")
+    if errores > 0:
+        print(f"   ⚠️  Errores: {errores}")
+    return errores == 0
+
+
+def populate_contadores():
+    """Inicializa los contadores de empleados por estado a partir de empleados.json"""
+    print(f"\n🔢 Inicializando contadores: {TABLE_CONTADORES}")
+    if not table_exists(TABLE_CONTADORES):
+        print(f"   ⚠️  Tabla '{TABLE_CONTADORES}' no existe")
+        return False
+
+    totales = {"activo": 0, "inactivo": 0}
+    for empleado in load_json_file("empleados.json") or []:
+        estado = empleado.get("estado")
+        if estado:
+            totales[estado] = totales.get(estado, 0) + 1
+
+    try:
+        table = dynamodb.Table(TABLE_CONTADORES)
+        for estado, valor in totales.items():
+            table.put_item(Item={"contador": f"empleados#{estado}", "valor": valor})
+            print(f"   ✅ empleados#{estado}: {valor}")
+        return True
+    except Exception as e:
+        print(f"   ❌ Error: {str(e)}")
+        return False
+
+
+def populate_cargas_empleados():
+    """Calcula incidentes_abiertos de cada empleado a partir de los incidentes en_progreso"""
+    print(f"\n👷 Calculando carga de empleados: {TABLE_EMPLEADOS}")
+    empleados = load_json_file("empleados.json") or []
+    incidentes = load_json_file("incidentes.json") or []
+
+    abiertos = {}
+    for incidente in incidentes:
+        if incidente.get("estado") == "en_progreso" and incidente.get("empleado_correo"):
+            correo = incidente["empleado_correo"]
+            abiertos[correo] = abiertos.get(correo, 0) + 1
+
+    try:
+        table = dynamodb.Table(TABLE_EMPLEADOS)
+        for empleado in empleados:
+            correo = (empleado.get("contacto") or {}).get("correo")
+            table.update_item(
+                Key={"empleado_id": empleado["empleado_id"]},
+                UpdateExpression="SET incidentes_abiertos = :n",
+                ExpressionAttributeValues={":n": abiertos.get(correo, 0)}
+            )
+        print(f"   ✅ Empleados con incidentes abiertos: {sum(1 for n in abiertos.values() if n)}")
+        return True
+    except Exception as e:
+        print(f"   ❌ Error: {str(e)}")
+        return False
+
+
 def verify_credentials():
     """Verifica credenciales AWS"""
     try:
@@ -407,6 +501,58 @@ def create_dynamodb_table(table_name, key_schema, attribute_definitions,
             return False
 
 
+def ensure_stream(table_name):
+    """Habilita el stream (NEW_AND_OLD_IMAGES) en una tabla existente y muestra su ARN"""
+    try:
+        table = dynamodb_client.describe_table(TableName=table_name)['Table']
+        if not table.get('StreamSpecification', {}).get('StreamEnabled'):
+            print(f"   🔨 Habilitando stream en '{table_name}'...")
+            dynamodb_client.update_table(
+                TableName=table_name,
+                StreamSpecification={
+                    'StreamEnabled': True,
+                    'StreamViewType': 'NEW_AND_OLD_IMAGES'
+                }
+            )
+            waiter = dynamodb_client.get_waiter('table_exists')
+            waiter.wait(TableName=table_name)
+            table = dynamodb_client.describe_table(TableName=table_name)['Table']
+        print(f"   🔗 Stream de '{table_name}': {table.get('LatestStreamArn')}")
+        return True
+    except Exception as e:
+        print(f"   ❌ Error al habilitar stream: {str(e)}")
+        return False
+
+
+def ensure_gsi(table_name, attribute_definitions, index):
+    """Agrega un GSI a una tabla existente si aún no lo tiene y espera a que esté activo"""
+    try:
+        table = dynamodb_client.describe_table(TableName=table_name)['Table']
+        existentes = {i['IndexName'] for i in table.get('GlobalSecondaryIndexes', [])}
+        if index['IndexName'] not in existentes:
+            print(f"   🔨 Creando índice '{index['IndexName']}' en '{table_name}'...")
+            dynamodb_client.update_table(
+                TableName=table_name,
+                AttributeDefinitions=attribute_definitions,
+                GlobalSecondaryIndexUpdates=[{'Create': index}]
+            )
+
+        while True:
+            table = dynamodb_client.describe_table(TableName=table_name)['Table']
+            estado = next(
+                i['IndexStatus'] for i in table.get('GlobalSecondaryIndexes', [])
+                if i['IndexName'] == index['IndexName']
+            )
+            if estado == 'ACTIVE':
+                break
+            time.sleep(5)
+        print(f"   ✅ Índice '{index['IndexName']}' activo")
+        return True
+    except Exception as e:
+        print(f"   ❌ Error al crear índice: {str(e)}")
+        return False
+
+
 def create_all_resources():
     """Crea todas las tablas DynamoDB y el bucket S3"""
     print("\n" + "=" * 60)
@@ -418,24 +564,48 @@ def create_all_resources():
         return False
     
     # Crear tabla de Usuarios
+    usuarios_attrs = [
+        {'AttributeName': 'correo', 'AttributeType': 'S'},
+        {'AttributeName': 'rol', 'AttributeType': 'S'},
+        {'AttributeName': 'nombre', 'AttributeType': 'S'}
+    ]
+    # KEYS_ONLY ya incluye correo, rol y nombre (nunca la contraseña)
+    rol_nombre_index = {
+        'IndexName': 'RolNombreIndex',
+        'KeySchema': [
+            {'AttributeName': 'rol', 'KeyType': 'HASH'},
+            {'AttributeName': 'nombre', 'KeyType': 'RANGE'}
+        ],
+        'Projection': {'ProjectionType': 'KEYS_ONLY'}
+    }
     if not create_dynamodb_table(
         table_name=TABLE_USUARIOS,
         key_schema=[{'AttributeName': 'correo', 'KeyType': 'HASH'}],
-        attribute_definitions=[
-            {'AttributeName': 'correo', 'AttributeType': 'S'}
-        ]
+        attribute_definitions=usuarios_attrs,
+        global_secondary_indexes=[rol_nombre_index]
     ):
         return False
+
+    if not ensure_gsi(TABLE_USUARIOS, usuarios_attrs, rol_nombre_index):
+        return False
     
     # Crear tabla de Incidentes
+    incidentes_attrs = [
+        {'AttributeName': 'incidente_id', 'AttributeType': 'S'},
+        {'AttributeName': 'fecha_reporte', 'AttributeType': 'S'},
+        {'AttributeName': 'estado', 'AttributeType': 'S'},
+        {'AttributeName': 'usuario_correo', 'AttributeType': 'S'}
+    ]
+    # Incidentes por reportante (historial y propagación de cambios de correo)
+    incidentes_usuario_index = {
+        'IndexName': 'UsuarioCorreoIndex',
+        'KeySchema': [{'AttributeName': 'usuario_correo', 'KeyType': 'HASH'}],
+        'Projection': {'ProjectionType': 'ALL'}
+    }
     if not create_dynamodb_table(
         table_name=TABLE_INCIDENTES,
         key_schema=[{'AttributeName': 'incidente_id', 'KeyType': 'HASH'}],
-        attribute_definitions=[
-            {'AttributeName': 'incidente_id', 'AttributeType': 'S'},
-            {'AttributeName': 'fecha_reporte', 'AttributeType': 'S'},
-            {'AttributeName': 'estado', 'AttributeType': 'S'}
-        ],
+        attribute_definitions=incidentes_attrs,
         global_secondary_indexes=[{
             'IndexName': 'EstadoIndex',
             'KeySchema': [
@@ -443,37 +613,90 @@ def create_all_resources():
                 {'AttributeName': 'fecha_reporte', 'KeyType': 'RANGE'}
             ],
             'Projection': {'ProjectionType': 'ALL'}
-        }],
+        }, incidentes_usuario_index],
         stream_enabled=True
     ):
         return False
+
+    if not ensure_gsi(TABLE_INCIDENTES, incidentes_attrs, incidentes_usuario_index):
+        return False
     
     # Crear tabla de Empleados
+    empleados_attrs = [
+        {'AttributeName': 'empleado_id', 'AttributeType': 'S'},
+        {'AttributeName': 'email', 'AttributeType': 'S'},  # ← Empleados sí usa 'email'
+        {'AttributeName': 'estado', 'AttributeType': 'S'},
+        {'AttributeName': 'nombre', 'AttributeType': 'S'}
+    ]
+    # Listado por estado en páginas completas, ordenado por nombre
+    estado_nombre_index = {
+        'IndexName': 'EstadoNombreIndex',
+        'KeySchema': [
+            {'AttributeName': 'estado', 'KeyType': 'HASH'},
+            {'AttributeName': 'nombre', 'KeyType': 'RANGE'}
+        ],
+        'Projection': {'ProjectionType': 'ALL'}
+    }
     if not create_dynamodb_table(
         table_name=TABLE_EMPLEADOS,
         key_schema=[{'AttributeName': 'empleado_id', 'KeyType': 'HASH'}],
-        attribute_definitions=[
-            {'AttributeName': 'empleado_id', 'AttributeType': 'S'},
-            {'AttributeName': 'email', 'AttributeType': 'S'}  # ← Empleados sí usa 'email'
-        ],
+        attribute_definitions=empleados_attrs,
         global_secondary_indexes=[{
             'IndexName': 'EmailIndex',
             'KeySchema': [{'AttributeName': 'email', 'KeyType': 'HASH'}],
             'Projection': {'ProjectionType': 'ALL'}
-        }]
+        }, estado_nombre_index]
     ):
         return False
+
+    if not ensure_gsi(TABLE_EMPLEADOS, empleados_attrs, estado_nombre_index):
+        return False
     
     # Crear tabla de Logs
+    logs_attrs = [
+        {'AttributeName': 'registro_id', 'AttributeType': 'S'},
+        {'AttributeName': 'marca_tiempo', 'AttributeType': 'S'},
+        {'AttributeName': 'nivel', 'AttributeType': 'S'}
+    ]
+    # Listado por rango de fechas (y nivel) sin recorrer la tabla
+    nivel_marca_index = {
+        'IndexName': 'NivelMarcaIndex',
+        'KeySchema': [
+            {'AttributeName': 'nivel', 'KeyType': 'HASH'},
+            {'AttributeName': 'marca_tiempo', 'KeyType': 'RANGE'}
+        ],
+        'Projection': {'ProjectionType': 'ALL'}
+    }
     if not create_dynamodb_table(
         table_name=TABLE_LOGS,
         key_schema=[
             {'AttributeName': 'registro_id', 'KeyType': 'HASH'},
             {'AttributeName': 'marca_tiempo', 'KeyType': 'RANGE'}
         ],
+        attribute_definitions=logs_attrs,
+        global_secondary_indexes=[nivel_marca_index],
+        stream_enabled=True,
+        ttl_attribute='ttl'
+    ):
+        return False
+
+    if not ensure_gsi(TABLE_LOGS, logs_attrs, nivel_marca_index):
+        return False
+
+    # Tablas creadas antes de las métricas no tienen stream
+    if not ensure_stream(TABLE_LOGS):
+        return False
+
+    # Crear tabla de Métricas de logs (rollups por servicio y minuto)
+    if not create_dynamodb_table(
+        table_name=TABLE_METRICAS_LOGS,
+        key_schema=[
+            {'AttributeName': 'servicio', 'KeyType': 'HASH'},
+            {'AttributeName': 'minuto', 'KeyType': 'RANGE'}
+        ],
         attribute_definitions=[
-            {'AttributeName': 'registro_id', 'AttributeType': 'S'},
-            {'AttributeName': 'marca_tiempo', 'AttributeType': 'S'}
+            {'AttributeName': 'servicio', 'AttributeType': 'S'},
+            {'AttributeName': 'minuto', 'AttributeType': 'S'}
         ],
         ttl_attribute='ttl'
     ):
@@ -496,6 +719,115 @@ def create_all_resources():
     ):
         return False
     
+    # Crear tabla de límites de login (cubetas por correo e IP)
+    if not create_dynamodb_table(
+        table_name=TABLE_RATE_LIMIT,
+        key_schema=[{'AttributeName': 'clave', 'KeyType': 'HASH'}],
+        attribute_definitions=[
+            {'AttributeName': 'clave', 'AttributeType': 'S'}
+        ],
+        ttl_attribute='ttl'
+    ):
+        return False
+
+    # Crear tabla de revocaciones de tokens (jti#... y usuario#...)
+    if not create_dynamodb_table(
+        table_name=TABLE_REVOCACIONES,
+        key_schema=[{'AttributeName': 'clave', 'KeyType': 'HASH'}],
+        attribute_definitions=[
+            {'AttributeName': 'clave', 'AttributeType': 'S'},
+            {'AttributeName': 'particion', 'AttributeType': 'S'},
+            {'AttributeName': 'revocado_en', 'AttributeType': 'N'}
+        ],
+        global_secondary_indexes=[{
+            'IndexName': 'RevocadoEnIndex',
+            'KeySchema': [
+                {'AttributeName': 'particion', 'KeyType': 'HASH'},
+                {'AttributeName': 'revocado_en', 'KeyType': 'RANGE'}
+            ],
+            'Projection': {'ProjectionType': 'KEYS_ONLY'}
+        }],
+        ttl_attribute='ttl'
+    ):
+        return False
+
+    # Crear tabla del índice de búsqueda por prefijos (usuarios y empleados)
+    if not create_dynamodb_table(
+        table_name=TABLE_BUSQUEDA,
+        key_schema=[
+            {'AttributeName': 'prefijo', 'KeyType': 'HASH'},
+            {'AttributeName': 'clave', 'KeyType': 'RANGE'}
+        ],
+        attribute_definitions=[
+            {'AttributeName': 'prefijo', 'AttributeType': 'S'},
+            {'AttributeName': 'clave', 'AttributeType': 'S'}
+        ]
+    ):
+        return False
+
+    # Crear tabla de Trabajos en segundo plano (el stream dispara ProcesarTrabajo)
+    if not create_dynamodb_table(
+        table_name=TABLE_TRABAJOS,
+        key_schema=[{'AttributeName': 'trabajo_id', 'KeyType': 'HASH'}],
+        attribute_definitions=[
+            {'AttributeName': 'trabajo_id', 'AttributeType': 'S'}
+        ],
+        stream_enabled=True,
+        ttl_attribute='ttl'
+    ):
+        return False
+
+    # Crear tabla de Contadores (totales mantenidos por los handlers)
+    if not create_dynamodb_table(
+        table_name=TABLE_CONTADORES,
+        key_schema=[{'AttributeName': 'contador', 'KeyType': 'HASH'}],
+        attribute_definitions=[
+            {'AttributeName': 'contador', 'AttributeType': 'S'}
+        ]
+    ):
+        return False
+
+    # Crear tabla de Suscripciones (tema -> conexiones WebSocket)
+    if not create_dynamodb_table(
+        table_name=TABLE_SUSCRIPCIONES,
+        key_schema=[
+            {'AttributeName': 'tema', 'KeyType': 'HASH'},
+            {'AttributeName': 'conexion_id', 'KeyType': 'RANGE'}
+        ],
+        attribute_definitions=[
+            {'AttributeName': 'tema', 'AttributeType': 'S'},
+            {'AttributeName': 'conexion_id', 'AttributeType': 'S'}
+        ],
+        ttl_attribute='expiracion_ttl'
+    ):
+        return False
+
+    # Crear tabla de Coalescencia (ventana de notificaciones por incidente)
+    if not create_dynamodb_table(
+        table_name=TABLE_COALESCENCIA,
+        key_schema=[{'AttributeName': 'clave', 'KeyType': 'HASH'}],
+        attribute_definitions=[
+            {'AttributeName': 'clave', 'AttributeType': 'S'}
+        ],
+        ttl_attribute='expiracion_ttl'
+    ):
+        return False
+
+    # Crear tabla de Bandeja (notificaciones por usuario con número de secuencia)
+    if not create_dynamodb_table(
+        table_name=TABLE_BANDEJA,
+        key_schema=[
+            {'AttributeName': 'usuario_correo', 'KeyType': 'HASH'},
+            {'AttributeName': 'seq', 'KeyType': 'RANGE'}
+        ],
+        attribute_definitions=[
+            {'AttributeName': 'usuario_correo', 'AttributeType': 'S'},
+            {'AttributeName': 'seq', 'AttributeType': 'N'}
+        ],
+        ttl_attribute='expiracion_ttl'
+    ):
+        return False
+
     print("\n✅ Todos los recursos creados exitosamente")
     return True
 
@@ -527,6 +859,15 @@ def main():
             results[filename] = success
         time.sleep(1)
 
+    if TABLE_BUSQUEDA:
+        results["busqueda"] = populate_busqueda()
+
+    if TABLE_CONTADORES:
+        results["contadores"] = populate_contadores()
+
+    if results.get("empleados.json"):
+        results["cargas_empleados"] = populate_cargas_empleados()
+
     print("\n" + "=" * 60)
     print("📋 RESUMEN")
     print("=" * 60)
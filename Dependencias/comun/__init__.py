@@ -0,0 +1 @@
+# Módulos compartidos entre microservicios (se empaquetan en la Lambda Layer).
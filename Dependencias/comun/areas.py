@@ -0,0 +1,17 @@
+# Áreas de los empleados y su relación con el tipo de incidente. La forma
+# canónica es en minúsculas y coincide con los tipos de incidente
+# ("TI" -> "ti", "otro" -> "otro"); los alias cubren datos antiguos.
+TIPOS_AREA = {"mantenimiento", "electricidad", "limpieza", "seguridad", "ti", "logistica", "otro"}
+
+ALIAS_AREA = {"otros": "otro"}
+
+
+def normalizar_area(valor):
+    """tipo_area (o tipo de incidente) en su forma canónica: minúsculas y sin alias."""
+    area = str(valor or "").strip().lower()
+    return ALIAS_AREA.get(area, area)
+
+
+def area_de_tipo(tipo_incidente):
+    """tipo_area de los empleados que atienden un incidente de 'tipo_incidente'."""
+    return normalizar_area(tipo_incidente)
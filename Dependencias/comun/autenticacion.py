@@ -0,0 +1,164 @@
+import os
+import time
+import uuid
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+import jwt
+
+from comun import revocacion
+
+JWT_SECRET = os.getenv("JWT_SECRET")
+if not JWT_SECRET:
+    # Sin secreto, los tokens se firmarían con una clave vacía y cualquiera podría forjarlos
+    raise RuntimeError("JWT_SECRET no está configurado")
+JWT_ALGORITHM = "HS256"
+JWT_EXPIRATION_HOURS = int(os.getenv("JWT_EXPIRATION_HOURS", "24"))
+
+ALLOWED_ROLES = {"estudiante", "personal_administrativo", "autoridad"}
+
+# Tokens ya verificados en este contenedor. La clave es el SHA-256 del token
+# (no se guarda el token en memoria) y cada entrada vence como máximo en su 'exp'.
+TOKEN_CACHE_MAX = int(os.getenv("TOKEN_CACHE_MAX", "1024"))
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_estadisticas = {"aciertos": 0, "fallos": 0}
+
+
+def generar_token(correo, role, nombre):
+    """
+    Genera un JWT como Spring Boot
+    """
+    if role not in ALLOWED_ROLES:
+        raise ValueError("Rol inválido para token")
+
+    payload = {
+        "correo": correo,
+        "rol": role,
+        "nombre": nombre,
+        "jti": uuid.uuid4().hex,
+        "iat": datetime.utcnow(),
+        "exp": datetime.utcnow() + timedelta(hours=JWT_EXPIRATION_HOURS)
+    }
+
+    token = jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
+    return token
+
+
+def _leer_cache(clave):
+    with _cache_lock:
+        entrada = _cache.get(clave)
+        if entrada is None:
+            _estadisticas["fallos"] += 1
+            return None
+
+        resultado, expira_en, iat = entrada
+        if time.time() >= expira_en:
+            del _cache[clave]
+            _estadisticas["fallos"] += 1
+            return None
+
+        _cache.move_to_end(clave)
+        _estadisticas["aciertos"] += 1
+        return resultado, iat
+
+
+def _guardar_cache(clave, resultado, expira_en, iat):
+    with _cache_lock:
+        _cache[clave] = (resultado, expira_en, iat)
+        _cache.move_to_end(clave)
+        while len(_cache) > TOKEN_CACHE_MAX:
+            _cache.popitem(last=False)
+
+
+def estadisticas_cache():
+    """Aciertos, fallos y tamaño actual de la caché de tokens."""
+    with _cache_lock:
+        return {**_estadisticas, "tamano": len(_cache)}
+
+
+def validar_token(token):
+    """
+    Valida un JWT y retorna información del usuario
+
+    Returns:
+        dict: {
+            "valido": bool,
+            "correo": str,
+            "rol": str,
+            "nombre": str,
+            "jti": str,
+            "error": str (opcional)
+        }
+    """
+    if not token:
+        return {"valido": False, "error": "Token es obligatorio"}
+
+    clave = hashlib.sha256(token.encode("utf-8")).hexdigest()
+    en_cache = _leer_cache(clave)
+    if en_cache is not None:
+        resultado, iat = en_cache
+        # La revocación se revisa siempre: pudo ocurrir después de cachear el token
+        if revocacion.esta_revocado(resultado.get("jti"), resultado.get("correo"), iat):
+            return {"valido": False, "error": "Token revocado"}
+        return dict(resultado)
+
+    try:
+        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+    except jwt.ExpiredSignatureError:
+        return {"valido": False, "error": "Token expirado"}
+    except jwt.InvalidTokenError:
+        return {"valido": False, "error": "Token inválido"}
+
+    rol = payload.get("rol", payload.get("role"))
+    if rol not in ALLOWED_ROLES:
+        return {"valido": False, "error": "Rol inválido en token"}
+
+    resultado = {
+        "valido": True,
+        "correo": payload.get("correo"),
+        "rol": rol,
+        "nombre": payload.get("nombre", ""),
+        "jti": payload.get("jti")
+    }
+
+    if revocacion.esta_revocado(resultado["jti"], resultado["correo"], payload.get("iat")):
+        return {"valido": False, "error": "Token revocado"}
+
+    # Sin 'exp' no hay un límite seguro: no se guarda en caché.
+    expiracion = payload.get("exp")
+    if expiracion:
+        _guardar_cache(clave, resultado, float(expiracion), payload.get("iat"))
+
+    return dict(resultado)
+
+
+def validar_evento(event):
+    """
+    Obtiene el usuario de una solicitud de API Gateway.
+
+    En despliegue el Lambda Authorizer (con caché por token) ya validó el JWT
+    y deja correo/rol/nombre en requestContext.authorizer. Si no hay contexto
+    (ejecución local o invocación directa) se valida la cabecera Authorization.
+
+    Returns:
+        dict: mismo formato que validar_token
+    """
+    authorizer = (event.get("requestContext") or {}).get("authorizer") or {}
+    if authorizer.get("correo") and authorizer.get("rol"):
+        return {
+            "valido": True,
+            "correo": authorizer.get("correo"),
+            "rol": authorizer.get("rol"),
+            "nombre": authorizer.get("nombre", ""),
+            "jti": authorizer.get("jti")
+        }
+
+    headers = event.get("headers") or {}
+    token = headers.get("Authorization") or headers.get("authorization") or ""
+    if token.lower().startswith("bearer "):
+        token = token.split(" ", 1)[1].strip()
+    return validar_token(token)
@@ -0,0 +1,151 @@
+import os
+import math
+import time
+import hashlib
+import threading
+
+import boto3
+from boto3.dynamodb.conditions import Key
+
+TABLE_REVOCACIONES = os.getenv("TABLE_REVOCACIONES")
+JWT_EXPIRATION_HOURS = int(os.getenv("JWT_EXPIRATION_HOURS", "24"))
+
+# Todas las revocaciones comparten partición en el índice para poder leer
+# "lo nuevo desde la última marca" con una sola Query.
+PARTICION = "revocaciones"
+INDICE_REVOCADO_EN = "RevocadoEnIndex"
+
+REVOCACION_SYNC_SEGUNDOS = int(os.getenv("REVOCACION_SYNC_SEGUNDOS", "30"))
+REVOCACION_BLOOM_CAPACIDAD = int(os.getenv("REVOCACION_BLOOM_CAPACIDAD", "10000"))
+REVOCACION_BLOOM_FP = 0.01
+# Solapamiento al releer desde la marca (escrituras con reloj atrasado o GSI aún no propagado).
+MARGEN_MARCA_MS = 5000
+
+_table = boto3.resource("dynamodb").Table(TABLE_REVOCACIONES) if TABLE_REVOCACIONES else None
+
+
+class FiltroBloom:
+    """Bloom filter sobre bytearray con k posiciones por doble hashing de SHA-256."""
+
+    def __init__(self, capacidad, tasa_fp):
+        self.capacidad = capacidad
+        self.bits = max(8, int(-capacidad * math.log(tasa_fp) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.bits / capacidad * math.log(2)))
+        self.arreglo = bytearray((self.bits + 7) // 8)
+        self.insertados = 0
+
+    def _posiciones(self, valor):
+        digest = hashlib.sha256(valor.encode("utf-8")).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:16], "big") | 1
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+
+    def agregar(self, valor):
+        for pos in self._posiciones(valor):
+            self.arreglo[pos >> 3] |= 1 << (pos & 7)
+        self.insertados += 1
+
+    def contiene(self, valor):
+        return all(self.arreglo[pos >> 3] & (1 << (pos & 7)) for pos in self._posiciones(valor))
+
+
+_lock = threading.Lock()
+_estado = {
+    "filtro": FiltroBloom(REVOCACION_BLOOM_CAPACIDAD, REVOCACION_BLOOM_FP),
+    "marca": 0,
+    "sincronizado_en": 0.0,
+}
+
+
+def _ahora_ms():
+    return int(time.time() * 1000)
+
+
+def _sincronizar():
+    """Agrega al filtro las revocaciones con revocado_en posterior a la marca."""
+    with _lock:
+        if time.time() - _estado["sincronizado_en"] < REVOCACION_SYNC_SEGUNDOS:
+            return
+
+        filtro = _estado["filtro"]
+        marca = _estado["marca"]
+        desde = max(0, marca - MARGEN_MARCA_MS)
+
+        qargs = {
+            "IndexName": INDICE_REVOCADO_EN,
+            "KeyConditionExpression": Key("particion").eq(PARTICION) & Key("revocado_en").gt(desde),
+        }
+        while True:
+            resp = _table.query(**qargs)
+            for item in resp.get("Items", []):
+                filtro.agregar(item["clave"])
+                marca = max(marca, int(item["revocado_en"]))
+            lek = resp.get("LastEvaluatedKey")
+            if not lek:
+                break
+            qargs["ExclusiveStartKey"] = lek
+
+        _estado["marca"] = marca
+        _estado["sincronizado_en"] = time.time()
+
+        # Lleno: se reconstruye con el doble de capacidad en la próxima lectura.
+        if filtro.insertados > filtro.capacidad:
+            _estado["filtro"] = FiltroBloom(filtro.capacidad * 2, REVOCACION_BLOOM_FP)
+            _estado["marca"] = 0
+            _estado["sincronizado_en"] = 0.0
+
+
+def _confirmar(clave):
+    resp = _table.get_item(Key={"clave": clave}, ConsistentRead=True)
+    return resp.get("Item")
+
+
+def esta_revocado(jti, correo, iat):
+    """
+    True si el token (jti) fue revocado o si el usuario fue revocado después
+    de emitirse el token (iat, en segundos). Solo consulta DynamoDB cuando el
+    filtro da positivo.
+    """
+    if _table is None:
+        return False
+
+    _sincronizar()
+    filtro = _estado["filtro"]
+
+    if jti and filtro.contiene(f"jti#{jti}"):
+        if _confirmar(f"jti#{jti}"):
+            return True
+
+    if correo and filtro.contiene(f"usuario#{correo}"):
+        item = _confirmar(f"usuario#{correo}")
+        if item and (iat is None or int(iat) * 1000 <= int(item["revocado_en"])):
+            return True
+
+    return False
+
+
+def _revocar(clave, **atributos):
+    ahora = _ahora_ms()
+    item = {
+        "clave": clave,
+        "particion": PARTICION,
+        "revocado_en": ahora,
+        # Después de la vida máxima de un token la revocación ya no hace falta
+        "ttl": ahora // 1000 + JWT_EXPIRATION_HOURS * 3600,
+        **atributos,
+    }
+    _table.put_item(Item=item)
+
+    # Este contenedor lo ve de inmediato, los demás en la próxima sincronización
+    with _lock:
+        _estado["filtro"].agregar(clave)
+    return item
+
+
+def revocar_token(jti, correo=None):
+    return _revocar(f"jti#{jti}", correo=correo)
+
+
+def revocar_usuario(correo):
+    """Invalida todos los tokens del usuario emitidos hasta ahora."""
+    return _revocar(f"usuario#{correo}", correo=correo)
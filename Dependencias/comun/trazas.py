@@ -0,0 +1,271 @@
+import os
+import json
+import time
+import uuid
+import threading
+import functools
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import boto3
+
+CABECERA_CORRELACION = "X-Correlation-Id"
+
+TABLE_LOGS = os.environ.get("TABLE_LOGS")
+
+# Spans detallados por invocación; los siguientes solo se agregan por
+# (componente, operación) con su cantidad, duración total y errores.
+TRAZAS_MAX_SPANS = int(os.environ.get("TRAZAS_MAX_SPANS", "100"))
+# Tamaño máximo del resumen guardado en TABLE_LOGS (el item de DynamoDB admite 400 KB).
+TRAZAS_MAX_BYTES = int(os.environ.get("TRAZAS_MAX_BYTES", "300000"))
+
+# Tabla propia (cliente sin instrumentar) para no generar spans al guardar la traza.
+_logs_table = boto3.resource("dynamodb").Table(TABLE_LOGS) if TABLE_LOGS else None
+
+_lock = threading.Lock()
+_estado = {
+    "correlacion_id": None,
+    "servicio": None,
+    "inicio": None,
+    "spans": [],
+    "agregados": {},
+    "descartados": 0,
+}
+
+
+def extraer_correlacion(event):
+    """
+    Obtiene el id de correlación de la cabecera X-Correlation-Id (API Gateway)
+    o del payload cuando la Lambda fue invocada directamente.
+    """
+    if not isinstance(event, dict):
+        return None
+
+    headers = event.get("headers") or {}
+    for nombre, valor in headers.items():
+        if nombre.lower() == CABECERA_CORRELACION.lower() and valor:
+            return valor
+
+    return event.get("correlacion_id")
+
+
+def iniciar(correlacion_id=None, servicio=None):
+    """
+    Abre la traza de la invocación actual. Si no llega un id, se genera uno.
+    """
+    with _lock:
+        _estado["correlacion_id"] = correlacion_id or str(uuid.uuid4())
+        _estado["servicio"] = servicio
+        _estado["inicio"] = time.perf_counter()
+        _estado["spans"] = []
+        _estado["agregados"] = {}
+        _estado["descartados"] = 0
+    return _estado["correlacion_id"]
+
+
+def correlacion_actual():
+    return _estado["correlacion_id"]
+
+
+def _registrar_span(componente, operacion, inicio, fin, error=None, atributos=None):
+    if not _estado["correlacion_id"]:
+        return
+
+    span = {
+        "correlacion_id": _estado["correlacion_id"],
+        "servicio": _estado["servicio"],
+        "componente": componente,
+        "operacion": operacion,
+        "inicio_ms": round((inicio - _estado["inicio"]) * 1000, 3),
+        "duracion_ms": round((fin - inicio) * 1000, 3),
+    }
+    if error:
+        span["error"] = error
+    if atributos:
+        span.update(atributos)
+
+    with _lock:
+        if len(_estado["spans"]) < TRAZAS_MAX_SPANS:
+            _estado["spans"].append(span)
+            detallado = True
+        else:
+            agregado = _estado["agregados"].setdefault((componente, operacion), {
+                "componente": componente,
+                "operacion": operacion,
+                "cantidad": 0,
+                "duracion_ms": 0.0,
+                "errores": 0,
+            })
+            agregado["cantidad"] += 1
+            agregado["duracion_ms"] = round(agregado["duracion_ms"] + span["duracion_ms"], 3)
+            agregado["errores"] += 1 if error else 0
+            _estado["descartados"] += 1
+            detallado = False
+    if detallado:
+        print("[SPAN]", json.dumps(span, ensure_ascii=False, default=str))
+
+
+@contextmanager
+def span(componente, operacion, **atributos):
+    """
+    Mide un bloque de código (p. ej. una llamada HTTP) dentro de la traza actual.
+    """
+    inicio = time.perf_counter()
+    error = None
+    try:
+        yield
+    except Exception as e:
+        error = repr(e)
+        raise
+    finally:
+        _registrar_span(componente, operacion, inicio, time.perf_counter(), error, atributos)
+
+
+def _antes_llamada(model, context, **kwargs):
+    context["trazas_inicio"] = time.perf_counter()
+    context["trazas_operacion"] = (model.service_model.service_name, model.name)
+
+
+def _despues_llamada(context, http_response=None, parsed=None, exception=None, **kwargs):
+    inicio = context.pop("trazas_inicio", None)
+    if inicio is None:
+        return
+
+    error = None
+    if exception is not None:
+        error = repr(exception)
+    elif isinstance(parsed, dict) and parsed.get("Error"):
+        error = parsed["Error"].get("Code")
+
+    atributos = {}
+    if http_response is not None:
+        atributos["http_status"] = http_response.status_code
+
+    componente, operacion = context.get("trazas_operacion", ("aws", "desconocida"))
+    _registrar_span(componente, operacion, inicio, time.perf_counter(), error, atributos)
+
+
+def instrumentar(cliente):
+    """
+    Registra spans para cada llamada del cliente boto3 (DynamoDB, S3, Lambda...).
+    Para un resource se debe pasar resource.meta.client.
+    """
+    eventos = cliente.meta.events
+    eventos.register("before-call.*.*", _antes_llamada, unique_id="trazas-antes")
+    eventos.register("after-call.*.*", _despues_llamada, unique_id="trazas-despues")
+    eventos.register("after-call-error.*.*", _despues_llamada, unique_id="trazas-error")
+    return cliente
+
+
+def _a_decimal(obj):
+    if isinstance(obj, dict):
+        return {k: _a_decimal(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_a_decimal(x) for x in obj]
+    if isinstance(obj, float):
+        return Decimal(str(obj))
+    return obj
+
+
+def _recortar(resumen):
+    """Quita spans detallados (los más tardíos primero) hasta que el resumen quepa en TRAZAS_MAX_BYTES."""
+    tamano = len(json.dumps(resumen, ensure_ascii=False, default=str).encode("utf-8"))
+    if tamano <= TRAZAS_MAX_BYTES:
+        return resumen, tamano
+
+    spans = resumen["spans"]
+    recortado = dict(resumen, truncado=True)
+    while spans:
+        spans = spans[:len(spans) // 2]
+        recortado["spans"] = spans
+        recortado["spans_descartados"] = resumen["spans_descartados"] + len(resumen["spans"]) - len(spans)
+        tamano = len(json.dumps(recortado, ensure_ascii=False, default=str).encode("utf-8"))
+        if tamano <= TRAZAS_MAX_BYTES:
+            break
+    return recortado, tamano
+
+
+def finalizar(estado_http=None):
+    """
+    Cierra la traza: imprime el resumen y lo guarda como un registro de logs
+    para poder reconstruir la latencia de extremo a extremo con una consulta.
+    """
+    if not _estado["correlacion_id"]:
+        return None
+
+    with _lock:
+        spans = list(_estado["spans"])
+        agregados = list(_estado["agregados"].values())
+        descartados = _estado["descartados"]
+        duracion_ms = round((time.perf_counter() - _estado["inicio"]) * 1000, 3)
+
+    resumen = {
+        "correlacion_id": _estado["correlacion_id"],
+        "duracion_ms": duracion_ms,
+        "estado_http": estado_http,
+        "spans": spans,
+        "spans_agregados": agregados,
+        "spans_descartados": descartados,
+    }
+    print("[TRAZA]", json.dumps(resumen, ensure_ascii=False, default=str))
+    resumen_guardado, tamano = _recortar(resumen)
+
+    if _logs_table:
+        registro = {
+            "registro_id": str(uuid.uuid4()),
+            "nivel": "INFO",
+            "tipo": "traza",
+            "marca_tiempo": datetime.now(timezone.utc).isoformat(),
+            "correlacion_id": _estado["correlacion_id"],
+            "detalles_sistema": {
+                "mensaje": "Traza de solicitud",
+                "servicio": _estado["servicio"],
+                "contexto": resumen_guardado,
+            },
+        }
+        try:
+            _logs_table.put_item(Item=_a_decimal(registro))
+        except Exception as e:
+            # La traza no debe romper la respuesta, pero su pérdida queda registrada
+            print("[TRAZA_ERROR]", json.dumps({
+                "mensaje": "No se pudo guardar la traza en TABLE_LOGS",
+                "correlacion_id": _estado["correlacion_id"],
+                "servicio": _estado["servicio"],
+                "bytes": tamano,
+                "spans": len(resumen_guardado["spans"]),
+                "error": repr(e),
+            }, ensure_ascii=False))
+
+    with _lock:
+        _estado["correlacion_id"] = None
+        _estado["spans"] = []
+        _estado["agregados"] = {}
+        _estado["descartados"] = 0
+    return resumen
+
+
+def con_trazado(servicio):
+    """
+    Decorador para lambda_handler: abre la traza con el id recibido (o uno nuevo),
+    devuelve el id en la cabecera X-Correlation-Id y guarda el resumen al terminar.
+    """
+    def decorador(handler):
+        @functools.wraps(handler)
+        def envoltura(event, context):
+            iniciar(extraer_correlacion(event), servicio)
+            respuesta = None
+            try:
+                respuesta = handler(event, context)
+                return respuesta
+            finally:
+                estado_http = None
+                if isinstance(respuesta, dict) and "statusCode" in respuesta:
+                    estado_http = respuesta["statusCode"]
+                    headers = dict(respuesta.get("headers") or {})
+                    headers[CABECERA_CORRELACION] = correlacion_actual()
+                    headers["Access-Control-Expose-Headers"] = CABECERA_CORRELACION
+                    respuesta["headers"] = headers
+                finalizar(estado_http)
+        return envoltura
+    return decorador
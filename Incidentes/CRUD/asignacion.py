@@ -0,0 +1,159 @@
+import os
+import time
+import heapq
+import threading
+
+import boto3
+from boto3.dynamodb.conditions import Key
+from comun import areas, trazas
+
+TABLE_EMPLEADOS = os.environ.get("TABLE_EMPLEADOS", "TABLE_EMPLEADOS")
+
+# Cada empleado guarda en 'incidentes_abiertos' cuántos incidentes en_progreso
+# tiene asignados. Este módulo mantiene, por área, un min-heap de empleados
+# activos ordenado por esa carga y lo refresca desde DynamoDB periódicamente.
+REFRESCO_SEGUNDOS = int(os.environ.get("ASIGNACION_REFRESCO_SEGUNDOS", "60"))
+
+dynamodb = boto3.resource("dynamodb")
+trazas.instrumentar(dynamodb.meta.client)
+empleados_table = dynamodb.Table(TABLE_EMPLEADOS)
+
+_lock = threading.Lock()
+_heaps = {}       # tipo_area -> [(carga, nombre, empleado_id)]
+_cargas = {}      # empleado_id -> carga vigente (las entradas del heap con otra carga están obsoletas)
+_empleados = {}   # empleado_id -> {"correo", "nombre", "tipo_area"}
+_por_correo = {}  # correo -> empleado_id
+_cargado_en = 0.0
+
+
+def _refrescar():
+    """Reconstruye los heaps con los empleados activos (índice EstadoNombreIndex)."""
+    global _heaps, _cargas, _empleados, _por_correo, _cargado_en
+
+    items = []
+    query_kwargs = {
+        "IndexName": "EstadoNombreIndex",
+        "KeyConditionExpression": Key("estado").eq("activo"),
+    }
+    while True:
+        resp = empleados_table.query(**query_kwargs)
+        items.extend(resp.get("Items", []))
+        lek = resp.get("LastEvaluatedKey")
+        if not lek:
+            break
+        query_kwargs["ExclusiveStartKey"] = lek
+
+    heaps, cargas, empleados, por_correo = {}, {}, {}, {}
+    for item in items:
+        empleado_id = item["empleado_id"]
+        correo = (item.get("contacto") or {}).get("correo")
+        carga = int(item.get("incidentes_abiertos", 0))
+        empleados[empleado_id] = {
+            "correo": correo,
+            "nombre": item.get("nombre"),
+            "tipo_area": areas.normalizar_area(item.get("tipo_area")),
+        }
+        cargas[empleado_id] = carga
+        if correo:
+            por_correo[correo] = empleado_id
+        heaps.setdefault(empleados[empleado_id]["tipo_area"], []).append((carga, item.get("nombre") or "", empleado_id))
+
+    for heap in heaps.values():
+        heapq.heapify(heap)
+
+    _heaps, _cargas, _empleados, _por_correo = heaps, cargas, empleados, por_correo
+    _cargado_en = time.time()
+
+
+def _vigente():
+    if time.time() - _cargado_en > REFRESCO_SEGUNDOS:
+        _refrescar()
+
+
+def _ajustar(empleado_id, delta):
+    """Cambia la carga local y deja una entrada nueva en el heap (la anterior queda obsoleta)."""
+    if empleado_id not in _cargas:
+        return
+    _cargas[empleado_id] = max(0, _cargas[empleado_id] + delta)
+    empleado = _empleados[empleado_id]
+    heapq.heappush(
+        _heaps.setdefault(empleado["tipo_area"], []),
+        (_cargas[empleado_id], empleado["nombre"] or "", empleado_id)
+    )
+
+
+def elegir(tipo_incidente):
+    """
+    Empleado activo del área del incidente con menos incidentes abiertos
+    (empate: por nombre). Devuelve {"empleado_id", "correo", "nombre"} o None.
+    O(log n) amortizado: las entradas obsoletas se descartan al llegar a la cima.
+    La carga no cambia hasta que se persiste la asignación (registrar_cambio).
+    """
+    area = areas.area_de_tipo(tipo_incidente)
+    with _lock:
+        _vigente()
+        heap = _heaps.get(area, [])
+        while heap:
+            carga, _, empleado_id = heap[0]
+            if _cargas.get(empleado_id) != carga:
+                heapq.heappop(heap)
+                continue
+            empleado = _empleados[empleado_id]
+            if not empleado["correo"]:
+                heapq.heappop(heap)
+                continue
+            return {"empleado_id": empleado_id, "correo": empleado["correo"], "nombre": empleado["nombre"]}
+        return None
+
+
+def id_por_correo(correo):
+    """empleado_id de un empleado activo a partir de su correo de contacto."""
+    if not correo:
+        return None
+    with _lock:
+        _vigente()
+        return _por_correo.get(correo)
+
+
+def registrar_cambio(empleado_id, delta):
+    """Refleja en los heaps de este contenedor un cambio de carga ya persistido."""
+    with _lock:
+        _ajustar(empleado_id, delta)
+
+
+def incremento(empleado_id, delta):
+    """Operación 'Update' del contador de un empleado para un TransactWriteItems."""
+    return {
+        "Update": {
+            "TableName": TABLE_EMPLEADOS,
+            "Key": {"empleado_id": empleado_id},
+            # También sube 'version' para que las ediciones del empleado
+            # (Usuarios/ActualizarEmpleado) no pisen el contador
+            "UpdateExpression": "ADD incidentes_abiertos :delta, version :uno",
+            "ConditionExpression": "attribute_exists(empleado_id)",
+            "ExpressionAttributeValues": {":delta": delta, ":uno": 1},
+        }
+    }
+
+
+def cambios_de_carga(incidente_prev, incidente_nuevo):
+    """
+    Deltas de 'incidentes_abiertos' que implica la transición:
+    entrar a en_progreso suma al asignado, salir (o reasignar) resta al anterior.
+    Devuelve {empleado_id: delta}.
+    """
+    def asignado(incidente):
+        if incidente.get("estado") != "en_progreso":
+            return None
+        return incidente.get("empleado_id") or id_por_correo(incidente.get("empleado_correo"))
+
+    anterior = asignado(incidente_prev)
+    nuevo = asignado(incidente_nuevo)
+    if anterior == nuevo:
+        return {}
+    deltas = {}
+    if anterior:
+        deltas[anterior] = -1
+    if nuevo:
+        deltas[nuevo] = 1
+    return deltas
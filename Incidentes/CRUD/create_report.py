@@ -4,13 +4,16 @@ import uuid
 import base64
 import boto3
 from datetime import datetime, timezone
-from CRUD.utils import validar_token
+from comun.autenticacion import validar_evento
+from comun import trazas
 from botocore.exceptions import ClientError
 from decimal import Decimal, InvalidOperation
 import requests  # NUEVO
 
 dynamodb = boto3.resource('dynamodb')
 s3 = boto3.client('s3')
+trazas.instrumentar(dynamodb.meta.client)
+trazas.instrumentar(s3)
 CORS_HEADERS = { "Access-Control-Allow-Origin": "*" }
 
 table_name = os.environ.get('TABLE_INCIDENTES')
@@ -28,37 +31,6 @@ NIVEL_URGENCIA_ENUM = ["bajo", "medio", "alto", "critico"]
 ESTADO_ENUM = ["reportado", "en_progreso", "resuelto"]
 PISO_RANGO = range(-2, 12)
 
-lambda_client = boto3.client("lambda")
-LAMBDA_NOTIFY_INCIDENTE = os.environ.get("LAMBDA_NOTIFY_INCIDENTE")
-
-def _notificar_incidente_ws(tipo, titulo, mensaje, incidente_id, destinatarios=None):
-    """
-    Invoca la Lambda de notificaciones por WebSocket (NotifyIncidente).
-    """
-    if not LAMBDA_NOTIFY_INCIDENTE:
-        print("LAMBDA_NOTIFY_INCIDENTE no configurado, no se envía notificación WS.")
-        return
-
-    payload = {
-        "tipo": tipo,
-        "titulo": titulo,
-        "mensaje": mensaje,
-        "incidente_id": incidente_id,
-    }
-
-    if destinatarios:
-        payload["destinatarios"] = destinatarios
-
-    try:
-        lambda_client.invoke(
-            FunctionName=LAMBDA_NOTIFY_INCIDENTE,
-            InvocationType="Event",
-            Payload=json.dumps(payload, ensure_ascii=False).encode("utf-8")
-        )
-        print("Notificación WS disparada (crear incidente):", payload)
-    except Exception as e:
-        print("Error al invocar NotifyIncidente desde crear_incidencia:", repr(e))
-
 
 def _to_dynamodb_numbers(obj):
     """
@@ -112,6 +84,7 @@ def registrar_log_sistema(nivel, mensaje, servicio, contexto=None):
         "nivel": nivel,
         "tipo": "sistema",
         "marca_tiempo": datetime.now(timezone.utc).isoformat(),
+        "correlacion_id": trazas.correlacion_actual(),
         "detalles_sistema": {
             "mensaje": mensaje,
             "servicio": servicio,
@@ -145,6 +118,7 @@ def registrar_log_auditoria(
         "nivel": nivel,
         "tipo": "auditoria",
         "marca_tiempo": datetime.now(timezone.utc).isoformat(),
+        "correlacion_id": trazas.correlacion_actual(),
         "detalles_auditoria": {
             "usuario_correo": usuario_correo,
             "entidad": entidad,
@@ -203,7 +177,8 @@ def enviar_correo_incidencia(correo_destino, nombre, incidente):
     }
 
     try:
-        resp = requests.post(url, json=payload, headers=headers, timeout=10)
+        with trazas.span("http", "brevo.smtp_email"):
+            resp = requests.post(url, json=payload, headers=headers, timeout=10)
         print(
             "Correo de incidencia enviado. Status:",
             resp.status_code,
@@ -214,6 +189,7 @@ def enviar_correo_incidencia(correo_destino, nombre, incidente):
         print("Error al enviar correo de incidencia:", repr(e))
 
 
+@trazas.con_trazado("crear_incidencia")
 def lambda_handler(event, context):
     registrar_log_sistema(
         nivel="INFO",
@@ -222,13 +198,7 @@ def lambda_handler(event, context):
         contexto={"request_id": getattr(context, "aws_request_id", None)}
     )
 
-    headers = event.get("headers") or {}
-    auth_header = headers.get("Authorization") or headers.get("authorization") or ""
-    if auth_header.lower().startswith("bearer "):
-        auth_header = auth_header.split(" ", 1)[1].strip()
-    token = auth_header
-    
-    resultado_validacion = validar_token(token)
+    resultado_validacion = validar_evento(event)
     
     if not resultado_validacion.get("valido"):
         registrar_log_sistema(
@@ -428,7 +398,9 @@ def lambda_handler(event, context):
         "estado": "reportado",
         "usuario_correo": usuario_autenticado["correo"],
         "created_at": created_at,
-        "updated_at": created_at
+        "updated_at": created_at,
+        # Lo lee el consumidor del stream para unir la notificación a esta traza
+        "correlacion_id": trazas.correlacion_actual()
     }
 
     if coordenadas is not None:
@@ -469,18 +441,6 @@ def lambda_handler(event, context):
             incidente=incidente
         )
 
-        mensaje_notif = (
-            f"Se creó el incidente {incidente_id} en el piso {piso_val} "
-            f"con urgencia '{body['nivel_urgencia']}'."
-        )
-
-        _notificar_incidente_ws(
-            tipo="incidente_creado",
-            titulo="Nuevo incidente reportado",
-            mensaje=mensaje_notif,
-            incidente_id=incidente_id,
-        )
-
         return {
             "statusCode": 201,
             "headers": CORS_HEADERS,
@@ -2,14 +2,16 @@ import os
 import json
 import math
 import boto3
-from boto3.dynamodb.conditions import Attr
-from CRUD.utils import validar_token
+from boto3.dynamodb.conditions import Attr, Key
+from comun.autenticacion import validar_evento
+from comun import trazas
 from decimal import Decimal
 
 TABLE_INCIDENTES = os.environ.get("TABLE_INCIDENTES")
 CORS_HEADERS = {"Access-Control-Allow-Origin": "*"}
 
 dynamodb = boto3.resource("dynamodb")
+trazas.instrumentar(dynamodb.meta.client)
 table = dynamodb.Table(TABLE_INCIDENTES)
 
 
@@ -40,14 +42,9 @@ def _safe_int(v, default):
     except Exception:
         return default
     
+@trazas.con_trazado("historial_incidencias")
 def lambda_handler(event, context):
-    headers = event.get("headers") or {}
-    auth_header = headers.get("Authorization") or headers.get("authorization") or ""
-    if auth_header.lower().startswith("bearer "):
-        auth_header = auth_header.split(" ", 1)[1].strip()
-    token = auth_header
-
-    resultado_validacion = validar_token(token)
+    resultado_validacion = validar_evento(event)
     if not resultado_validacion.get("valido"):
         return _resp(401, {"error": resultado_validacion.get("error")})
 
@@ -75,22 +72,31 @@ def lambda_handler(event, context):
     filtro_nivel = body.get("nivel_urgencia")
     filtro_estado = body.get("estado")
 
-    filter_expr = Attr("usuario_correo").eq(correo_usuario)
-
+    filtros = []
     if filtro_tipo:
-        filter_expr = filter_expr & Attr("tipo").eq(filtro_tipo)
+        filtros.append(Attr("tipo").eq(filtro_tipo))
     if filtro_nivel:
-        filter_expr = filter_expr & Attr("nivel_urgencia").eq(filtro_nivel)
+        filtros.append(Attr("nivel_urgencia").eq(filtro_nivel))
     if filtro_estado:
-        filter_expr = filter_expr & Attr("estado").eq(filtro_estado)
+        filtros.append(Attr("estado").eq(filtro_estado))
+
+    # Solo los incidentes del usuario, vía índice por reportante
+    query_kwargs = {
+        "IndexName": "UsuarioCorreoIndex",
+        "KeyConditionExpression": Key("usuario_correo").eq(correo_usuario),
+    }
+    if filtros:
+        filter_expr = filtros[0]
+        for filtro in filtros[1:]:
+            filter_expr = filter_expr & filtro
+        query_kwargs["FilterExpression"] = filter_expr
 
-    scan_kwargs = {"FilterExpression": filter_expr}
     all_items = []
     lek = None
     while True:
         if lek:
-            scan_kwargs["ExclusiveStartKey"] = lek
-        resp = table.scan(**scan_kwargs)
+            query_kwargs["ExclusiveStartKey"] = lek
+        resp = table.query(**query_kwargs)
         all_items.extend(resp.get("Items", []))
         lek = resp.get("LastEvaluatedKey")
         if not lek:
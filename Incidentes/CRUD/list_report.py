@@ -3,13 +3,15 @@ import json
 import math
 import boto3
 from boto3.dynamodb.conditions import Attr
-from CRUD.utils import validar_token
+from comun.autenticacion import validar_evento
+from comun import trazas
 from decimal import Decimal
 
 TABLE_INCIDENTES = os.environ.get("TABLE_INCIDENTES")
 CORS_HEADERS = {"Access-Control-Allow-Origin": "*"}
 
 dynamodb = boto3.resource("dynamodb")
+trazas.instrumentar(dynamodb.meta.client)
 table = dynamodb.Table(TABLE_INCIDENTES)
 
 
@@ -41,14 +43,9 @@ def _safe_int(v, default):
         return default
 
 
+@trazas.con_trazado("listar_incidencias")
 def lambda_handler(event, context):
-    headers = event.get("headers") or {}
-    auth_header = headers.get("Authorization") or headers.get("authorization") or ""
-    if auth_header.lower().startswith("bearer "):
-        auth_header = auth_header.split(" ", 1)[1].strip()
-    token = auth_header
-
-    resultado_validacion = validar_token(token)
+    resultado_validacion = validar_evento(event)
     if not resultado_validacion.get("valido"):
         return _resp(401, {"error": resultado_validacion.get("error")})
 
@@ -2,10 +2,12 @@ import os
 import json
 import boto3
 from decimal import Decimal
-from CRUD.utils import validar_token
+from comun.autenticacion import validar_evento
+from comun import trazas
 from botocore.exceptions import ClientError
 
 dynamodb = boto3.resource('dynamodb')
+trazas.instrumentar(dynamodb.meta.client)
 CORS_HEADERS = { "Access-Control-Allow-Origin": "*" }
 table_name = os.environ.get('TABLE_INCIDENTES')
 incidentes_table = dynamodb.Table(table_name)
@@ -24,14 +26,9 @@ def _convert_decimals(obj):
         return float(obj)
     return obj
 
+@trazas.con_trazado("buscar_incidencia")
 def lambda_handler(event, context):
-    headers = event.get("headers") or {}
-    auth_header = headers.get("Authorization") or headers.get("authorization") or ""
-    if auth_header.lower().startswith("bearer "):
-        auth_header = auth_header.split(" ", 1)[1].strip()
-    token = auth_header
-
-    resultado_validacion = validar_token(token)
+    resultado_validacion = validar_evento(event)
     
     if not resultado_validacion.get("valido"):
         return {
@@ -2,16 +2,16 @@ import os
 import json
 from datetime import datetime, timezone
 import boto3
-from CRUD.utils import validar_token
+from comun.autenticacion import validar_evento
+from comun import trazas
 from botocore.exceptions import ClientError
 from decimal import Decimal
 import uuid
 import requests
-
-lambda_client = boto3.client("lambda")
-LAMBDA_NOTIFY_INCIDENTE = os.environ.get("LAMBDA_NOTIFY_INCIDENTE")
+from CRUD import asignacion
 
 dynamodb = boto3.resource('dynamodb')
+trazas.instrumentar(dynamodb.meta.client)
 table_name = os.environ.get('TABLE_INCIDENTES')
 incidentes_table = dynamodb.Table(table_name)
 
@@ -26,33 +26,63 @@ BREVO_API_KEY = os.environ.get("BREVO_API_KEY")
 EMAIL_FROM = os.environ.get("EMAIL_FROM", "no-reply@example.com")
 
 
-def _notificar_incidente_ws(tipo, titulo, mensaje, incidente_id, destinatarios=None):
+def _guardar_incidente(incidente_prev, incidente_nuevo, deltas):
     """
-    Invoca la Lambda de notificaciones por WebSocket.
+    Guarda el incidente y, en la misma transacción, los contadores de carga
+    de los empleados afectados. La escritura falla si otro admin cambió el
+    estado o la asignación desde que se leyó, o si los contadores siguen
+    fallando tras omitir los de empleados eliminados. Devuelve False en esos
+    casos para que el cliente reintente.
     """
-    if not LAMBDA_NOTIFY_INCIDENTE:
-        print("LAMBDA_NOTIFY_INCIDENTE no configurado, no se envía notificación WS.")
-        return
-
-    payload = {
-        "tipo": tipo,
-        "titulo": titulo,
-        "mensaje": mensaje,
-        "incidente_id": incidente_id,
-    }
+    valores = {":estado_prev": incidente_prev.get("estado")}
+    condicion = "estado = :estado_prev"
+    if incidente_prev.get("empleado_correo"):
+        condicion += " AND empleado_correo = :empleado_prev"
+        valores[":empleado_prev"] = incidente_prev["empleado_correo"]
+    else:
+        condicion += " AND attribute_not_exists(empleado_correo)"
+
+    if not deltas:
+        try:
+            incidentes_table.put_item(
+                Item=incidente_nuevo,
+                ConditionExpression=condicion,
+                ExpressionAttributeValues=valores
+            )
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") != "ConditionalCheckFailedException":
+                raise
+            return False
+        return True
+
+    contadores = [asignacion.incremento(empleado_id, delta) for empleado_id, delta in deltas.items()]
+    for _ in range(2):
+        try:
+            dynamodb.meta.client.transact_write_items(TransactItems=[
+                {
+                    "Put": {
+                        "TableName": table_name,
+                        "Item": incidente_nuevo,
+                        "ConditionExpression": condicion,
+                        "ExpressionAttributeValues": valores
+                    }
+                },
+                *contadores
+            ])
+            return True
+        except ClientError as e:
+            motivos = [r.get("Code") for r in e.response.get("CancellationReasons", [])]
+            if e.response.get("Error", {}).get("Code") != "TransactionCanceledException":
+                raise
+            if motivos[:1] == ["ConditionalCheckFailed"]:
+                return False
+            # Empleados eliminados: su contador ya no existe, se omite
+            fallidos = {i - 1 for i, motivo in enumerate(motivos) if i > 0 and motivo == "ConditionalCheckFailed"}
+            if not fallidos:
+                raise
+            contadores = [op for i, op in enumerate(contadores) if i not in fallidos]
+    return False
 
-    if destinatarios:
-        payload["destinatarios"] = destinatarios
-
-    try:
-        lambda_client.invoke(
-            FunctionName=LAMBDA_NOTIFY_INCIDENTE,
-            InvocationType="Event",
-            Payload=json.dumps(payload, ensure_ascii=False).encode("utf-8")
-        )
-        print("Notificación WS disparada:", payload)
-    except Exception as e:
-        print("Error al invocar notify_incidente:", repr(e))
 
 def _to_dynamodb_numbers(obj):
     """
@@ -106,6 +136,7 @@ def registrar_log_sistema(nivel, mensaje, servicio, contexto=None):
         "nivel": nivel,
         "tipo": "sistema",
         "marca_tiempo": datetime.now(timezone.utc).isoformat(),
+        "correlacion_id": trazas.correlacion_actual(),
         "detalles_sistema": {
             "mensaje": mensaje,
             "servicio": servicio,
@@ -139,6 +170,7 @@ def registrar_log_auditoria(
         "nivel": nivel,
         "tipo": "auditoria",
         "marca_tiempo": datetime.now(timezone.utc).isoformat(),
+        "correlacion_id": trazas.correlacion_actual(),
         "detalles_auditoria": {
             "usuario_correo": usuario_correo,
             "entidad": entidad,
@@ -201,7 +233,8 @@ def enviar_correo_cambio_estado(correo_destino, incidente, estado_nuevo):
     }
 
     try:
-        resp = requests.post(url, json=payload, headers=headers, timeout=10)
+        with trazas.span("http", "brevo.smtp_email"):
+            resp = requests.post(url, json=payload, headers=headers, timeout=10)
         print(
             "Correo de cambio de estado enviado. Status:",
             resp.status_code,
@@ -212,6 +245,7 @@ def enviar_correo_cambio_estado(correo_destino, incidente, estado_nuevo):
         print("Error al enviar correo de cambio de estado:", repr(e))
 
 
+@trazas.con_trazado("cambiar_estado_incidencia")
 def lambda_handler(event, context):
     registrar_log_sistema(
         nivel="INFO",
@@ -220,13 +254,7 @@ def lambda_handler(event, context):
         contexto={"request_id": getattr(context, "aws_request_id", None)}
     )
 
-    headers = event.get("headers") or {}
-    auth_header = headers.get("Authorization") or headers.get("authorization") or ""
-    if auth_header.lower().startswith("bearer "):
-        auth_header = auth_header.split(" ", 1)[1].strip()
-    token = auth_header
-
-    resultado_validacion = validar_token(token)
+    resultado_validacion = validar_evento(event)
     
     if not resultado_validacion.get("valido"):
         registrar_log_sistema(
@@ -307,9 +335,10 @@ def lambda_handler(event, context):
         }
 
     empleado_correo = None
+    auto_asignar = body.get("auto_asignar") is True
     if estado_nuevo == "en_progreso":
         empleado_correo = body.get("empleado_correo")
-        if not empleado_correo:
+        if not empleado_correo and not auto_asignar:
             registrar_log_sistema(
                 nivel="WARNING",
                 mensaje="Falta 'empleado_correo' cuando estado es 'en_progreso'",
@@ -320,7 +349,7 @@ def lambda_handler(event, context):
                 "statusCode": 400,
                 "headers": CORS_HEADERS,
                 "body": json.dumps({
-                    "message": "El campo 'empleado_correo' es obligatorio cuando el estado es 'en_progreso'"
+                    "message": "El campo 'empleado_correo' (o 'auto_asignar': true) es obligatorio cuando el estado es 'en_progreso'"
                 })
             }
 
@@ -357,12 +386,51 @@ def lambda_handler(event, context):
     incidente_nuevo = dict(incidente_actual)
     incidente_nuevo["estado"] = estado_nuevo
     incidente_nuevo["updated_at"] = datetime.now(timezone.utc).isoformat()
+    incidente_nuevo["correlacion_id"] = trazas.correlacion_actual()
 
     if estado_nuevo == "en_progreso":
+        if empleado_correo:
+            empleado_id = asignacion.id_por_correo(empleado_correo)
+        else:
+            elegido = asignacion.elegir(incidente_actual.get("tipo"))
+            if elegido is None:
+                registrar_log_sistema(
+                    nivel="WARNING",
+                    mensaje="Sin empleados activos para asignar automáticamente",
+                    servicio="cambiar_estado_incidencia",
+                    contexto={"incidente_id": incidente_id, "tipo": incidente_actual.get("tipo")}
+                )
+                return {
+                    "statusCode": 409,
+                    "headers": CORS_HEADERS,
+                    "body": json.dumps({"message": "No hay empleados activos del área para asignar"})
+                }
+            empleado_correo = elegido["correo"]
+            empleado_id = elegido["empleado_id"]
+
         incidente_nuevo["empleado_correo"] = empleado_correo
+        if empleado_id:
+            incidente_nuevo["empleado_id"] = empleado_id
+        else:
+            incidente_nuevo.pop("empleado_id", None)
+
+    deltas = asignacion.cambios_de_carga(incidente_prev, incidente_nuevo)
 
     try:
-        incidentes_table.put_item(Item=incidente_nuevo)
+        if not _guardar_incidente(incidente_prev, incidente_nuevo, deltas):
+            registrar_log_sistema(
+                nivel="WARNING",
+                mensaje="El incidente cambió durante la actualización",
+                servicio="cambiar_estado_incidencia",
+                contexto={"incidente_id": incidente_id}
+            )
+            return {
+                "statusCode": 409,
+                "headers": CORS_HEADERS,
+                "body": json.dumps({"message": "El incidente fue modificado por otra solicitud, intenta nuevamente"})
+            }
+        for empleado_id_afectado, delta in deltas.items():
+            asignacion.registrar_cambio(empleado_id_afectado, delta)
 
         registrar_log_auditoria(
             usuario_correo=usuario_autenticado["correo"],
@@ -392,22 +460,14 @@ def lambda_handler(event, context):
             estado_nuevo=estado_nuevo
         )
 
-        mensaje_notif = f"El incidente {incidente_id} cambió su estado a '{estado_nuevo}'."
-
-        _notificar_incidente_ws(
-            tipo="incidente_actualizado",
-            titulo="Incidente actualizado",
-            mensaje=mensaje_notif,
-            incidente_id=incidente_id,
-        )
-
         return {
             "statusCode": 200,
             "headers": CORS_HEADERS,
             "body": json.dumps({
                 "message": "Estado actualizado correctamente",
                 "incidente_id": incidente_id,
-                "nuevo_estado": estado_nuevo
+                "nuevo_estado": estado_nuevo,
+                "empleado_correo": incidente_nuevo.get("empleado_correo")
             })
         }
     except ClientError as e:
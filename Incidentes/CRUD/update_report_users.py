@@ -3,13 +3,16 @@ import json
 import base64
 import boto3
 from datetime import datetime, timezone
-from CRUD.utils import validar_token
+from comun.autenticacion import validar_evento
+from comun import trazas
 from botocore.exceptions import ClientError
 from decimal import Decimal, InvalidOperation
 import uuid 
 
 dynamodb = boto3.resource('dynamodb')
 s3 = boto3.client('s3')
+trazas.instrumentar(dynamodb.meta.client)
+trazas.instrumentar(s3)
 
 table_name = os.environ.get('TABLE_INCIDENTES')
 incidentes_table = dynamodb.Table(table_name)
@@ -77,6 +80,7 @@ def registrar_log_sistema(nivel, mensaje, servicio, contexto=None):
         "nivel": nivel,
         "tipo": "sistema",
         "marca_tiempo": datetime.now(timezone.utc).isoformat(),
+        "correlacion_id": trazas.correlacion_actual(),
         "detalles_sistema": {
             "mensaje": mensaje,
             "servicio": servicio,
@@ -110,6 +114,7 @@ def registrar_log_auditoria(
         "nivel": nivel,
         "tipo": "auditoria",
         "marca_tiempo": datetime.now(timezone.utc).isoformat(),
+        "correlacion_id": trazas.correlacion_actual(),
         "detalles_auditoria": {
             "usuario_correo": usuario_correo,
             "entidad": entidad,
@@ -122,6 +127,7 @@ def registrar_log_auditoria(
 
     _guardar_log_en_dynamodb(registro)
 
+@trazas.con_trazado("actualizar_incidencia")
 def lambda_handler(event, context):
     registrar_log_sistema(
         nivel="INFO",
@@ -130,12 +136,7 @@ def lambda_handler(event, context):
         contexto={"request_id": getattr(context, "aws_request_id", None)}
     )
 
-    headers = event.get("headers") or {}
-    auth_header = headers.get("Authorization") or headers.get("authorization") or ""
-    if auth_header.lower().startswith("bearer "):
-        auth_header = auth_header.split(" ", 1)[1].strip()
-    token = auth_header
-    resultado_validacion = validar_token(token)
+    resultado_validacion = validar_evento(event)
 
     if not resultado_validacion.get("valido"):
         registrar_log_sistema(
@@ -396,6 +397,7 @@ def lambda_handler(event, context):
         "nivel_urgencia": body["nivel_urgencia"],
         "evidencias": [evidencia_url] if evidencia_url else incidente_actual.get("evidencias", []),
         "updated_at": datetime.now(timezone.utc).isoformat(),
+        "correlacion_id": trazas.correlacion_actual(),
     })
 
     if coordenadas is not None:
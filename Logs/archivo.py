@@ -0,0 +1,285 @@
+import os
+import gzip
+import json
+import time
+from datetime import datetime, timezone, timedelta
+from decimal import Decimal
+
+import boto3
+from botocore.exceptions import ClientError
+
+LOGS_ARCHIVO_BUCKET = os.environ.get("LOGS_ARCHIVO_BUCKET")
+LOGS_ARCHIVO_PREFIJO = os.environ.get("LOGS_ARCHIVO_PREFIJO", "logs-archivo").strip("/")
+LOGS_ARCHIVAR_TRAS_DIAS = int(os.environ.get("LOGS_ARCHIVAR_TRAS_DIAS", "7"))
+
+# Un manifiesto por día (manifiesto/fecha=YYYY-MM-DD.json) con los segmentos
+# de esa fecha: cada escritura toca solo su día y el listado lee solo los días
+# que recorre. El antiguo manifiesto.json único se migra en la compactación.
+MANIFIESTO_PREFIJO = f"{LOGS_ARCHIVO_PREFIJO}/manifiesto"
+MANIFIESTO_UNICO_KEY = f"{LOGS_ARCHIVO_PREFIJO}/manifiesto.json"
+# Hasta qué marca_tiempo de cada nivel ya se compactó la tabla.
+AVANCE_KEY = f"{LOGS_ARCHIVO_PREFIJO}/compactacion.json"
+MANIFIESTO_REINTENTOS = 5
+
+# Registros por bloque gzip dentro de un segmento. Cada bloque es un miembro
+# gzip independiente, así que se puede leer con un GET por rango de bytes.
+REGISTROS_POR_BLOQUE = int(os.environ.get("LOGS_ARCHIVO_BLOQUE", "500"))
+MANIFIESTO_CACHE_SEGUNDOS = int(os.environ.get("LOGS_MANIFIESTO_CACHE_SEGUNDOS", "60"))
+MANIFIESTO_CACHE_MAX = 64
+
+s3 = boto3.client("s3")
+
+_manifiesto_cache = {}  # fecha -> (leido_en, manifiesto)
+_primer_dia_cache = {"leido_en": 0.0, "valor": None}
+
+
+def _decimal_default(obj):
+    """Convierte Decimal a tipo serializable JSON"""
+    if isinstance(obj, Decimal):
+        return int(obj) if obj % 1 == 0 else float(obj)
+    raise TypeError(f"No serializable type: {type(obj)}")
+
+
+def _codigo(error):
+    return error.response.get("Error", {}).get("Code")
+
+
+def _manifiesto_key(fecha):
+    return f"{MANIFIESTO_PREFIJO}/fecha={fecha}.json"
+
+
+def ultimo_dia_archivable(ahora=None):
+    """Fecha más reciente que puede tener registros archivados (la del corte de compactación)."""
+    ahora = ahora or datetime.now(timezone.utc)
+    return (ahora - timedelta(days=LOGS_ARCHIVAR_TRAS_DIAS)).strftime("%Y-%m-%d")
+
+
+def _leer_manifiesto_s3(key):
+    """(manifiesto, etag) de S3; (None, None) si no existe."""
+    try:
+        resp = s3.get_object(Bucket=LOGS_ARCHIVO_BUCKET, Key=key)
+    except ClientError as e:
+        if _codigo(e) not in ("NoSuchKey", "404"):
+            raise
+        return None, None
+    return json.loads(resp["Body"].read()), resp["ETag"]
+
+
+def leer_manifiesto(fecha, usar_cache=True):
+    """
+    Segmentos archivados de una fecha. En contenedores calientes se reutiliza
+    durante MANIFIESTO_CACHE_SEGUNDOS.
+    """
+    if not LOGS_ARCHIVO_BUCKET:
+        return {"fecha": fecha, "segmentos": []}
+
+    ahora = time.time()
+    cacheado = _manifiesto_cache.get(fecha)
+    if usar_cache and cacheado and ahora - cacheado[0] < MANIFIESTO_CACHE_SEGUNDOS:
+        return cacheado[1]
+
+    manifiesto, _ = _leer_manifiesto_s3(_manifiesto_key(fecha))
+    manifiesto = manifiesto or {"fecha": fecha, "segmentos": []}
+    if len(_manifiesto_cache) >= MANIFIESTO_CACHE_MAX:
+        _manifiesto_cache.clear()
+    _manifiesto_cache[fecha] = (ahora, manifiesto)
+    return manifiesto
+
+
+def registrar_segmentos(fecha, segmentos):
+    """
+    Agrega segmentos al manifiesto de su fecha. La escritura es condicional
+    sobre el ETag leído (If-None-Match si el día es nuevo): si otra ejecución
+    lo cambió entretanto, se relee y se reintenta.
+    """
+    key = _manifiesto_key(fecha)
+    for _ in range(MANIFIESTO_REINTENTOS):
+        manifiesto, etag = _leer_manifiesto_s3(key)
+        manifiesto = manifiesto or {"fecha": fecha, "segmentos": []}
+        conocidas = {s["key"] for s in manifiesto["segmentos"]}
+        manifiesto["segmentos"].extend(s for s in segmentos if s["key"] not in conocidas)
+
+        condicion = {"IfMatch": etag} if etag else {"IfNoneMatch": "*"}
+        try:
+            s3.put_object(
+                Bucket=LOGS_ARCHIVO_BUCKET,
+                Key=key,
+                Body=json.dumps(manifiesto, ensure_ascii=False).encode("utf-8"),
+                ContentType="application/json",
+                **condicion,
+            )
+        except ClientError as e:
+            if _codigo(e) not in ("PreconditionFailed", "ConditionalRequestConflict"):
+                raise
+            continue
+        _manifiesto_cache[fecha] = (time.time(), manifiesto)
+        return manifiesto
+    raise RuntimeError(f"No se pudo actualizar el manifiesto de {fecha} tras {MANIFIESTO_REINTENTOS} intentos")
+
+
+def migrar_manifiesto_unico():
+    """Reparte el antiguo manifiesto.json en manifiestos por día y lo borra."""
+    if not LOGS_ARCHIVO_BUCKET:
+        return 0
+    manifiesto, _ = _leer_manifiesto_s3(MANIFIESTO_UNICO_KEY)
+    if manifiesto is None:
+        return 0
+
+    por_fecha = {}
+    for segmento in manifiesto.get("segmentos", []):
+        por_fecha.setdefault(segmento["fecha"], []).append(segmento)
+    for fecha, segmentos in sorted(por_fecha.items()):
+        registrar_segmentos(fecha, segmentos)
+    s3.delete_object(Bucket=LOGS_ARCHIVO_BUCKET, Key=MANIFIESTO_UNICO_KEY)
+    return len(por_fecha)
+
+
+def leer_avance():
+    """{nivel: marca_tiempo} hasta donde llegó la compactación; vacío si nunca corrió."""
+    if not LOGS_ARCHIVO_BUCKET:
+        return {}
+    avance, _ = _leer_manifiesto_s3(AVANCE_KEY)
+    return (avance or {}).get("niveles", {})
+
+
+def guardar_avance(niveles):
+    """Guarda el avance por nivel. Solo lo escribe la compactación programada."""
+    s3.put_object(
+        Bucket=LOGS_ARCHIVO_BUCKET,
+        Key=AVANCE_KEY,
+        Body=json.dumps({"niveles": niveles}, ensure_ascii=False).encode("utf-8"),
+        ContentType="application/json",
+    )
+
+
+def primer_dia_archivado():
+    """Fecha del manifiesto más antiguo (las claves se listan en orden), o None."""
+    if not LOGS_ARCHIVO_BUCKET:
+        return None
+    ahora = time.time()
+    if _primer_dia_cache["valor"] and ahora - _primer_dia_cache["leido_en"] < MANIFIESTO_CACHE_SEGUNDOS:
+        return _primer_dia_cache["valor"]
+
+    resp = s3.list_objects_v2(Bucket=LOGS_ARCHIVO_BUCKET, Prefix=f"{MANIFIESTO_PREFIJO}/fecha=", MaxKeys=1)
+    contenido = resp.get("Contents") or []
+    primero = contenido[0]["Key"].rsplit("fecha=", 1)[1][:10] if contenido else None
+    _primer_dia_cache.update(leido_en=ahora, valor=primero)
+    return primero
+
+
+def escribir_segmento(fecha, nivel, registros, sufijo):
+    """
+    Sube un segmento NDJSON comprimido con gzip para una fecha y nivel.
+    Los registros deben venir ordenados por marca_tiempo.
+
+    Returns:
+        dict: entrada del manifiesto con los rangos de bytes de cada bloque.
+    """
+    key = f"{LOGS_ARCHIVO_PREFIJO}/fecha={fecha}/nivel={nivel}/{sufijo}.ndjson.gz"
+
+    cuerpo = bytearray()
+    bloques = []
+    for i in range(0, len(registros), REGISTROS_POR_BLOQUE):
+        bloque = registros[i:i + REGISTROS_POR_BLOQUE]
+        lineas = "".join(
+            json.dumps(r, ensure_ascii=False, default=_decimal_default) + "\n"
+            for r in bloque
+        )
+        comprimido = gzip.compress(lineas.encode("utf-8"))
+        inicio = len(cuerpo)
+        cuerpo.extend(comprimido)
+        bloques.append({
+            "inicio": inicio,
+            "fin": len(cuerpo) - 1,
+            "desde": bloque[0]["marca_tiempo"],
+            "hasta": bloque[-1]["marca_tiempo"],
+            "registros": len(bloque),
+        })
+
+    s3.put_object(
+        Bucket=LOGS_ARCHIVO_BUCKET,
+        Key=key,
+        Body=bytes(cuerpo),
+        ContentType="application/gzip",
+    )
+
+    return {
+        "key": key,
+        "fecha": fecha,
+        "nivel": nivel,
+        "registros": len(registros),
+        "bytes": len(cuerpo),
+        "desde": registros[0]["marca_tiempo"],
+        "hasta": registros[-1]["marca_tiempo"],
+        "bloques": bloques,
+    }
+
+
+def _leer_bloque(key, bloque, desde, hasta):
+    resp = s3.get_object(
+        Bucket=LOGS_ARCHIVO_BUCKET,
+        Key=key,
+        Range=f"bytes={bloque['inicio']}-{bloque['fin']}",
+    )
+    contenido = gzip.decompress(resp["Body"].read()).decode("utf-8")
+    registros = []
+    for linea in contenido.splitlines():
+        if not linea:
+            continue
+        registro = json.loads(linea)
+        marca = registro.get("marca_tiempo", "")
+        if desde and marca < desde:
+            continue
+        if hasta and marca > hasta:
+            continue
+        registros.append(registro)
+    return registros
+
+
+def _orden(registro):
+    return registro.get("marca_tiempo", ""), registro.get("registro_id", "")
+
+
+def _recorrer_dia(fecha, desde, hasta, nivel):
+    """Registros archivados de un día, del más reciente al más antiguo."""
+    bloques = []
+    for segmento in leer_manifiesto(fecha).get("segmentos", []):
+        if nivel and segmento["nivel"] != nivel:
+            continue
+        for bloque in segmento["bloques"]:
+            if desde and bloque["hasta"] < desde:
+                continue
+            if hasta and bloque["desde"] > hasta:
+                continue
+            bloques.append((segmento["key"], bloque))
+
+    # Los bloques se leen por 'hasta' descendente; un registro se entrega cuando
+    # ningún bloque pendiente puede contener otro más reciente.
+    bloques.sort(key=lambda kb: kb[1]["hasta"], reverse=True)
+    pendientes = []
+    for i, (key, bloque) in enumerate(bloques):
+        pendientes.extend(_leer_bloque(key, bloque, desde, hasta))
+        pendientes.sort(key=_orden)
+        tope = bloques[i + 1][1]["hasta"] if i + 1 < len(bloques) else None
+        while pendientes and (tope is None or pendientes[-1]["marca_tiempo"] > tope):
+            yield pendientes.pop()
+
+
+def recorrer_archivo(desde=None, hasta=None, nivel=None):
+    """
+    Genera los registros archivados con marca_tiempo en [desde, hasta], del más
+    reciente al más antiguo. Lee los manifiestos día a día y solo los bloques
+    (GET por rango de bytes) que se van consumiendo.
+    """
+    if not LOGS_ARCHIVO_BUCKET:
+        return
+    ultimo = min(hasta[:10], ultimo_dia_archivable()) if hasta else ultimo_dia_archivable()
+    primero = desde[:10] if desde else primer_dia_archivado()
+    if not primero or primero > ultimo:
+        return
+
+    dia = datetime.strptime(ultimo, "%Y-%m-%d")
+    fin = datetime.strptime(primero, "%Y-%m-%d")
+    while dia >= fin:
+        yield from _recorrer_dia(dia.strftime("%Y-%m-%d"), desde, hasta, nivel)
+        dia -= timedelta(days=1)
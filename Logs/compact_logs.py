@@ -0,0 +1,154 @@
+import os
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone, timedelta
+
+import boto3
+from boto3.dynamodb.conditions import Attr, Key
+
+from archivo import (
+    LOGS_ARCHIVAR_TRAS_DIAS,
+    LOGS_ARCHIVO_BUCKET,
+    escribir_segmento,
+    guardar_avance,
+    leer_avance,
+    migrar_manifiesto_unico,
+    registrar_segmentos,
+)
+from metricas import NIVELES
+
+TABLE_LOGS = os.environ.get("TABLE_LOGS")
+LOGS_RETENCION_DIAS = int(os.environ.get("LOGS_RETENCION_DIAS", "14"))
+LOGS_COMPACTACION_MAX = int(os.environ.get("LOGS_COMPACTACION_MAX", "20000"))
+# Margen mínimo antes de que expire un registro recién marcado.
+TTL_MARGEN_SEGUNDOS = 3600
+# Sin bucket solo se asigna TTL a lo escrito en las últimas horas; lo anterior
+# ya lo cubrieron las corridas previas (una por hora).
+TTL_VENTANA_HORAS = 24
+
+dynamodb = boto3.resource("dynamodb")
+table = dynamodb.Table(TABLE_LOGS)
+
+
+def _parse_marca(marca):
+    try:
+        dt = datetime.fromisoformat(marca)
+    except (TypeError, ValueError):
+        return datetime.now(timezone.utc)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt
+
+
+def _calcular_ttl(marca_dt, ahora):
+    ttl = int((marca_dt + timedelta(days=LOGS_RETENCION_DIAS)).timestamp())
+    return max(ttl, int(ahora.timestamp()) + TTL_MARGEN_SEGUNDOS)
+
+
+def _pendientes(nivel, desde, hasta, filtro):
+    """Registros de 'nivel' con marca_tiempo en [desde, hasta) que cumplen 'filtro', en orden ascendente."""
+    rango = Key("marca_tiempo").between(desde, hasta) if desde else Key("marca_tiempo").lt(hasta)
+    query_kwargs = {
+        "IndexName": "NivelMarcaIndex",
+        "KeyConditionExpression": Key("nivel").eq(nivel) & rango,
+        "FilterExpression": filtro,
+    }
+    while True:
+        resp = table.query(**query_kwargs)
+        for item in resp.get("Items", []):
+            if item.get("marca_tiempo", "") < hasta:
+                yield item
+        lek = resp.get("LastEvaluatedKey")
+        if not lek:
+            return
+        query_kwargs["ExclusiveStartKey"] = lek
+
+
+def lambda_handler(event, context):
+    """
+    Compactación programada de la tabla de logs. Consulta NivelMarcaIndex
+    nivel por nivel, solo en el rango de marca_tiempo pendiente:
+    - con LOGS_ARCHIVO_BUCKET, archiva en S3 (NDJSON gzip por fecha y nivel)
+      los registros con más de LOGS_ARCHIVAR_TRAS_DIAS días y les asigna 'ttl'.
+      Cada nivel retoma desde el avance guardado en S3 por la corrida anterior;
+    - sin bucket, solo asigna 'ttl' a los registros de las últimas
+      TTL_VENTANA_HORAS horas que no lo tienen.
+    """
+    ahora = datetime.now(timezone.utc)
+
+    if LOGS_ARCHIVO_BUCKET:
+        migrar_manifiesto_unico()
+        corte = (ahora - timedelta(days=LOGS_ARCHIVAR_TRAS_DIAS)).strftime("%Y-%m-%dT%H:%M:%S")
+        filtro = Attr("archivado").not_exists()
+        avance = leer_avance()
+    else:
+        print("LOGS_ARCHIVO_BUCKET no configurado, solo se asigna TTL.")
+        corte = ahora.strftime("%Y-%m-%dT%H:%M:%S")
+        filtro = Attr("ttl").not_exists()
+        inicio = (ahora - timedelta(hours=TTL_VENTANA_HORAS)).strftime("%Y-%m-%dT%H:%M:%S")
+        avance = {nivel: inicio for nivel in NIVELES}
+
+    solo_ttl = []
+    por_archivar = defaultdict(list)
+    total = 0
+    nuevo_avance = dict(avance)
+
+    for nivel in NIVELES:
+        if total >= LOGS_COMPACTACION_MAX:
+            break
+        nuevo_avance[nivel] = corte
+        for item in _pendientes(nivel, avance.get(nivel), corte, filtro):
+            if total >= LOGS_COMPACTACION_MAX:
+                # Se retoma desde este registro; los ya marcados no pasan el filtro
+                nuevo_avance[nivel] = item["marca_tiempo"]
+                break
+            total += 1
+            marca_dt = _parse_marca(item.get("marca_tiempo"))
+            if "ttl" not in item:
+                item["ttl"] = _calcular_ttl(marca_dt, ahora)
+            if LOGS_ARCHIVO_BUCKET:
+                por_archivar[(marca_dt.strftime("%Y-%m-%d"), nivel)].append(item)
+            else:
+                solo_ttl.append(item)
+
+    segmentos = []
+    if por_archivar:
+        sufijo = f"{ahora.strftime('%Y%m%dT%H%M%SZ')}-{uuid.uuid4().hex[:8]}"
+        por_fecha = defaultdict(list)
+        for (fecha, nivel), items in sorted(por_archivar.items()):
+            items.sort(key=lambda r: r.get("marca_tiempo", ""))
+            registros = [
+                {k: v for k, v in item.items() if k not in ("ttl", "archivado")}
+                for item in items
+            ]
+            segmento = escribir_segmento(fecha, nivel, registros, sufijo)
+            segmentos.append(segmento)
+            por_fecha[fecha].append(segmento)
+
+        # Los manifiestos se publican antes de marcar los registros: si la Lambda
+        # falla en medio, en la siguiente corrida se re-archivan (list_logs
+        # descarta duplicados por registro_id).
+        for fecha, del_dia in sorted(por_fecha.items()):
+            registrar_segmentos(fecha, del_dia)
+
+    archivados = 0
+    with table.batch_writer() as batch:
+        for items in por_archivar.values():
+            for item in items:
+                item["archivado"] = True
+                batch.put_item(Item=item)
+                archivados += 1
+        for item in solo_ttl:
+            batch.put_item(Item=item)
+
+    if LOGS_ARCHIVO_BUCKET:
+        guardar_avance(nuevo_avance)
+
+    resumen = {
+        "revisados": total,
+        "ttl_asignados": len(solo_ttl),
+        "archivados": archivados,
+        "segmentos": len(segmentos),
+    }
+    print("Compactación de logs:", resumen)
+    return resumen
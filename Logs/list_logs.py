@@ -1,12 +1,21 @@
 import os
 import json
 import math
+import heapq
+import base64
+import itertools
 import boto3
-from boto3.dynamodb.conditions import Attr
-from utils import validar_token
+from boto3.dynamodb.conditions import Attr, Key
+from comun.autenticacion import validar_evento
+from archivo import recorrer_archivo, ultimo_dia_archivable
+from metricas import NIVELES
 from decimal import Decimal
 
 TABLE_LOGS = os.environ.get("TABLE_LOGS")
+# Índice por nivel ordenado por marca_tiempo: los listados por rango consultan
+# solo el tramo pedido en lugar de recorrer la tabla.
+INDICE_NIVEL_MARCA = "NivelMarcaIndex"
+LOTE_CONSULTA = 100
 CORS_HEADERS = {
     "Access-Control-Allow-Origin": "*"
 }
@@ -40,14 +49,128 @@ def _safe_int(v, default):
     except Exception:
         return default
 
-def lambda_handler(event, context):
-    headers = event.get("headers") or {}
-    auth_header = headers.get("Authorization") or headers.get("authorization") or ""
-    if auth_header.lower().startswith("bearer "):
-        auth_header = auth_header.split(" ", 1)[1].strip()
-    token = auth_header
+def _normalizar_rango(desde, hasta):
+    """
+    Acepta fechas (YYYY-MM-DD) o marcas ISO. Una fecha en 'hasta' incluye todo el día.
+    """
+    desde = desde if isinstance(desde, str) and desde else None
+    hasta = hasta if isinstance(hasta, str) and hasta else None
+    if hasta and len(hasta) == 10:
+        hasta = hasta + "T23:59:59.999999"
+    return desde, hasta
+
+
+def _orden(registro):
+    return registro.get("marca_tiempo", ""), registro.get("registro_id", "")
 
-    resultado_validacion = validar_token(token)
+
+def _codificar_cursor(registro):
+    crudo = json.dumps({"marca_tiempo": registro.get("marca_tiempo"), "registro_id": registro.get("registro_id")})
+    return base64.urlsafe_b64encode(crudo.encode("utf-8")).decode("ascii")
+
+
+def _decodificar_cursor(cursor):
+    """(marca_tiempo, registro_id) del último registro entregado, o None si el cursor no es válido."""
+    try:
+        datos = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return str(datos["marca_tiempo"]), str(datos["registro_id"])
+    except Exception:
+        return None
+
+
+def _recorrer_tabla(table, nivel, desde, hasta):
+    """Registros aún no archivados de un nivel en [desde, hasta], del más reciente al más antiguo."""
+    condicion = Key("nivel").eq(nivel)
+    if desde and hasta:
+        condicion = condicion & Key("marca_tiempo").between(desde, hasta)
+    elif desde:
+        condicion = condicion & Key("marca_tiempo").gte(desde)
+    elif hasta:
+        condicion = condicion & Key("marca_tiempo").lte(hasta)
+
+    query_kwargs = {
+        "IndexName": INDICE_NIVEL_MARCA,
+        "KeyConditionExpression": condicion,
+        "FilterExpression": Attr("archivado").not_exists(),
+        "ScanIndexForward": False,
+        "Limit": LOTE_CONSULTA,
+    }
+    while True:
+        resp = table.query(**query_kwargs)
+        for item in resp.get("Items", []):
+            item.pop("ttl", None)
+            yield item
+        lek = resp.get("LastEvaluatedKey")
+        if not lek:
+            return
+        query_kwargs["ExclusiveStartKey"] = lek
+
+
+def _recorrer_rango(table, desde, hasta, nivel):
+    """
+    Tabla y archivo unidos en orden descendente por marca_tiempo. El archivo
+    solo se abre cuando los registros vivos bajan del último día archivable.
+    """
+    niveles = [nivel] if nivel else NIVELES
+    vivos = heapq.merge(
+        *(_recorrer_tabla(table, n, desde, hasta) for n in niveles),
+        key=_orden, reverse=True
+    )
+    tope_archivo = ultimo_dia_archivable() + "T23:59:59.999999"
+
+    siguiente = next(vivos, None)
+    while siguiente is not None and siguiente.get("marca_tiempo", "") > tope_archivo:
+        yield siguiente
+        siguiente = next(vivos, None)
+    if desde and desde > tope_archivo:
+        fuentes = []
+    else:
+        fuentes = [recorrer_archivo(desde, hasta, nivel)]
+    if siguiente is not None:
+        fuentes.append(itertools.chain([siguiente], vivos))
+    yield from heapq.merge(*fuentes, key=_orden, reverse=True)
+
+
+def _listar_rango(table, desde, hasta, nivel, page, size, cursor):
+    """
+    Lista logs en un rango de fechas combinando la tabla (datos recientes)
+    con los segmentos archivados en S3 (historial). Pagina con 'cursor' (el
+    de la respuesta anterior); sin cursor, 'page' salta page * size registros.
+    Solo se leen las páginas del índice y los bloques del archivo necesarios.
+    """
+    ultimo = None
+    if cursor:
+        ultimo = _decodificar_cursor(cursor)
+        if ultimo is None:
+            return _resp(400, {"error": "cursor inválido"})
+        hasta = ultimo[0] if not hasta or ultimo[0] < hasta else hasta
+        page = 0
+
+    vistos = set()
+    registros = (
+        r for r in _recorrer_rango(table, desde, hasta, nivel)
+        if ultimo is None or _orden(r) < ultimo
+    )
+    unicos = (
+        r for r in registros
+        if r.get("registro_id") not in vistos and not vistos.add(r.get("registro_id"))
+    )
+    items = list(itertools.islice(unicos, page * size, (page + 1) * size + 1))
+    hay_mas = len(items) > size
+    items = items[:size]
+    for item in items:
+        item.pop("archivado", None)
+
+    return _resp(200, {
+        "contents": items,
+        "page": page,
+        "size": size,
+        "cursor": _codificar_cursor(items[-1]) if hay_mas else None,
+        "hasMore": hay_mas
+    })
+
+def lambda_handler(event, context):
+    resultado_validacion = validar_evento(event)
 
     if not resultado_validacion.get("valido"):
         return _resp(401, {"error": resultado_validacion.get("error")})
@@ -71,10 +194,18 @@ def lambda_handler(event, context):
     if page < 0:
         page = 0
 
+    desde, hasta = _normalizar_rango(body.get("desde"), body.get("hasta"))
+    nivel = body.get("nivel")
+
     ddb = boto3.resource("dynamodb")
     table = ddb.Table(TABLE_LOGS)
 
+    if desde or hasta or body.get("cursor"):
+        return _listar_rango(table, desde, hasta, nivel, page, size, body.get("cursor"))
+
     filter_expr = None
+    if nivel:
+        filter_expr = Attr("nivel").eq(nivel)
 
     total = 0
     count_args = {
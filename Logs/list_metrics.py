@@ -0,0 +1,97 @@
+import json
+from datetime import datetime, timezone, timedelta
+
+import boto3
+from boto3.dynamodb.conditions import Key
+
+from comun.autenticacion import validar_evento
+from metricas import TABLE_METRICAS_LOGS, agrupar, punto_serie
+
+CORS_HEADERS = {
+    "Access-Control-Allow-Origin": "*"
+}
+
+# Máximo de puntos por respuesta (24 h a un minuto).
+MAX_MINUTOS = 1440
+
+
+def _resp(code, body):
+    return {
+        "statusCode": code,
+        "headers": CORS_HEADERS,
+        "body": json.dumps(body, ensure_ascii=False)
+    }
+
+
+def _safe_int(v, default):
+    try:
+        return int(v)
+    except Exception:
+        return default
+
+
+def _a_minuto(valor):
+    """Acepta 'YYYY-MM-DDTHH:MM' o cualquier marca ISO y la recorta al minuto."""
+    try:
+        dt = datetime.fromisoformat(valor)
+    except (TypeError, ValueError):
+        return None
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt.replace(second=0, microsecond=0)
+
+
+def lambda_handler(event, context):
+    resultado_validacion = validar_evento(event)
+    if not resultado_validacion.get("valido"):
+        return _resp(401, {"error": resultado_validacion.get("error")})
+
+    if resultado_validacion.get("rol") not in ["personal_administrativo", "autoridad"]:
+        return _resp(403, {"error": "No tienes permisos para ver métricas"})
+
+    params = event.get("queryStringParameters") or {}
+    servicio = params.get("servicio")
+    if not servicio:
+        return _resp(400, {"error": "El parámetro 'servicio' es obligatorio"})
+
+    ahora = datetime.now(timezone.utc).replace(tzinfo=None, second=0, microsecond=0)
+    hasta = _a_minuto(params.get("hasta")) if params.get("hasta") else ahora
+    if hasta is None:
+        return _resp(400, {"error": "Formato de 'hasta' inválido (ISO 8601)"})
+    desde = _a_minuto(params.get("desde")) if params.get("desde") else hasta - timedelta(hours=1)
+    if desde is None:
+        return _resp(400, {"error": "Formato de 'desde' inválido (ISO 8601)"})
+    if desde > hasta:
+        return _resp(400, {"error": "'desde' debe ser anterior a 'hasta'"})
+    if (hasta - desde) > timedelta(minutes=MAX_MINUTOS * 30):
+        return _resp(400, {"error": "El rango máximo es de 30 días"})
+
+    paso = max(1, _safe_int(params.get("paso"), 1))
+    # Ajusta el paso para no devolver más de MAX_MINUTOS puntos
+    minutos = int((hasta - desde).total_seconds() // 60) + 1
+    paso = max(paso, -(-minutos // MAX_MINUTOS))
+
+    table = boto3.resource("dynamodb").Table(TABLE_METRICAS_LOGS)
+    condicion = Key("servicio").eq(servicio) & Key("minuto").between(
+        desde.strftime("%Y-%m-%dT%H:%M"), hasta.strftime("%Y-%m-%dT%H:%M")
+    )
+
+    items = []
+    qargs = {"KeyConditionExpression": condicion}
+    while True:
+        resp = table.query(**qargs)
+        items.extend(resp.get("Items", []))
+        lek = resp.get("LastEvaluatedKey")
+        if not lek:
+            break
+        qargs["ExclusiveStartKey"] = lek
+
+    serie = [punto_serie(item) for item in agrupar(items, paso)]
+
+    return _resp(200, {
+        "servicio": servicio,
+        "desde": desde.strftime("%Y-%m-%dT%H:%M"),
+        "hasta": hasta.strftime("%Y-%m-%dT%H:%M"),
+        "paso_minutos": paso,
+        "serie": serie
+    })
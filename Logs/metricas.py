@@ -0,0 +1,208 @@
+import os
+import time
+import hashlib
+from datetime import datetime, timezone, timedelta
+from decimal import Decimal
+
+TABLE_METRICAS_LOGS = os.environ.get("TABLE_METRICAS_LOGS")
+METRICAS_RETENCION_DIAS = int(os.environ.get("METRICAS_RETENCION_DIAS", "30"))
+
+NIVELES = ["INFO", "WARNING", "ERROR", "CRITICAL", "AUDIT"]
+NIVELES_ERROR = ("ERROR", "CRITICAL")
+
+# Límites superiores (ms) del histograma de latencias. Los percentiles se
+# estiman interpolando dentro del bucket, así que se pueden sumar minutos.
+BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+
+def _atributo_bucket(limite):
+    return f"lat_le_{limite}" if limite is not None else "lat_le_inf"
+
+
+ATRIBUTOS_BUCKETS = [_atributo_bucket(b) for b in BUCKETS_MS] + [_atributo_bucket(None)]
+
+
+def es_traza(registro):
+    """Resumen de trazas.finalizar (antes se guardaba como 'sistema' con este mensaje)."""
+    if registro.get("tipo") == "traza":
+        return True
+    detalles = registro.get("detalles_sistema") or {}
+    return registro.get("tipo") == "sistema" and detalles.get("mensaje") == "Traza de solicitud"
+
+
+def servicio_de(registro):
+    detalles = registro.get("detalles_sistema") or {}
+    if detalles.get("servicio"):
+        return detalles["servicio"]
+    if registro.get("tipo") == "auditoria":
+        entidad = (registro.get("detalles_auditoria") or {}).get("entidad")
+        return f"auditoria_{entidad}" if entidad else "auditoria"
+    return None
+
+
+def duracion_de(registro):
+    """Duración reportada por el registro (trazas guardan contexto.duracion_ms)."""
+    contexto = (registro.get("detalles_sistema") or {}).get("contexto") or {}
+    valor = contexto.get("duracion_ms")
+    if valor is None:
+        return None
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+def minuto_de(marca):
+    """'2025-11-16T19:15:50.299128+00:00' -> '2025-11-16T19:15'"""
+    try:
+        dt = datetime.fromisoformat(marca)
+    except (TypeError, ValueError):
+        return None
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc)
+    return dt.strftime("%Y-%m-%dT%H:%M")
+
+
+def bucket_de(duracion_ms):
+    for limite in BUCKETS_MS:
+        if duracion_ms <= limite:
+            return _atributo_bucket(limite)
+    return _atributo_bucket(None)
+
+
+def acumular(registros):
+    """
+    Agrupa pares (evento_id, registro) por (servicio, minuto) y devuelve, por
+    fila, los incrementos a aplicar y los ids de evento que los produjeron.
+    Las trazas solo aportan al histograma de latencia: no son líneas de log
+    y no cuentan en el total, los niveles ni los errores.
+    """
+    agregados = {}
+    for evento_id, registro in registros:
+        servicio = servicio_de(registro)
+        minuto = minuto_de(registro.get("marca_tiempo"))
+        if not servicio or not minuto:
+            continue
+
+        fila = agregados.setdefault((servicio, minuto), {"contadores": {}, "eventos": []})
+        fila["eventos"].append(evento_id)
+        contadores = fila["contadores"]
+        if not es_traza(registro):
+            nivel = registro.get("nivel", "INFO")
+            contadores["total"] = contadores.get("total", 0) + 1
+            contadores[f"conteo_{nivel}"] = contadores.get(f"conteo_{nivel}", 0) + 1
+            if nivel in NIVELES_ERROR:
+                contadores["errores"] = contadores.get("errores", 0) + 1
+
+        duracion = duracion_de(registro)
+        if duracion is not None:
+            atributo = bucket_de(duracion)
+            contadores[atributo] = contadores.get(atributo, 0) + 1
+            contadores["duracion_muestras"] = contadores.get("duracion_muestras", 0) + 1
+            contadores["duracion_total_ms"] = (
+                contadores.get("duracion_total_ms", Decimal("0")) + Decimal(str(round(duracion, 3)))
+            )
+    return agregados
+
+
+def marca_lote(eventos):
+    """Id estable del conjunto de eventos que suma una fila (no depende del orden)."""
+    return hashlib.sha256("\n".join(sorted(eventos)).encode("utf-8")).hexdigest()[:16]
+
+
+def aplicar(table, agregados):
+    """
+    Suma los incrementos con ADD atómico (varias Lambdas del stream pueden
+    escribir el mismo minuto a la vez). Cada fila guarda en 'lotes' la marca
+    de los eventos ya sumados y la escritura es condicional sobre ella: si el
+    stream reentrega el lote tras un error, las filas ya aplicadas se omiten.
+    Devuelve cuántas filas se omitieron por estar aplicadas.
+    """
+    ttl = int(time.time()) + METRICAS_RETENCION_DIAS * 86400
+    omitidas = 0
+    for (servicio, minuto), fila in agregados.items():
+        if not fila["contadores"]:
+            continue
+        marca = marca_lote(fila["eventos"])
+        nombres = {"#ttl": "ttl", "#lotes": "lotes"}
+        valores = {":ttl": ttl, ":marca": marca, ":marcas": {marca}}
+        sumas = ["#lotes :marcas"]
+        for i, (atributo, valor) in enumerate(sorted(fila["contadores"].items())):
+            nombres[f"#a{i}"] = atributo
+            valores[f":v{i}"] = valor
+            sumas.append(f"#a{i} :v{i}")
+
+        try:
+            table.update_item(
+                Key={"servicio": servicio, "minuto": minuto},
+                UpdateExpression="ADD " + ", ".join(sumas) + " SET #ttl = :ttl",
+                ConditionExpression="NOT contains(#lotes, :marca)",
+                ExpressionAttributeNames=nombres,
+                ExpressionAttributeValues=valores,
+            )
+        except table.meta.client.exceptions.ConditionalCheckFailedException:
+            omitidas += 1
+    return omitidas
+
+
+def percentil(histograma, p):
+    """
+    Estima el percentil p (0-100) a partir de los conteos por bucket,
+    interpolando linealmente dentro del bucket que lo contiene.
+    """
+    total = sum(histograma.get(a, 0) for a in ATRIBUTOS_BUCKETS)
+    if total == 0:
+        return None
+
+    objetivo = total * p / 100.0
+    acumulado = 0
+    inferior = 0
+    for limite, atributo in zip(BUCKETS_MS + [None], ATRIBUTOS_BUCKETS):
+        conteo = histograma.get(atributo, 0)
+        if conteo and acumulado + conteo >= objetivo:
+            if limite is None:
+                return float(inferior)
+            fraccion = (objetivo - acumulado) / conteo
+            return round(inferior + (limite - inferior) * fraccion, 3)
+        acumulado += conteo
+        if limite is not None:
+            inferior = limite
+    return float(inferior)
+
+
+def punto_serie(item):
+    """Convierte una fila de la tabla de métricas en un punto de la serie."""
+    item = {k: (float(v) if isinstance(v, Decimal) else v) for k, v in item.items()}
+    total = int(item.get("total", 0))
+    errores = int(item.get("errores", 0))
+    muestras = int(item.get("duracion_muestras", 0))
+
+    return {
+        "minuto": item["minuto"],
+        "total": total,
+        "niveles": {n: int(item.get(f"conteo_{n}", 0)) for n in NIVELES},
+        "errores": errores,
+        "tasa_error": round(errores / total, 4) if total else 0.0,
+        "duracion_muestras": muestras,
+        "duracion_promedio_ms": round(item.get("duracion_total_ms", 0) / muestras, 3) if muestras else None,
+        "p50_ms": percentil(item, 50),
+        "p95_ms": percentil(item, 95),
+    }
+
+
+def agrupar(items, paso_minutos):
+    """Suma filas de un minuto en ventanas de 'paso_minutos' antes de calcular la serie."""
+    if paso_minutos <= 1:
+        return items
+
+    ventanas = {}
+    for item in items:
+        dt = datetime.strptime(item["minuto"], "%Y-%m-%dT%H:%M")
+        inicio = dt - timedelta(minutes=(dt.hour * 60 + dt.minute) % paso_minutos)
+        clave = inicio.strftime("%Y-%m-%dT%H:%M")
+        ventana = ventanas.setdefault(clave, {"servicio": item.get("servicio"), "minuto": clave})
+        for atributo, valor in item.items():
+            if atributo in ("servicio", "minuto", "ttl", "lotes"):
+                continue
+            ventana[atributo] = ventana.get(atributo, 0) + valor
+    return [ventanas[k] for k in sorted(ventanas)]
@@ -0,0 +1,35 @@
+import boto3
+from boto3.dynamodb.types import TypeDeserializer
+
+from metricas import TABLE_METRICAS_LOGS, acumular, aplicar
+
+dynamodb = boto3.resource("dynamodb")
+metricas_table = dynamodb.Table(TABLE_METRICAS_LOGS)
+
+_deserializer = TypeDeserializer()
+
+
+def _deserializar(imagen):
+    return {k: _deserializer.deserialize(v) for k, v in imagen.items()}
+
+
+def lambda_handler(event, context):
+    """
+    Consumidor del stream de la tabla de logs. Solo cuenta inserciones:
+    las modificaciones de la compactación (ttl/archivado) y los borrados
+    por TTL no deben sumar de nuevo. Ante un error el lote completo se
+    reintenta; aplicar() omite las filas que ya había sumado.
+    """
+    registros = []
+    for record in event.get("Records", []):
+        if record.get("eventName") != "INSERT":
+            continue
+        imagen = record.get("dynamodb", {}).get("NewImage")
+        if imagen:
+            registros.append((record["eventID"], _deserializar(imagen)))
+
+    agregados = acumular(registros)
+    omitidas = aplicar(metricas_table, agregados)
+
+    print(f"Métricas de logs: {len(registros)} registros -> {len(agregados)} filas (servicio, minuto), {omitidas} ya aplicadas")
+    return {"procesados": len(registros), "filas": len(agregados), "omitidas": omitidas}
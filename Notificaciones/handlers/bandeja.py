@@ -0,0 +1,101 @@
+import os
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+from boto3.dynamodb.conditions import Key
+
+# Bandeja de notificaciones por usuario (TABLE_BANDEJA, clave usuario_correo +
+# seq). El item con seq = 0 es la cabecera: 'ultimo_seq' da el siguiente
+# número de secuencia y 'leido_hasta' el último confirmado con "ack". Cada
+# notificación dirigida se guarda con su seq y caduca a los TTL_DIAS, de modo
+# que un cliente que se reconecta pide solo lo posterior a su último seq.
+TTL_DIAS = int(os.getenv("BANDEJA_TTL_DIAS", "7"))
+MAX_REENVIO = int(os.getenv("BANDEJA_MAX_REENVIO", "100"))
+HILOS = int(os.getenv("NOTIFICACIONES_HILOS_CONSULTA", "16"))
+SEQ_CABECERA = 0
+
+dynamodb = boto3.resource("dynamodb")
+table = dynamodb.Table(os.getenv("TABLE_BANDEJA", "TABLE_BANDEJA"))
+
+
+def _agregar_uno(correo, mensaje, ttl):
+    resp = table.update_item(
+        Key={"usuario_correo": correo, "seq": SEQ_CABECERA},
+        UpdateExpression="ADD ultimo_seq :uno",
+        ExpressionAttributeValues={":uno": 1},
+        ReturnValues="UPDATED_NEW",
+    )
+    seq = int(resp["Attributes"]["ultimo_seq"])
+    table.put_item(Item={
+        "usuario_correo": correo,
+        "seq": seq,
+        "mensaje": mensaje,
+        "expiracion_ttl": ttl,
+    })
+    return seq
+
+
+def agregar(correos, payload):
+    """Guarda 'payload' en la bandeja de cada usuario. Devuelve {correo: seq}."""
+    correos = sorted({c for c in correos if isinstance(c, str) and c})
+    if not correos:
+        return {}
+    mensaje = json.dumps(payload, ensure_ascii=False)
+    ttl = int(time.time()) + TTL_DIAS * 86400
+    with ThreadPoolExecutor(max_workers=min(HILOS, len(correos))) as executor:
+        seqs = list(executor.map(lambda c: _agregar_uno(c, mensaje, ttl), correos))
+    return dict(zip(correos, seqs))
+
+
+def pendientes(correo, since_seq):
+    """
+    Mensajes con seq > since_seq (hasta MAX_REENVIO, en un solo Query) y el
+    estado de la bandeja: {"mensajes", "ultimo_seq", "no_leidos", "completo"}.
+    """
+    resp = table.query(
+        KeyConditionExpression=Key("usuario_correo").eq(correo) & Key("seq").gt(max(int(since_seq), SEQ_CABECERA)),
+        Limit=MAX_REENVIO,
+    )
+    mensajes = []
+    for item in resp.get("Items", []):
+        mensaje = json.loads(item["mensaje"])
+        mensaje["seq"] = int(item["seq"])
+        mensajes.append(mensaje)
+
+    cabecera = table.get_item(Key={"usuario_correo": correo, "seq": SEQ_CABECERA}).get("Item") or {}
+    ultimo_seq = int(cabecera.get("ultimo_seq", 0))
+    return {
+        "mensajes": mensajes,
+        "ultimo_seq": ultimo_seq,
+        "no_leidos": max(0, ultimo_seq - int(cabecera.get("leido_hasta", 0))),
+        # False si quedan más mensajes: el cliente vuelve a pedir desde el último seq recibido
+        "completo": "LastEvaluatedKey" not in resp,
+    }
+
+
+def confirmar(correo, seq):
+    """Marca como leído hasta 'seq' (nunca retrocede). Devuelve los no leídos."""
+    try:
+        resp = table.update_item(
+            Key={"usuario_correo": correo, "seq": SEQ_CABECERA},
+            UpdateExpression="SET leido_hasta = :seq",
+            ConditionExpression="attribute_not_exists(leido_hasta) OR leido_hasta < :seq",
+            ExpressionAttributeValues={":seq": int(seq)},
+            ReturnValues="ALL_NEW",
+        )
+        cabecera = resp["Attributes"]
+    except dynamodb.meta.client.exceptions.ConditionalCheckFailedException:
+        cabecera = table.get_item(Key={"usuario_correo": correo, "seq": SEQ_CABECERA}).get("Item") or {}
+    return max(0, int(cabecera.get("ultimo_seq", 0)) - int(cabecera.get("leido_hasta", 0)))
+
+
+def reenviar(api, conexion_id, correo, since_seq):
+    """Envía a la conexión lo pendiente desde since_seq en un único mensaje 'bandeja'."""
+    estado = pendientes(correo, since_seq)
+    api.post_to_connection(
+        ConnectionId=conexion_id,
+        Data=json.dumps({"tipo": "bandeja", **estado}, ensure_ascii=False).encode("utf-8"),
+    )
+    return estado
@@ -0,0 +1,182 @@
+import json
+from decimal import Decimal
+
+from boto3.dynamodb.types import TypeDeserializer
+from comun import trazas
+from handlers import coalescencia, notify_incidente
+
+# Consumidor del stream de la tabla de incidentes (NEW_AND_OLD_IMAGES). Los
+# eventos de notificación se derivan de la diferencia entre imágenes, así
+# que solo existen si la escritura se confirmó:
+#   INSERT                            -> incidente_creado
+#   MODIFY a estado "resuelto"        -> incidente_resuelto
+#   MODIFY de estado o de asignación  -> incidente_actualizado
+#   MODIFY de un campo de CAMPOS_DELTA -> incidente_delta (observadores)
+# Los handlers de Incidentes guardan en el item el correlacion_id de la
+# solicitud que lo escribió; cada evento lo hereda para continuar su traza.
+CAMPOS_IGNORADOS = {"incidente_id", "correlacion_id"}
+# Campos que un observador (incidente#<id>) recibe en los deltas; los datos
+# personales (correos, descripción) no viajan aunque hayan cambiado.
+CAMPOS_DELTA = {
+    "titulo", "piso", "ubicacion", "tipo", "nivel_urgencia", "estado",
+    "evidencias", "coordenadas", "updated_at",
+}
+
+_deserializer = TypeDeserializer()
+
+
+def _json(valor):
+    if isinstance(valor, Decimal):
+        return int(valor) if valor == valor.to_integral_value() else float(valor)
+    if isinstance(valor, dict):
+        return {k: _json(v) for k, v in valor.items()}
+    if isinstance(valor, (list, set)):
+        return [_json(v) for v in valor]
+    return valor
+
+
+def _imagen(record, nombre):
+    imagen = record.get("dynamodb", {}).get(nombre)
+    if not imagen:
+        return None
+    return _json({k: _deserializer.deserialize(v) for k, v in imagen.items()})
+
+
+def _cambios(anterior, nuevo):
+    claves = set(anterior) | set(nuevo)
+    return {
+        clave: nuevo.get(clave)
+        for clave in sorted(claves - CAMPOS_IGNORADOS)
+        if anterior.get(clave) != nuevo.get(clave)
+    }
+
+
+def _contexto(incidente):
+    return {
+        "usuario_correo": incidente.get("usuario_correo"),
+        "empleado_correo": incidente.get("empleado_correo"),
+        "tipo": incidente.get("tipo"),
+        "piso": incidente.get("piso"),
+    }
+
+
+def _temas(incidente):
+    """Canales opcionales del incidente (piso y tipo) para quienes se suscribieron."""
+    temas = []
+    if incidente.get("piso") is not None:
+        temas.append(f"piso#{incidente['piso']}")
+    if incidente.get("tipo"):
+        temas.append(f"tipo#{incidente['tipo']}")
+    return temas
+
+
+def _evento(tipo, titulo, mensaje, incidente):
+    return {
+        "tipo": tipo,
+        "titulo": titulo,
+        "mensaje": mensaje,
+        "incidente_id": incidente["incidente_id"],
+        "incidente": _contexto(incidente),
+        "temas": _temas(incidente),
+        "correlacion_id": incidente.get("correlacion_id"),
+    }
+
+
+def eventos(record):
+    """Bodies de NotifyIncidente que corresponden a un registro del stream."""
+    anterior = _imagen(record, "OldImage")
+    nuevo = _imagen(record, "NewImage")
+    if record.get("eventName") == "INSERT" and nuevo:
+        return [_evento(
+            "incidente_creado",
+            "Nuevo incidente reportado",
+            f"Se creó el incidente {nuevo['incidente_id']} en el piso {nuevo.get('piso')} "
+            f"con urgencia '{nuevo.get('nivel_urgencia')}'.",
+            nuevo,
+        )]
+    if record.get("eventName") != "MODIFY" or not (anterior and nuevo):
+        return []
+
+    cambios = _cambios(anterior, nuevo)
+    if not cambios:
+        return []
+
+    resultado = []
+    incidente_id = nuevo["incidente_id"]
+    if "estado" in cambios and nuevo.get("estado") == "resuelto":
+        resultado.append(_evento(
+            "incidente_resuelto",
+            "Incidente resuelto",
+            f"El incidente {incidente_id} fue resuelto.",
+            nuevo,
+        ))
+    elif "estado" in cambios or "empleado_correo" in cambios:
+        resultado.append(_evento(
+            "incidente_actualizado",
+            "Incidente actualizado",
+            f"El incidente {incidente_id} cambió su estado a '{nuevo.get('estado')}'.",
+            nuevo,
+        ))
+    visibles = {campo: valor for campo, valor in cambios.items() if campo in CAMPOS_DELTA}
+    if visibles:
+        resultado.append({
+            "tipo": "incidente_delta",
+            "incidente_id": incidente_id,
+            "cambios": visibles,
+            "correlacion_id": nuevo.get("correlacion_id"),
+        })
+    return resultado
+
+
+def _entregar(clave, eventos_grupo):
+    """
+    Entrega los eventos del grupo aún no entregados. Idempotente: al terminar
+    registra la última secuencia entregada de la clave, y un reintento del
+    stream omite lo que ya salió (aunque el lote llegue agrupado de otro modo).
+    """
+    hasta = coalescencia.entregado_hasta(clave)
+    pendientes = [body for secuencia, body in eventos_grupo if int(secuencia) > hasta]
+    if not pendientes:
+        return
+    body = coalescencia.fusionar(pendientes)
+    trazas.iniciar(body.get("correlacion_id"), "cambios_incidentes")
+    try:
+        respuesta = notify_incidente.recibir(body)
+        if respuesta["statusCode"] >= 500:
+            raise RuntimeError(respuesta.get("body"))
+    finally:
+        trazas.finalizar()
+    coalescencia.marcar_entregado(clave, max(int(secuencia) for secuencia, _ in eventos_grupo))
+
+
+def lambda_handler(event, context):
+    """
+    Agrupa los eventos del lote por incidente (y clase: evento o delta) y
+    entrega cada grupo una vez, en el orden de su primer registro. Ante un
+    fallo se informa el primer registro del grupo como batchItemFailure: el
+    stream reintenta desde ahí y los grupos ya entregados se omiten.
+    """
+    grupos = {}
+    for record in event.get("Records", []):
+        secuencia = record.get("dynamodb", {}).get("SequenceNumber")
+        for body in eventos(record):
+            grupo = grupos.setdefault(coalescencia.clave(body), {"secuencia": secuencia, "eventos": []})
+            grupo["eventos"].append((secuencia, body))
+
+    fallido = None
+    for clave, grupo in grupos.items():
+        try:
+            _entregar(clave, grupo["eventos"])
+        except Exception as e:
+            print(f"❌ Error notificando {clave}: {e!r}")
+            fallido = grupo["secuencia"]
+            break
+
+    print("[CAMBIOS_INCIDENTES]", json.dumps({
+        "registros": len(event.get("Records", [])),
+        "grupos": len(grupos),
+        "fallido": fallido,
+    }))
+    if fallido is None:
+        return {"batchItemFailures": []}
+    return {"batchItemFailures": [{"itemIdentifier": fallido}]}
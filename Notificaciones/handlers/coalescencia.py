@@ -0,0 +1,143 @@
+import os
+import json
+import time
+import uuid
+
+import boto3
+
+# Agrupación de notificaciones por incidente. Cada evento se añade al item
+# del incidente en TABLE_COALESCENCIA; el primero de la ventana queda como
+# líder (escritura condicional con if_not_exists) y programa un único vaciado
+# a los VENTANA_SEGUNDOS. El vaciado lee el item, envía un solo mensaje con el
+# estado final y solo entonces descarta los eventos leídos: si el envío falla,
+# siguen en el buffer para el reintento.
+VENTANA_SEGUNDOS = int(os.getenv("COALESCENCIA_VENTANA_SEGUNDOS", "2"))
+TTL_SEGUNDOS = 3600
+# Marcas de entrega del stream de incidentes: cubren los reintentos (24 h de retención)
+MARCA_TTL_SEGUNDOS = 86400
+
+# Si en la ventana hubo varios tipos de evento, el mensaje agrupado lleva el
+# de mayor prioridad (un incidente creado y resuelto en la ventana es "resuelto")
+PRIORIDAD_TIPO = {"incidente_actualizado": 0, "incidente_creado": 1, "incidente_resuelto": 2}
+
+dynamodb = boto3.resource("dynamodb")
+table = dynamodb.Table(os.getenv("TABLE_COALESCENCIA", "TABLE_COALESCENCIA"))
+
+
+def clave(body):
+    """Los deltas van a otros destinatarios (observadores): se agrupan aparte."""
+    clase = "delta" if body.get("tipo") == "incidente_delta" else "evento"
+    return f"{body['incidente_id']}#{clase}"
+
+
+def agregar(clave_buffer, body):
+    """Añade el evento al buffer. Devuelve True si esta llamada es la líder de la ventana."""
+    ahora = int(time.time())
+    yo = uuid.uuid4().hex
+    resp = table.update_item(
+        Key={"clave": clave_buffer},
+        UpdateExpression=(
+            "SET eventos = list_append(if_not_exists(eventos, :vacia), :evento), "
+            "lider = if_not_exists(lider, :yo), "
+            "creado_en = if_not_exists(creado_en, :ahora), "
+            "expiracion_ttl = :ttl"
+        ),
+        ExpressionAttributeValues={
+            ":vacia": [],
+            # Como texto: el vaciado recupera el body original sin Decimal
+            ":evento": [json.dumps(body, ensure_ascii=False)],
+            ":yo": yo,
+            ":ahora": ahora,
+            ":ttl": ahora + TTL_SEGUNDOS,
+        },
+        ReturnValues="UPDATED_NEW",
+    )
+    return resp["Attributes"].get("lider") == yo
+
+
+def leer(clave_buffer):
+    """Eventos del buffer, sin quitarlos (lista vacía si ya se vació)."""
+    item = table.get_item(Key={"clave": clave_buffer}, ConsistentRead=True).get("Item") or {}
+    return [json.loads(e) for e in item.get("eventos", [])]
+
+
+def descartar(clave_buffer, cantidad):
+    """
+    Quita los 'cantidad' primeros eventos (los ya enviados). Si no llegó nada
+    más, borra el item y con él el líder: devuelve True. Si se añadieron
+    eventos mientras tanto, deja solo esos y devuelve False (hay que volver a
+    vaciar). Las condiciones sobre size(eventos) sirven de versión del buffer.
+    """
+    try:
+        table.delete_item(
+            Key={"clave": clave_buffer},
+            ConditionExpression="size(eventos) = :n",
+            ExpressionAttributeValues={":n": cantidad},
+        )
+        return True
+    except dynamodb.meta.client.exceptions.ConditionalCheckFailedException:
+        pass
+    try:
+        table.update_item(
+            Key={"clave": clave_buffer},
+            UpdateExpression="REMOVE " + ", ".join(f"eventos[{i}]" for i in range(cantidad)),
+            ConditionExpression="size(eventos) > :n",
+            ExpressionAttributeValues={":n": cantidad},
+        )
+    except dynamodb.meta.client.exceptions.ConditionalCheckFailedException:
+        # Otro vaciado ya lo descartó
+        return True
+    return False
+
+
+def entregado_hasta(clave_buffer):
+    """Última secuencia del stream ya entregada para la clave (0 si ninguna)."""
+    item = table.get_item(Key={"clave": f"stream#{clave_buffer}"}).get("Item") or {}
+    return int(item.get("hasta", 0))
+
+
+def marcar_entregado(clave_buffer, secuencia):
+    """Avanza la marca de entrega de la clave; nunca retrocede."""
+    try:
+        table.update_item(
+            Key={"clave": f"stream#{clave_buffer}"},
+            UpdateExpression="SET hasta = :seq, expiracion_ttl = :ttl",
+            ConditionExpression="attribute_not_exists(hasta) OR hasta < :seq",
+            ExpressionAttributeValues={":seq": secuencia, ":ttl": int(time.time()) + MARCA_TTL_SEGUNDOS},
+        )
+    except dynamodb.meta.client.exceptions.ConditionalCheckFailedException:
+        pass
+
+
+def _union(listas):
+    return list(dict.fromkeys(x for lista in listas for x in (lista or [])))
+
+
+def fusionar(eventos):
+    """Un body de NotifyIncidente con el estado final de todos los eventos de la ventana."""
+    final = dict(eventos[-1])
+    if len(eventos) == 1:
+        return final
+
+    if final.get("tipo") == "incidente_delta":
+        cambios = {}
+        for evento in eventos:
+            cambios.update(evento.get("cambios") or {})
+        final["cambios"] = cambios
+    else:
+        final["tipo"] = max(
+            (e.get("tipo") for e in eventos),
+            key=lambda t: PRIORIDAD_TIPO.get(t, -1)
+        )
+        final["mensaje"] = " ".join(_union([e["mensaje"]] for e in eventos if e.get("mensaje")))
+
+    if all(e.get("destinatarios") or e.get("temas") or e.get("incidente") for e in eventos):
+        for campo in ("destinatarios", "temas"):
+            if any(e.get(campo) for e in eventos):
+                final[campo] = _union(e.get(campo) for e in eventos)
+    else:
+        # Algún evento era para todos: el agrupado también
+        for campo in ("destinatarios", "temas", "incidente"):
+            final.pop(campo, None)
+    final["agrupados"] = len(eventos)
+    return final
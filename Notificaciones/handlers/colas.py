@@ -0,0 +1,76 @@
+import os
+import json
+
+import boto3
+
+# Colas de trabajo de Notificaciones. En AWS son colas SQS (DIFUSION_COLA_URL
+# para lotes de difusión, COALESCENCIA_COLA_URL para vaciar notificaciones
+# agrupadas, REENVIO_COLA_URL para reenviar la bandeja tras $connect); sin URL configurada (pruebas locales) los mensajes se procesan
+# en el mismo proceso con la función que se indique.
+DIFUSION_COLA_URL = os.getenv("DIFUSION_COLA_URL")
+COALESCENCIA_COLA_URL = os.getenv("COALESCENCIA_COLA_URL")
+REENVIO_COLA_URL = os.getenv("REENVIO_COLA_URL")
+LOTE_SQS = 10
+
+
+class ColaSQS:
+    def __init__(self, url):
+        self.url = url
+        self.sqs = boto3.client("sqs")
+
+    def encolar(self, mensajes, retraso=0):
+        """
+        Envía los mensajes en lotes de 10, visibles tras 'retraso' segundos
+        (máximo 900). Devuelve cuántos se aceptaron.
+        """
+        aceptados = 0
+        for i in range(0, len(mensajes), LOTE_SQS):
+            lote = mensajes[i:i + LOTE_SQS]
+            resp = self.sqs.send_message_batch(
+                QueueUrl=self.url,
+                Entries=[
+                    {"Id": str(n), "MessageBody": json.dumps(m, ensure_ascii=False), "DelaySeconds": int(retraso)}
+                    for n, m in enumerate(lote)
+                ],
+            )
+            aceptados += len(resp.get("Successful", []))
+            for fallo in resp.get("Failed", []):
+                print("[COLA_ERROR] Mensaje rechazado por SQS:", fallo)
+        return aceptados
+
+
+class ColaLocal:
+    """Sustituto en proceso: ejecuta cada mensaje al encolarlo (sin retraso)."""
+
+    def __init__(self, procesar):
+        self.procesar = procesar
+        self.resultados = []
+
+    def encolar(self, mensajes, retraso=0):
+        for mensaje in mensajes:
+            # Mismo viaje de ida y vuelta por JSON que en SQS
+            self.resultados.append(self.procesar(json.loads(json.dumps(mensaje, ensure_ascii=False))))
+        return len(mensajes)
+
+
+def cola_difusion(procesar_local):
+    if DIFUSION_COLA_URL:
+        return ColaSQS(DIFUSION_COLA_URL)
+    return ColaLocal(procesar_local)
+
+
+def cola_coalescencia(procesar_local):
+    if COALESCENCIA_COLA_URL:
+        return ColaSQS(COALESCENCIA_COLA_URL)
+    return ColaLocal(procesar_local)
+
+
+def cola_reenvio(procesar_local):
+    if REENVIO_COLA_URL:
+        return ColaSQS(REENVIO_COLA_URL)
+    return ColaLocal(procesar_local)
+
+
+def mensajes_sqs(event):
+    """(message_id, body) de cada registro de un evento SQS."""
+    return [(r["messageId"], json.loads(r["body"])) for r in event.get("Records", [])]
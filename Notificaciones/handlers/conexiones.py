@@ -0,0 +1,106 @@
+import os
+import time
+
+import boto3
+
+# Mantenimiento de la tabla de conexiones WebSocket. Cada conexión guarda
+# 'last_seen' (epoch en segundos), que se renueva al conectarse, con cada
+# mensaje del cliente y cuando el podador confirma que sigue abierta; el
+# podador usa ese valor para decidir qué conexiones sondear. Los temas a los que está suscrita una
+# conexión se guardan en su atributo 'temas' y, por tema, en TABLE_SUSCRIPCIONES.
+TTL_HORAS = int(os.getenv("CONNECTION_TTL_HOURS", "4"))
+LOTE_LECTURA = 100
+
+dynamodb = boto3.resource("dynamodb")
+table = dynamodb.Table(os.environ["TABLE_CONEXIONES"])
+suscripciones_table = dynamodb.Table(os.getenv("TABLE_SUSCRIPCIONES", "TABLE_SUSCRIPCIONES"))
+
+
+def expiracion_ttl(ahora=None):
+    return int(ahora or time.time()) + TTL_HORAS * 3600
+
+
+def latido(connection_id):
+    """
+    Renueva 'last_seen' y el TTL de la conexión y de sus suscripciones.
+    Devuelve False si la conexión ya no existe.
+    """
+    ahora = int(time.time())
+    ttl = expiracion_ttl(ahora)
+    try:
+        resp = table.update_item(
+            Key={"conexion_id": connection_id},
+            UpdateExpression="SET last_seen = :ahora, expiracion_ttl = :ttl",
+            ConditionExpression="attribute_exists(conexion_id)",
+            ExpressionAttributeValues={":ahora": ahora, ":ttl": ttl},
+            ReturnValues="ALL_NEW",
+        )
+    except dynamodb.meta.client.exceptions.ConditionalCheckFailedException:
+        return False
+
+    # Las suscripciones se renuevan a lo sumo cada media vida del TTL, no en cada latido
+    conexion = resp["Attributes"]
+    if ahora - int(conexion.get("temas_renovados_en", 0)) < TTL_HORAS * 1800:
+        return True
+    for tema in conexion.get("temas") or ():
+        try:
+            suscripciones_table.update_item(
+                Key={"tema": tema, "conexion_id": connection_id},
+                UpdateExpression="SET expiracion_ttl = :ttl",
+                ConditionExpression="attribute_exists(conexion_id)",
+                ExpressionAttributeValues={":ttl": ttl},
+            )
+        except dynamodb.meta.client.exceptions.ConditionalCheckFailedException:
+            # Se dio de baja entre la lectura y esta escritura
+            pass
+    try:
+        table.update_item(
+            Key={"conexion_id": connection_id},
+            UpdateExpression="SET temas_renovados_en = :ahora",
+            ConditionExpression="attribute_exists(conexion_id)",
+            ExpressionAttributeValues={":ahora": ahora},
+        )
+    except dynamodb.meta.client.exceptions.ConditionalCheckFailedException:
+        return False
+    return True
+
+
+def _temas_de(connection_ids):
+    """connection_id -> temas suscritos, leídos con BatchGetItem (100 por petición)."""
+    temas = {}
+    for i in range(0, len(connection_ids), LOTE_LECTURA):
+        request = {table.name: {
+            "Keys": [{"conexion_id": cid} for cid in connection_ids[i:i + LOTE_LECTURA]],
+            "ProjectionExpression": "conexion_id, temas",
+        }}
+        while request:
+            resp = dynamodb.batch_get_item(RequestItems=request)
+            for item in resp.get("Responses", {}).get(table.name, []):
+                temas[item["conexion_id"]] = set(item.get("temas") or ())
+            request = resp.get("UnprocessedKeys")
+    return temas
+
+
+def eliminar(connection_ids, temas=None):
+    """
+    Borra conexiones y sus suscripciones con BatchWriteItem (25 por petición;
+    batch_writer reintenta los UnprocessedItems). 'temas' agrega suscripciones
+    ya conocidas por quien llama, útil si la conexión ya no está en la tabla.
+    Devuelve cuántas conexiones se enviaron a borrar.
+    """
+    connection_ids = list(dict.fromkeys(connection_ids))
+    if not connection_ids:
+        return 0
+
+    suscritas = _temas_de(connection_ids)
+    for connection_id, conocidos in (temas or {}).items():
+        suscritas.setdefault(connection_id, set()).update(conocidos)
+
+    with suscripciones_table.batch_writer() as batch:
+        for connection_id in connection_ids:
+            for tema in suscritas.get(connection_id, ()):
+                batch.delete_item(Key={"tema": tema, "conexion_id": connection_id})
+    with table.batch_writer() as batch:
+        for connection_id in connection_ids:
+            batch.delete_item(Key={"conexion_id": connection_id})
+    return len(connection_ids)
@@ -1,15 +1,11 @@
 import json
-import os
 import time
 from datetime import datetime, timezone
 
-import boto3
+from comun.autenticacion import validar_token
+from handlers import conexiones, suscripciones, reenvio
 
-from handlers.utils import validar_token
-
-dynamodb = boto3.resource("dynamodb")
-table = dynamodb.Table(os.environ["TABLE_CONEXIONES"])
-ttl_hours = int(os.getenv("CONNECTION_TTL_HOURS", "4"))
+table = conexiones.table
 
 def lambda_handler(event, context):
     params = event.get("queryStringParameters") or {}
@@ -30,11 +26,31 @@ def lambda_handler(event, context):
         "usuario_correo": resultado["correo"],
         "rol": resultado.get("rol"),
         "created_at": ahora.isoformat(),
-        "expiracion_ttl": int(time.time()) + ttl_hours * 3600
+        "last_seen": int(time.time()),
+        # Las suscripciones de abajo se crean con el mismo TTL
+        "temas_renovados_en": int(time.time()),
+        "expiracion_ttl": conexiones.expiracion_ttl()
     }
 
     table.put_item(Item=item)
 
+    # Suscripciones: siempre el tema del propio rol, más los pedidos en ?temas=a,b
+    pedidos = [t for t in (params.get("temas") or "").split(",") if t]
+    temas, rechazados = suscripciones.validar(
+        [suscripciones.tema_rol(item["rol"])] + pedidos, item["rol"], item["usuario_correo"]
+    )
+    suscripciones.suscribir(connection_id, item["usuario_correo"], temas)
+    if rechazados:
+        print(f"Temas rechazados para {connection_id}: {rechazados}")
+
+    # Reconexión: reenviar lo recibido en la bandeja después de since_seq
+    since_seq = params.get("since_seq")
+    if since_seq is not None and str(since_seq).isdigit():
+        try:
+            reenvio.programar(connection_id, item["usuario_correo"], int(since_seq))
+        except Exception as e:
+            print(f"Error programando el reenvío de la bandeja a {connection_id}: {e!r}")
+
     return {
         "statusCode": 200,
         "body": json.dumps({"message": "Conexión aceptada"})
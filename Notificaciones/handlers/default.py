@@ -1,7 +1,85 @@
+import os
 import json
 
+from handlers import bandeja, conexiones, difusion, suscripciones
+
+management_api = difusion.cliente(os.environ["WEBSOCKET_API_ENDPOINT"].replace("wss://", "https://"))
+
+
+def _parse_body(event):
+    try:
+        return json.loads(event.get("body") or "{}")
+    except (TypeError, ValueError):
+        return {}
+
+
+def _respuesta(status, body):
+    return {"statusCode": status, "body": json.dumps(body)}
+
+
+def _cambiar_suscripcion(connection_id, body, suscribir):
+    conexion = conexiones.table.get_item(
+        Key={"conexion_id": connection_id},
+        ProjectionExpression="usuario_correo, rol"
+    ).get("Item")
+    if not conexion:
+        return _respuesta(410, {"message": "Conexión no registrada"})
+
+    temas = body.get("temas")
+    if not isinstance(temas, list) or not temas:
+        return _respuesta(400, {"message": "temas debe ser una lista no vacía"})
+
+    validos, rechazados = suscripciones.validar(temas, conexion.get("rol"), conexion.get("usuario_correo"))
+    if suscribir:
+        suscripciones.suscribir(connection_id, conexion["usuario_correo"], validos)
+    else:
+        suscripciones.desuscribir(connection_id, validos)
+    return _respuesta(200, {"temas": validos, "rechazados": rechazados})
+
+
+def _bandeja(connection_id, body, accion):
+    conexion = conexiones.table.get_item(
+        Key={"conexion_id": connection_id},
+        ProjectionExpression="usuario_correo"
+    ).get("Item")
+    if not conexion:
+        return _respuesta(410, {"message": "Conexión no registrada"})
+
+    seq = body.get("since_seq" if accion == "sync" else "seq", 0)
+    if not isinstance(seq, int) or isinstance(seq, bool) or seq < 0:
+        return _respuesta(400, {"message": "seq debe ser un entero no negativo"})
+
+    if accion == "sync":
+        estado = bandeja.reenviar(management_api, connection_id, conexion["usuario_correo"], seq)
+        return _respuesta(200, {"reenviados": len(estado["mensajes"]), "no_leidos": estado["no_leidos"]})
+    return _respuesta(200, {"no_leidos": bandeja.confirmar(conexion["usuario_correo"], seq)})
+
+
 def lambda_handler(event, context):
-    return {
-        "statusCode": 200,
-        "body": json.dumps({"message": "Ruta no soportada"})
-    }
+    body = _parse_body(event)
+    connection_id = event["requestContext"]["connectionId"]
+    accion = body.get("action")
+
+    # Cualquier mensaje del cliente cuenta como latido, no solo "heartbeat"
+    registrada = conexiones.latido(connection_id)
+
+    if accion == "heartbeat":
+        if not registrada:
+            return _respuesta(410, {"message": "Conexión no registrada"})
+        return _respuesta(200, {"message": "ok"})
+
+    if accion in ("subscribe", "unsubscribe"):
+        return _cambiar_suscripcion(connection_id, body, accion == "subscribe")
+
+    if accion in ("watch", "unwatch"):
+        # Azúcar sobre subscribe/unsubscribe para los temas incidente#<id>
+        ids = body.get("incidente_ids")
+        if not isinstance(ids, list) or not ids:
+            return _respuesta(400, {"message": "incidente_ids debe ser una lista no vacía"})
+        temas = [suscripciones.tema_incidente(i) for i in ids if i]
+        return _cambiar_suscripcion(connection_id, {"temas": temas}, accion == "watch")
+
+    if accion in ("sync", "ack"):
+        return _bandeja(connection_id, body, accion)
+
+    return _respuesta(200, {"message": "Ruta no soportada"})
@@ -0,0 +1,92 @@
+import os
+import time
+import threading
+
+import boto3
+from boto3.dynamodb.conditions import Key
+from comun import areas
+
+# Audiencia de cada evento de incidente: quién lo reportó, a quién está
+# asignado, los administradores y los empleados activos del área del
+# incidente. Los miembros de cada rol y área se cachean en el contenedor
+# y se refrescan cada CACHE_SEGUNDOS.
+CACHE_SEGUNDOS = int(os.getenv("DESTINATARIOS_CACHE_SEGUNDOS", "60"))
+ROLES_ADMIN = ("personal_administrativo", "autoridad")
+
+# Qué grupos reciben cada tipo de evento
+AUDIENCIA = {
+    "incidente_creado": ("reportante", "admins", "area"),
+    "incidente_actualizado": ("reportante", "asignado", "admins"),
+    "incidente_resuelto": ("reportante", "asignado", "admins"),
+}
+
+dynamodb = boto3.resource("dynamodb")
+usuarios_table = dynamodb.Table(os.getenv("TABLE_USUARIOS", "TABLE_USUARIOS"))
+empleados_table = dynamodb.Table(os.getenv("TABLE_EMPLEADOS", "TABLE_EMPLEADOS"))
+
+_lock = threading.Lock()
+_admins = []
+_por_area = {}
+_cargado_en = 0.0
+
+
+def _query_todo(tabla, **query_kwargs):
+    items = []
+    while True:
+        resp = tabla.query(**query_kwargs)
+        items.extend(resp.get("Items", []))
+        lek = resp.get("LastEvaluatedKey")
+        if not lek:
+            return items
+        query_kwargs["ExclusiveStartKey"] = lek
+
+
+def _refrescar():
+    global _admins, _por_area, _cargado_en
+
+    admins = []
+    for rol in ROLES_ADMIN:
+        items = _query_todo(
+            usuarios_table,
+            IndexName="RolNombreIndex",
+            KeyConditionExpression=Key("rol").eq(rol),
+        )
+        admins.extend(item["correo"] for item in items)
+
+    por_area = {}
+    empleados = _query_todo(
+        empleados_table,
+        IndexName="EstadoNombreIndex",
+        KeyConditionExpression=Key("estado").eq("activo"),
+    )
+    for empleado in empleados:
+        correo = (empleado.get("contacto") or {}).get("correo")
+        if correo:
+            por_area.setdefault(areas.normalizar_area(empleado.get("tipo_area")), []).append(correo)
+
+    _admins, _por_area, _cargado_en = admins, por_area, time.time()
+
+
+def _miembros():
+    with _lock:
+        if time.time() - _cargado_en > CACHE_SEGUNDOS:
+            _refrescar()
+        return _admins, _por_area
+
+
+def resolver(tipo_evento, incidente):
+    """
+    Correos que deben recibir 'tipo_evento' sobre 'incidente' (dict con
+    usuario_correo, empleado_correo y tipo). Sin duplicados, en orden estable.
+    """
+    admins, por_area = _miembros()
+    grupos = {
+        "reportante": [incidente.get("usuario_correo")],
+        "asignado": [incidente.get("empleado_correo")],
+        "admins": admins,
+        "area": por_area.get(areas.area_de_tipo(incidente.get("tipo")), []),
+    }
+    correos = []
+    for grupo in AUDIENCIA.get(tipo_evento, ("reportante", "asignado", "admins")):
+        correos.extend(c for c in grupos[grupo] if c)
+    return list(dict.fromkeys(correos))
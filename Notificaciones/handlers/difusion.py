@@ -0,0 +1,128 @@
+import os
+import json
+import time
+import random
+import bisect
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError, BotoCoreError
+
+# Envío de un mismo mensaje a muchas conexiones WebSocket: se serializa una
+# sola vez y se publica en paralelo con un pool acotado de hilos que comparten
+# el pool HTTP del cliente.
+HILOS = int(os.getenv("DIFUSION_HILOS", "32"))
+TIMEOUT_SEGUNDOS = float(os.getenv("DIFUSION_TIMEOUT_SEGUNDOS", "3"))
+MAX_REINTENTOS_429 = int(os.getenv("DIFUSION_REINTENTOS_429", "4"))
+ESPERA_BASE_429 = 0.05
+ESPERA_MAXIMA_429 = 1.0
+
+# Límites superiores (ms) de los buckets del histograma de latencia
+BUCKETS_MS = [10, 25, 50, 100, 250, 500, 1000, 2500]
+
+
+def cliente(endpoint_url):
+    """
+    Cliente de la Management API con un pool HTTP del tamaño del pool de
+    hilos y timeouts por llamada. Los reintentos de botocore se desactivan:
+    los 429 se reintentan aquí con espera exponencial y el resto no se repite.
+    """
+    return boto3.client(
+        "apigatewaymanagementapi",
+        endpoint_url=endpoint_url,
+        config=Config(
+            max_pool_connections=HILOS,
+            connect_timeout=TIMEOUT_SEGUNDOS,
+            read_timeout=TIMEOUT_SEGUNDOS,
+            retries={"max_attempts": 1, "mode": "standard"},
+        ),
+    )
+
+
+def _estado_http(exc):
+    return exc.response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+
+
+def _publicar(api, connection_id, data):
+    """Devuelve (resultado, latencia_ms) con resultado en enviado | obsoleto | fallido."""
+    inicio = time.perf_counter()
+    for intento in range(MAX_REINTENTOS_429 + 1):
+        try:
+            api.post_to_connection(ConnectionId=connection_id, Data=data)
+            return "enviado", (time.perf_counter() - inicio) * 1000
+        except ClientError as exc:
+            estado = _estado_http(exc)
+            if estado == 410:
+                return "obsoleto", (time.perf_counter() - inicio) * 1000
+            if estado == 429 and intento < MAX_REINTENTOS_429:
+                espera = min(ESPERA_MAXIMA_429, ESPERA_BASE_429 * (2 ** intento))
+                time.sleep(espera * random.uniform(0.5, 1.0))
+                continue
+            print(f"Error enviando a {connection_id}: {exc}")
+            return "fallido", (time.perf_counter() - inicio) * 1000
+        except BotoCoreError as exc:
+            # Timeouts y errores de conexión
+            print(f"Error enviando a {connection_id}: {exc!r}")
+            return "fallido", (time.perf_counter() - inicio) * 1000
+    return "fallido", (time.perf_counter() - inicio) * 1000
+
+
+def _histograma(latencias):
+    conteos = [0] * (len(BUCKETS_MS) + 1)
+    for latencia in latencias:
+        conteos[bisect.bisect_left(BUCKETS_MS, latencia)] += 1
+    etiquetas = [f"<={limite}ms" for limite in BUCKETS_MS] + [f">{BUCKETS_MS[-1]}ms"]
+    return dict(zip(etiquetas, conteos))
+
+
+def _percentil(ordenadas, p):
+    if not ordenadas:
+        return None
+    indice = min(len(ordenadas) - 1, int(round(p / 100.0 * (len(ordenadas) - 1))))
+    return round(ordenadas[indice], 1)
+
+
+def enviar(api, connection_ids, payload, extra=None):
+    """
+    Publica 'payload' en todas las conexiones. 'extra' (connection_id -> dict)
+    añade campos propios de algunas conexiones; cada variante se serializa una
+    sola vez. Devuelve un resumen con los conteos por resultado, los ids
+    obsoletos (410) y la latencia por llamada.
+    """
+    data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    connection_ids = list(connection_ids)
+    variantes = {}
+    por_conexion = {}
+    for connection_id, campos in (extra or {}).items():
+        clave = json.dumps(campos, sort_keys=True)
+        if clave not in variantes:
+            variantes[clave] = json.dumps({**payload, **campos}, ensure_ascii=False).encode("utf-8")
+        por_conexion[connection_id] = variantes[clave]
+    resumen = {"enviados": 0, "obsoletos": [], "fallidos": 0}
+    if not connection_ids:
+        return {**resumen, "latencia": {}}
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=min(HILOS, len(connection_ids))) as executor:
+        resultados = list(executor.map(lambda cid: _publicar(api, cid, por_conexion.get(cid, data)), connection_ids))
+
+    latencias = []
+    for connection_id, (resultado, latencia) in zip(connection_ids, resultados):
+        latencias.append(latencia)
+        if resultado == "enviado":
+            resumen["enviados"] += 1
+        elif resultado == "obsoleto":
+            resumen["obsoletos"].append(connection_id)
+        else:
+            resumen["fallidos"] += 1
+
+    latencias.sort()
+    resumen["latencia"] = {
+        "p50_ms": _percentil(latencias, 50),
+        "p95_ms": _percentil(latencias, 95),
+        "max_ms": round(latencias[-1], 1),
+        "histograma": _histograma(latencias),
+    }
+    resumen["duracion_ms"] = round((time.perf_counter() - inicio) * 1000, 1)
+    return resumen
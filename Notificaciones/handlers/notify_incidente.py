@@ -1,46 +1,116 @@
 import json
 import os
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 
 import boto3
-from botocore.exceptions import ClientError
-from boto3.dynamodb.conditions import Attr
+from boto3.dynamodb.conditions import Key
+from comun import trazas
+from handlers import bandeja, difusion, colas, coalescencia, suscripciones, destinatarios as audiencia, conexiones as registro_conexiones
 
 dynamodb = boto3.resource("dynamodb")
+trazas.instrumentar(dynamodb.meta.client)
 table = dynamodb.Table(os.environ["TABLE_CONEXIONES"])
-management_api = boto3.client(
-    "apigatewaymanagementapi",
-    endpoint_url=os.environ["WEBSOCKET_API_ENDPOINT"].replace("wss://", "https://")
-)
+# Sin instrumentar llamada por llamada: la difusión se traza como un solo span
+management_api = difusion.cliente(os.environ["WEBSOCKET_API_ENDPOINT"].replace("wss://", "https://"))
 
+# Consultas concurrentes al índice (una por destinatario). La difusión a
+# todos se reparte en LOTES_DIFUSION segmentos del Scan: el coordinador encola
+# un lote por segmento y cada invocación de ProcesarLoteDifusion entrega uno
+HILOS_CONSULTA = int(os.getenv("NOTIFICACIONES_HILOS_CONSULTA", "16"))
+LOTES_DIFUSION = int(os.getenv("DIFUSION_LOTES", "16"))
+CAMPOS_CONEXION = "conexion_id, usuario_correo, rol"
+TIPOS_VALIDOS = ["incidente_actualizado", "incidente_creado", "incidente_resuelto", "incidente_delta"]
+# Vaciados seguidos de una ventana que sigue recibiendo eventos antes de ceder al reintento
+MAX_VACIADOS = 5
 
-def _broadcast(conexiones, payload):
-    eliminados = []
-    enviados = 0
-    for conn in conexiones:
-        connection_id = conn["conexion_id"]
-        try:
-            management_api.post_to_connection(
-                ConnectionId=connection_id,
-                Data=json.dumps(payload, ensure_ascii=False).encode("utf-8")
-            )
-            enviados += 1
-            print(f"✓ Enviado a {conn.get('usuario_correo')} ({connection_id})")
-        except ClientError as exc:
-            status = exc.response.get("ResponseMetadata", {}).get("HTTPStatusCode")
-            if status == 410:
-                eliminados.append(connection_id)
-                print(f"✗ Conexión obsoleta: {connection_id}")
-            else:
-                print(f"Error enviando a {connection_id}: {exc}")
-    
-    for connection_id in eliminados:
-        try:
-            table.delete_item(Key={"conexion_id": connection_id})
-        except Exception as e:
-            print(f"Error eliminando conexión {connection_id}: {e}")
-    
-    return enviados
+
+def _broadcast(conexiones, payload, extra=None):
+    with trazas.span("apigateway", "difusion", conexiones=len(conexiones)):
+        resumen = difusion.enviar(management_api, [conn["conexion_id"] for conn in conexiones], payload, extra)
+    print("[DIFUSION]", json.dumps({**resumen, "obsoletos": len(resumen["obsoletos"])}))
+
+    try:
+        obsoletos = set(resumen["obsoletos"])
+        temas = {c["conexion_id"]: c["temas"] for c in conexiones if c["conexion_id"] in obsoletos and c.get("temas")}
+        registro_conexiones.eliminar(resumen["obsoletos"], temas=temas)
+    except Exception as e:
+        print(f"Error eliminando {len(resumen['obsoletos'])} conexiones obsoletas: {e}")
+
+    return resumen
+
+
+def _conexiones_de(correo):
+    """Conexiones abiertas de un usuario (Query sobre UsuarioCorreoIndex)."""
+    query_kwargs = {
+        "IndexName": "UsuarioCorreoIndex",
+        "KeyConditionExpression": Key("usuario_correo").eq(correo),
+        "ProjectionExpression": CAMPOS_CONEXION,
+    }
+    conexiones = []
+    while True:
+        response = table.query(**query_kwargs)
+        conexiones.extend(response.get("Items", []))
+        if "LastEvaluatedKey" not in response:
+            return conexiones
+        query_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+def _conexiones_destinatarios(destinatarios):
+    """Una consulta por destinatario único, en paralelo; sin conexiones repetidas."""
+    correos = sorted({d for d in destinatarios if isinstance(d, str) and d})
+    if not correos:
+        return []
+    with ThreadPoolExecutor(max_workers=min(HILOS_CONSULTA, len(correos))) as executor:
+        resultados = list(executor.map(_conexiones_de, correos))
+
+    unicas = {}
+    for conexiones in resultados:
+        for conn in conexiones:
+            unicas[conn["conexion_id"]] = conn
+    return list(unicas.values())
+
+
+def _scan_segmento(segmento, total_segmentos):
+    scan_kwargs = {
+        "Segment": segmento,
+        "TotalSegments": total_segmentos,
+        "ProjectionExpression": CAMPOS_CONEXION,
+    }
+    conexiones = []
+    while True:
+        response = table.scan(**scan_kwargs)
+        conexiones.extend(response.get("Items", []))
+        if "LastEvaluatedKey" not in response:
+            return conexiones
+        scan_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+def _entregar_lote(lote):
+    """Entrega un lote de difusión: las conexiones de un segmento del Scan."""
+    conexiones = _scan_segmento(lote["segmento"], lote["total_segmentos"])
+    resumen = _broadcast(conexiones, lote["payload"]) if conexiones else None
+    return {
+        "segmento": lote["segmento"],
+        "conexiones": len(conexiones),
+        "enviados": resumen["enviados"] if resumen else 0,
+        "obsoletos": len(resumen["obsoletos"]) if resumen else 0,
+        "fallidos": resumen["fallidos"] if resumen else 0,
+    }
+
+
+def _difundir_a_todos(payload):
+    """
+    Coordinador: no lee conexiones, solo encola un lote por segmento. Sin
+    cola configurada (pruebas locales) los lotes se entregan en este proceso.
+    """
+    lotes = [
+        {"segmento": i, "total_segmentos": LOTES_DIFUSION, "payload": payload}
+        for i in range(LOTES_DIFUSION)
+    ]
+    cola = colas.cola_difusion(_entregar_lote)
+    encolados = cola.encolar(lotes)
+    return encolados, getattr(cola, "resultados", None)
 
 
 def _parse_body(event):
@@ -63,23 +133,135 @@ def _parse_body(event):
     return {}
 
 
+def _vaciar(mensaje):
+    """
+    Envía en un solo mensaje lo agrupado en la ventana de un incidente. El
+    buffer se descarta después de enviar; un fallo (5xx) lanza RuntimeError
+    con los eventos aún en el buffer, para que el reintento los envíe.
+    """
+    clave = mensaje["clave"]
+    agrupados, estado = 0, None
+    for _ in range(MAX_VACIADOS):
+        eventos = coalescencia.leer(clave)
+        if not eventos:
+            break
+        respuesta = _notificar(coalescencia.fusionar(eventos))
+        estado = respuesta["statusCode"]
+        if estado >= 500:
+            raise RuntimeError(f"Vaciado de {clave} fallido ({estado}): {respuesta.get('body')}")
+        agrupados += len(eventos)
+        if coalescencia.descartar(clave, len(eventos)):
+            break
+    else:
+        # Siguen llegando eventos: el reintento de la cola vacía lo que quede
+        raise RuntimeError(f"{clave} sigue recibiendo eventos tras {MAX_VACIADOS} vaciados")
+    return {"clave": clave, "agrupados": agrupados, "statusCode": estado}
+
+
+def _agrupar(body):
+    """
+    Añade el evento a la ventana del incidente. Solo el primero de la ventana
+    (el líder) programa el vaciado; si no puede encolarlo, vacía en el acto.
+    El evento queda guardado en el buffer antes de responder 202.
+    """
+    clave = coalescencia.clave(body)
+    lider = coalescencia.agregar(clave, body)
+    resultado = None
+    if lider:
+        cola = colas.cola_coalescencia(_vaciar)
+        try:
+            programado = cola.encolar([{"clave": clave}], retraso=coalescencia.VENTANA_SEGUNDOS)
+            resultado = (getattr(cola, "resultados", None) or [None])[0]
+        except Exception as e:
+            print(f"❌ Error programando el vaciado de {clave}: {e!r}")
+            programado = 0
+        if not programado:
+            try:
+                resultado = _vaciar({"clave": clave})
+            except Exception as e:
+                print(f"❌ Error vaciando {clave}: {e!r}")
+                return {
+                    "statusCode": 500,
+                    "body": json.dumps({"message": "Error al vaciar la notificación agrupada", "error": str(e)})
+                }
+
+    respuesta = {"message": "Notificación agrupada", "clave": clave, "lider": lider}
+    if resultado is not None:
+        respuesta["vaciado"] = resultado
+    return {
+        "statusCode": 202,
+        "body": json.dumps(respuesta)
+    }
+
+
+@trazas.con_trazado("notificar_incidente")
 def lambda_handler(event, context):
-    body = _parse_body(event)
-    
+    return recibir(_parse_body(event))
+
+
+def _lista_de_textos(valor):
+    return isinstance(valor, list) and all(isinstance(v, str) and v for v in valor)
+
+
+def _validar_listas(body):
+    """destinatarios y temas, si vienen, deben ser listas de strings (se usan como claves)."""
+    for campo in ("destinatarios", "temas"):
+        if body.get(campo) is not None and not _lista_de_textos(body[campo]):
+            return {
+                "statusCode": 400,
+                "body": json.dumps({"message": f"{campo} debe ser una lista de strings"})
+            }
+    return None
+
+
+def recibir(body):
+    """Punto de entrada común de la API y del stream de incidentes."""
+    # Antes de agrupar: un body inválido no debe llegar a la ventana del incidente
+    error = _validar_listas(body)
+    if error:
+        return error
+    # Los eventos válidos se agrupan por incidente durante la ventana; el resto
+    # (y todo si la ventana es 0) se procesa directamente
+    if (coalescencia.VENTANA_SEGUNDOS > 0 and body.get("incidente_id")
+            and body.get("tipo") in TIPOS_VALIDOS and not body.get("agrupados")):
+        return _agrupar(body)
+    return _notificar(body)
+
+
+def _notificar(body):
     # Campos requeridos
     tipo = body.get("tipo")
     titulo = body.get("titulo")
     mensaje = body.get("mensaje")
     incidente_id = body.get("incidente_id")
     
-    # Campos opcionales
+    # Campos opcionales: destinatarios concretos, datos del incidente para
+    # resolverlos (reportante, asignado, admins, área), temas, o (sin ninguno) todos
     destinatarios = body.get("destinatarios")
+    incidente = body.get("incidente")
+    temas = body.get("temas")
 
-    print(f"📨 Notificación recibida - Tipo: {tipo}, Incidente: {incidente_id}")
+    # Deltas de un incidente: solo para quienes lo observan (incidente#<id>)
+    cambios = body.get("cambios")
+    es_delta = tipo == "incidente_delta"
+    if es_delta:
+        destinatarios = None
+        incidente = None
+        temas = [suscripciones.tema_incidente(incidente_id)]
+
+    print(f"📨 Notificación recibida - Tipo: {tipo}, Incidente: {incidente_id}, Correlación: {trazas.correlacion_actual()}")
     print(f"📋 Título: {titulo}")
-    print(f"👥 Destinatarios: {destinatarios if destinatarios else 'TODOS'}")
+    print(f"👥 Destinatarios: {destinatarios or temas or 'TODOS'}")
 
-    if not tipo or not titulo or not mensaje or not incidente_id:
+    if es_delta:
+        if not incidente_id or not isinstance(cambios, dict) or not cambios:
+            return {
+                "statusCode": 400,
+                "body": json.dumps({
+                    "message": "incidente_id y cambios son obligatorios en incidente_delta"
+                })
+            }
+    elif not tipo or not titulo or not mensaje or not incidente_id:
         return {
             "statusCode": 400,
             "body": json.dumps({
@@ -88,37 +270,77 @@ def lambda_handler(event, context):
         }
 
     # Validar tipo
-    tipos_validos = ["incidente_actualizado", "incidente_creado", "incidente_resuelto"]
-    if tipo not in tipos_validos:
+    if tipo not in TIPOS_VALIDOS:
         return {
             "statusCode": 400,
             "body": json.dumps({
-                "message": f"tipo debe ser uno de: {', '.join(tipos_validos)}"
+                "message": f"tipo debe ser uno de: {', '.join(TIPOS_VALIDOS)}"
             })
         }
 
-    # Escanear conexiones
-    scan_kwargs = {}
-    if destinatarios and isinstance(destinatarios, list) and len(destinatarios) > 0:
-        filter_expr = Attr("usuario_correo").is_in(destinatarios)
-        scan_kwargs["FilterExpression"] = filter_expr
-        print(f"🔍 Buscando conexiones para destinatarios específicos...")
-    else:
-        print(f"🔍 Buscando TODAS las conexiones activas...")
+    # Construir payload de notificación
+    payload = {
+        "tipo": tipo,
+        "titulo": titulo,
+        "mensaje": mensaje,
+        "incidente_id": incidente_id,
+        # En un vaciado agrupado, la del último evento de la ventana
+        "correlacion_id": body.get("correlacion_id") or trazas.correlacion_actual(),
+        "timestamp": datetime.utcnow().isoformat() + "Z"
+    }
+    if es_delta:
+        del payload["titulo"], payload["mensaje"]
+        payload["cambios"] = cambios
+    if body.get("agrupados"):
+        payload["agrupados"] = body["agrupados"]
 
-    conexiones = []
+    if not destinatarios and isinstance(incidente, dict):
+        try:
+            destinatarios = audiencia.resolver(tipo, incidente)
+            print(f"👥 Destinatarios resueltos: {len(destinatarios)}")
+        except Exception as e:
+            print(f"❌ Error resolviendo destinatarios: {e}")
+            return {
+                "statusCode": 500,
+                "body": json.dumps({"message": "Error al resolver destinatarios", "error": str(e)})
+            }
+
+    # Con datos del incidente nunca se difunde a todos, aunque nadie resulte destinatario
+    por_destinatario = isinstance(destinatarios, list) and (bool(destinatarios) or isinstance(incidente, dict))
+    por_tema = bool(temas) and isinstance(temas, list)
+
+    if not (por_destinatario or por_tema):
+        print(f"📤 Difusión a TODOS en {LOTES_DIFUSION} lotes...")
+        try:
+            encolados, resultados = _difundir_a_todos(payload)
+        except Exception as e:
+            print(f"❌ Error encolando la difusión: {e}")
+            return {
+                "statusCode": 500,
+                "body": json.dumps({"message": "Error al encolar la difusión", "error": str(e)})
+            }
+        respuesta = {"message": "Difusión encolada", "lotes": encolados}
+        if resultados is not None:
+            respuesta["resultados"] = resultados
+        return {
+            "statusCode": 200,
+            "body": json.dumps(respuesta)
+        }
+
+    # Destinatarios (índice por correo) y suscriptores de los temas (Query
+    # por tema), sin repetir conexiones: envío en esta invocación
     try:
-        response = table.scan(**scan_kwargs)
-        conexiones.extend(response.get("Items", []))
-        while "LastEvaluatedKey" in response:
-            scan_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
-            response = table.scan(**scan_kwargs)
-            conexiones.extend(response.get("Items", []))
-        
+        conexiones = []
+        if por_destinatario:
+            print(f"🔍 Buscando conexiones de {len(destinatarios)} destinatarios...")
+            conexiones.extend(_conexiones_destinatarios(destinatarios))
+        if por_tema:
+            print(f"🔍 Buscando suscriptores de {len(temas)} temas...")
+            vistas = {c["conexion_id"] for c in conexiones}
+            conexiones.extend(
+                c for c in suscripciones.conexiones_de_temas(temas) if c["conexion_id"] not in vistas
+            )
         print(f"📊 Conexiones encontradas: {len(conexiones)}")
-        for conn in conexiones:
-            print(f"  - {conn.get('usuario_correo')} ({conn.get('rol')}) - ID: {conn.get('conexion_id')}")
-            
     except Exception as e:
         print(f"❌ Error escaneando conexiones: {e}")
         return {
@@ -126,30 +348,73 @@ def lambda_handler(event, context):
             "body": json.dumps({"message": "Error al obtener conexiones", "error": str(e)})
         }
 
+    # Bandeja: cada usuario destinatario guarda el mensaje con su seq, esté
+    # conectado o no. Los deltas de vistas de detalle no se guardan.
+    seqs = {}
+    if not es_delta:
+        correos = (set(destinatarios) if por_destinatario else set()) | {c.get("usuario_correo") for c in conexiones}
+        try:
+            seqs = bandeja.agregar(correos, payload)
+        except Exception as e:
+            print(f"❌ Error guardando en bandejas: {e!r}")
+
     if not conexiones:
         print("⚠️ No hay conexiones activas")
         return {
             "statusCode": 200,
-            "body": json.dumps({"message": "Sin conexiones activas"})
+            "body": json.dumps({"message": "Sin conexiones activas", "en_bandeja": len(seqs)})
         }
 
-    # Construir payload de notificación
-    payload = {
-        "tipo": tipo,
-        "titulo": titulo,
-        "mensaje": mensaje,
-        "incidente_id": incidente_id,
-        "timestamp": datetime.utcnow().isoformat() + "Z"
-    }
-
     print(f"📤 Enviando notificaciones...")
-    enviados = _broadcast(conexiones, payload)
+    extra = {
+        c["conexion_id"]: {"seq": seqs[c["usuario_correo"]]}
+        for c in conexiones if c.get("usuario_correo") in seqs
+    }
+    resumen = _broadcast(conexiones, payload, extra)
 
     return {
         "statusCode": 200,
         "body": json.dumps({
             "message": "Notificaciones enviadas",
             "conexiones_encontradas": len(conexiones),
-            "mensajes_enviados": enviados
+            "mensajes_enviados": resumen["enviados"],
+            "en_bandeja": len(seqs),
+            "conexiones_obsoletas": len(resumen["obsoletos"]),
+            "mensajes_fallidos": resumen["fallidos"],
+            "latencia": resumen["latencia"]
         })
     }
+
+
+def procesar_lotes(event, context):
+    """
+    Worker de la cola de difusión (un lote por mensaje). Los lotes que fallan
+    se devuelven como batchItemFailures para que SQS los reintente.
+    """
+    fallidos = []
+    for message_id, lote in colas.mensajes_sqs(event):
+        trazas.iniciar(lote.get("payload", {}).get("correlacion_id"), "notificar_incidente_lote")
+        try:
+            resultado = _entregar_lote(lote)
+            print("[LOTE_DIFUSION]", json.dumps(resultado))
+        except Exception as e:
+            print(f"❌ Error entregando lote {lote.get('segmento')}: {e!r}")
+            fallidos.append({"itemIdentifier": message_id})
+        finally:
+            trazas.finalizar()
+    return {"batchItemFailures": fallidos}
+
+
+def procesar_coalescidos(event, context):
+    """Worker de la cola de vaciado: un mensaje por ventana de incidente."""
+    fallidos = []
+    for message_id, mensaje in colas.mensajes_sqs(event):
+        trazas.iniciar(None, "notificar_incidente_agrupado")
+        try:
+            print("[COALESCENCIA]", json.dumps(_vaciar(mensaje)))
+        except Exception as e:
+            print(f"❌ Error vaciando {mensaje.get('clave')}: {e!r}")
+            fallidos.append({"itemIdentifier": message_id})
+        finally:
+            trazas.finalizar()
+    return {"batchItemFailures": fallidos}
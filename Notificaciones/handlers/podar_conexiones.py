@@ -0,0 +1,78 @@
+import os
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.exceptions import ClientError, BotoCoreError
+from handlers import difusion, conexiones
+
+# Podador programado de conexiones WebSocket: las que no dan señales desde
+# hace INACTIVA_SEGUNDOS se sondean con GetConnection. Solo se borran las que
+# API Gateway ya no conoce (410); las que siguen abiertas se renuevan como si
+# hubieran enviado un latido (un cliente callado no es un cliente caído).
+INACTIVA_SEGUNDOS = int(os.getenv("CONEXION_INACTIVA_SEGUNDOS", "600"))
+
+management_api = difusion.cliente(os.environ["WEBSOCKET_API_ENDPOINT"].replace("wss://", "https://"))
+
+
+def _ultimo_latido(item):
+    """Conexiones anteriores a 'last_seen': se toma su TTL menos la duración configurada."""
+    if "last_seen" in item:
+        return int(item["last_seen"])
+    return int(item.get("expiracion_ttl", 0)) - conexiones.TTL_HORAS * 3600
+
+
+def _inactivas(limite):
+    items = []
+    scan_kwargs = {
+        "ProjectionExpression": "conexion_id, last_seen, expiracion_ttl",
+    }
+    while True:
+        resp = conexiones.table.scan(**scan_kwargs)
+        items.extend(i for i in resp.get("Items", []) if _ultimo_latido(i) < limite)
+        lek = resp.get("LastEvaluatedKey")
+        if not lek:
+            break
+        scan_kwargs["ExclusiveStartKey"] = lek
+    return items
+
+
+def _sondear(connection_id):
+    """True si la conexión sigue abierta, False si API Gateway no la conoce (410), None si no se pudo saber."""
+    try:
+        management_api.get_connection(ConnectionId=connection_id)
+        return True
+    except ClientError as exc:
+        if difusion._estado_http(exc) == 410:
+            return False
+        print(f"Error sondeando {connection_id}: {exc}")
+        return None
+    except BotoCoreError as exc:
+        print(f"Error sondeando {connection_id}: {exc!r}")
+        return None
+
+
+def lambda_handler(event, context):
+    ahora = int(time.time())
+    candidatas = _inactivas(ahora - INACTIVA_SEGUNDOS)
+
+    por_sondear = [i["conexion_id"] for i in candidatas]
+
+    muertas, renovadas = [], 0
+    if por_sondear:
+        with ThreadPoolExecutor(max_workers=min(difusion.HILOS, len(por_sondear))) as executor:
+            vivas = list(executor.map(_sondear, por_sondear))
+            muertas = [cid for cid, viva in zip(por_sondear, vivas) if viva is False]
+            abiertas = [cid for cid, viva in zip(por_sondear, vivas) if viva is True]
+            renovadas = sum(executor.map(conexiones.latido, abiertas))
+
+    eliminadas = conexiones.eliminar(muertas)
+    resumen = {
+        "inactivas": len(candidatas),
+        "sondeadas": len(por_sondear),
+        "muertas": len(muertas),
+        "renovadas": renovadas,
+        "eliminadas": eliminadas,
+    }
+    print("[PODA_CONEXIONES]", json.dumps(resumen))
+    return resumen
@@ -0,0 +1,41 @@
+import os
+import json
+
+from botocore.exceptions import ClientError
+from handlers import bandeja, colas, difusion
+
+# Durante $connect API Gateway aún no acepta mensajes hacia la conexión: el
+# reenvío de la bandeja pedido con ?since_seq= se encola con un breve retraso
+# y lo entrega este worker.
+RETRASO_SEGUNDOS = 1
+
+management_api = difusion.cliente(os.environ["WEBSOCKET_API_ENDPOINT"].replace("wss://", "https://"))
+
+
+def entregar(solicitud):
+    try:
+        estado = bandeja.reenviar(management_api, solicitud["conexion_id"], solicitud["correo"], solicitud["since_seq"])
+    except ClientError as e:
+        if difusion._estado_http(e) == 410:
+            # El cliente ya se desconectó: se reenviará en su próxima conexión
+            return {"conexion_id": solicitud["conexion_id"], "reenviados": 0}
+        raise
+    return {"conexion_id": solicitud["conexion_id"], "reenviados": len(estado["mensajes"]), "no_leidos": estado["no_leidos"]}
+
+
+def programar(conexion_id, correo, since_seq):
+    colas.cola_reenvio(entregar).encolar(
+        [{"conexion_id": conexion_id, "correo": correo, "since_seq": since_seq}],
+        retraso=RETRASO_SEGUNDOS,
+    )
+
+
+def lambda_handler(event, context):
+    fallidos = []
+    for message_id, solicitud in colas.mensajes_sqs(event):
+        try:
+            print("[REENVIO_BANDEJA]", json.dumps(entregar(solicitud)))
+        except Exception as e:
+            print(f"❌ Error reenviando bandeja a {solicitud.get('conexion_id')}: {e!r}")
+            fallidos.append({"itemIdentifier": message_id})
+    return {"batchItemFailures": fallidos}
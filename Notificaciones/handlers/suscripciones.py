@@ -0,0 +1,130 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from boto3.dynamodb.conditions import Key
+from handlers import conexiones
+from handlers.destinatarios import ROLES_ADMIN
+
+# Canales de notificación. Un tema es "<prefijo>#<valor>":
+#   rol#<rol>     todos los usuarios de un rol (solo el rol propio)
+#   piso#<piso>   incidentes de un piso
+#   tipo#<tipo>   incidentes de un tipo (área)
+#   incidente#<id> cambios de un incidente concreto (vista de detalle); solo
+#                  administradores o quien lo reportó, como en search_report
+# TABLE_SUSCRIPCIONES tiene clave (tema, conexion_id): los destinatarios de
+# un tema se obtienen con un Query, sin recorrer la tabla de conexiones.
+PREFIJOS = ("rol", "piso", "tipo", "incidente")
+PISO_RANGO = range(-2, 12)
+MAX_TEMAS = 20
+HILOS_CONSULTA = int(os.getenv("NOTIFICACIONES_HILOS_CONSULTA", "16"))
+
+table = conexiones.suscripciones_table
+incidentes_table = conexiones.dynamodb.Table(os.getenv("TABLE_INCIDENTES", "TABLE_INCIDENTES"))
+
+
+def tema_rol(rol):
+    return f"rol#{rol}"
+
+
+def tema_incidente(incidente_id):
+    return f"incidente#{incidente_id}"
+
+
+def puede_observar(incidente_id, rol, correo):
+    """True si el usuario puede seguir los cambios del incidente (admin o reportante)."""
+    if rol in ROLES_ADMIN:
+        return True
+    incidente = incidentes_table.get_item(
+        Key={"incidente_id": incidente_id},
+        ProjectionExpression="usuario_correo"
+    ).get("Item")
+    return bool(incidente) and bool(correo) and incidente.get("usuario_correo") == correo
+
+
+def validar(temas, rol, correo=None):
+    """
+    Devuelve (válidos, rechazados). Un cliente solo puede suscribirse a su
+    propio rol y a los incidentes que puede ver.
+    """
+    validos, rechazados = [], []
+    for tema in temas or []:
+        prefijo, _, valor = str(tema).partition("#")
+        if prefijo not in PREFIJOS or not valor:
+            rechazados.append(tema)
+        elif prefijo == "rol" and valor != rol:
+            rechazados.append(tema)
+        elif prefijo == "piso" and not (valor.lstrip("-").isdigit() and int(valor) in PISO_RANGO):
+            rechazados.append(tema)
+        elif prefijo == "incidente" and not puede_observar(valor, rol, correo):
+            rechazados.append(tema)
+        else:
+            validos.append(f"{prefijo}#{valor}")
+    validos = list(dict.fromkeys(validos))
+    return validos[:MAX_TEMAS], rechazados + validos[MAX_TEMAS:]
+
+
+def suscribir(conexion_id, correo, temas):
+    if not temas:
+        return
+    ttl = conexiones.expiracion_ttl()
+    with table.batch_writer() as batch:
+        for tema in temas:
+            batch.put_item(Item={
+                "tema": tema,
+                "conexion_id": conexion_id,
+                "usuario_correo": correo,
+                "expiracion_ttl": ttl,
+            })
+    conexiones.table.update_item(
+        Key={"conexion_id": conexion_id},
+        UpdateExpression="ADD temas :temas",
+        ExpressionAttributeValues={":temas": set(temas)},
+    )
+
+
+def desuscribir(conexion_id, temas):
+    if not temas:
+        return
+    with table.batch_writer() as batch:
+        for tema in temas:
+            batch.delete_item(Key={"tema": tema, "conexion_id": conexion_id})
+    conexiones.table.update_item(
+        Key={"conexion_id": conexion_id},
+        UpdateExpression="DELETE temas :temas",
+        ExpressionAttributeValues={":temas": set(temas)},
+    )
+
+
+def _suscriptores(tema):
+    items = []
+    query_kwargs = {
+        "KeyConditionExpression": Key("tema").eq(tema),
+        "ProjectionExpression": "conexion_id, usuario_correo",
+    }
+    while True:
+        resp = table.query(**query_kwargs)
+        items.extend(resp.get("Items", []))
+        lek = resp.get("LastEvaluatedKey")
+        if not lek:
+            break
+        query_kwargs["ExclusiveStartKey"] = lek
+    return items
+
+
+def conexiones_de_temas(temas):
+    """
+    Conexiones suscritas a cualquiera de los temas (un Query por tema, en
+    paralelo). Cada conexión aparece una vez, con los temas por los que coincide.
+    """
+    temas = list(dict.fromkeys(temas))
+    if not temas:
+        return []
+    with ThreadPoolExecutor(max_workers=min(HILOS_CONSULTA, len(temas))) as executor:
+        resultados = list(executor.map(_suscriptores, temas))
+
+    por_conexion = {}
+    for tema, items in zip(temas, resultados):
+        for item in items:
+            conexion = por_conexion.setdefault(item["conexion_id"], {**item, "temas": []})
+            conexion["temas"].append(tema)
+    return list(por_conexion.values())
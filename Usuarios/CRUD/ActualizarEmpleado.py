@@ -2,13 +2,14 @@ import json
 import os
 import boto3
 from botocore.exceptions import ClientError
+from CRUD import busqueda, cache, contadores
+from comun import areas
 
 TABLE_EMPLEADOS_NAME = os.getenv("TABLE_EMPLEADOS", "TABLE_EMPLEADOS")
 CORS_HEADERS = { "Access-Control-Allow-Origin": "*" }
 dynamodb = boto3.resource("dynamodb")
 empleados_table = dynamodb.Table(TABLE_EMPLEADOS_NAME)
 
-TIPOS_AREA = {"mantenimiento", "electricidad", "limpieza", "seguridad", "ti", "logistica", "otros"}
 ESTADOS_VALIDOS = {"activo", "inactivo"}
 ROLES_PERMITIDOS = {"personal_administrativo", "autoridad"}
 
@@ -20,6 +21,38 @@ def _parse_body(event):
         body = {}
     return body
 
+
+def _aplicar_cambios(empleado, body):
+    """Aplica los campos del body sobre el empleado. Devuelve (error, hubo_cambios)."""
+    hubo_cambios = False
+
+    if "nombre" in body and body["nombre"]:
+        empleado["nombre"] = body["nombre"]
+        hubo_cambios = True
+
+    if "tipo_area" in body:
+        tipo_area = areas.normalizar_area(body["tipo_area"])
+        if tipo_area not in areas.TIPOS_AREA:
+            return "tipo_area inválido", False
+        empleado["tipo_area"] = tipo_area
+        hubo_cambios = True
+
+    if "estado" in body:
+        estado = body["estado"]
+        if estado not in ESTADOS_VALIDOS:
+            return "estado inválido", False
+        empleado["estado"] = estado
+        hubo_cambios = True
+
+    if "contacto" in body:
+        contacto = body["contacto"]
+        if contacto is not None and not isinstance(contacto, dict):
+            return "contacto debe ser un objeto", False
+        empleado["contacto"] = contacto or {}
+        hubo_cambios = True
+
+    return None, hubo_cambios
+
 def lambda_handler(event, context):
     authorizer = event.get("requestContext", {}).get("authorizer", {})
     if authorizer.get("rol") not in ROLES_PERMITIDOS:
@@ -38,77 +71,83 @@ def lambda_handler(event, context):
             "body": json.dumps({"message": "empleado_id es obligatorio"})
         }
 
-    try:
-        resp = empleados_table.get_item(Key={"empleado_id": empleado_id})
-    except ClientError as e:
-        return {
-            "statusCode": 500,
-            "headers": CORS_HEADERS,
-            "body": json.dumps({"message": f"Error al obtener empleado: {str(e)}"})
-        }
-
-    if "Item" not in resp:
-        return {
-            "statusCode": 404,
-            "headers": CORS_HEADERS,
-            "body": json.dumps({"message": "Empleado no encontrado"})
-        }
-
-    empleado = resp["Item"]
-    hubo_cambios = False
-
-    if "nombre" in body and body["nombre"]:
-        empleado["nombre"] = body["nombre"]
-        hubo_cambios = True
+    # La lectura sale de la caché; si otro contenedor escribió antes, la
+    # condición de versión falla y se reintenta una vez con datos frescos
+    for intento in range(2):
+        try:
+            empleado = cache.empleados.obtener(empleado_id)
+        except ClientError as e:
+            return {
+                "statusCode": 500,
+                "headers": CORS_HEADERS,
+                "body": json.dumps({"message": f"Error al obtener empleado: {str(e)}"})
+            }
 
-    if "tipo_area" in body:
-        tipo_area = body["tipo_area"]
-        if tipo_area not in TIPOS_AREA:
+        if empleado is None:
             return {
-                "statusCode": 400,
+                "statusCode": 404,
                 "headers": CORS_HEADERS,
-                "body": json.dumps({"message": "tipo_area inválido"})
+                "body": json.dumps({"message": "Empleado no encontrado"})
             }
-        empleado["tipo_area"] = tipo_area
-        hubo_cambios = True
 
-    if "estado" in body:
-        estado = body["estado"]
-        if estado not in ESTADOS_VALIDOS:
+        empleado_anterior = dict(empleado)
+        error, hubo_cambios = _aplicar_cambios(empleado, body)
+        if error:
             return {
                 "statusCode": 400,
                 "headers": CORS_HEADERS,
-                "body": json.dumps({"message": "estado inválido"})
+                "body": json.dumps({"message": error})
             }
-        empleado["estado"] = estado
-        hubo_cambios = True
 
-    if "contacto" in body:
-        contacto = body["contacto"]
-        if contacto is not None and not isinstance(contacto, dict):
+        if not hubo_cambios:
             return {
                 "statusCode": 400,
                 "headers": CORS_HEADERS,
-                "body": json.dumps({"message": "contacto debe ser un objeto"})
+                "body": json.dumps({"message": "No hay cambios para aplicar"})
             }
-        empleado["contacto"] = contacto or {}
-        hubo_cambios = True
 
-    if not hubo_cambios:
-        return {
-            "statusCode": 400,
-            "headers": CORS_HEADERS,
-            "body": json.dumps({"message": "No hay cambios para aplicar"})
-        }
+        nueva_version, condicion = cache.condicion_version(empleado_anterior)
+        empleado["version"] = nueva_version
 
-    try:
-        empleados_table.put_item(Item=empleado)
-    except ClientError as e:
-        return {
-            "statusCode": 500,
-            "headers": CORS_HEADERS,
-            "body": json.dumps({"message": f"Error al actualizar empleado: {str(e)}"})
-        }
+        estado_anterior = empleado_anterior.get("estado")
+        try:
+            if empleado.get("estado") == estado_anterior:
+                empleados_table.put_item(Item=empleado, **condicion)
+            else:
+                # Cambio de estado: empleado y contadores en la misma transacción
+                operaciones = [
+                    {"Put": {"TableName": TABLE_EMPLEADOS_NAME, "Item": empleado, **condicion}},
+                    contadores.incremento(contadores.clave_empleados(empleado["estado"]), 1),
+                ]
+                if estado_anterior:
+                    operaciones.append(contadores.incremento(contadores.clave_empleados(estado_anterior), -1))
+                dynamodb.meta.client.transact_write_items(TransactItems=operaciones)
+            break
+        except ClientError as e:
+            codigo = e.response.get("Error", {}).get("Code")
+            motivos = [r.get("Code") for r in e.response.get("CancellationReasons", [])]
+            if codigo == "ConditionalCheckFailedException" or motivos[:1] == ["ConditionalCheckFailed"]:
+                cache.empleados.invalidar(empleado_id)
+                if intento == 0:
+                    continue
+                return {
+                    "statusCode": 409,
+                    "headers": CORS_HEADERS,
+                    "body": json.dumps({"message": "El empleado fue modificado por otra solicitud, intenta nuevamente"})
+                }
+            return {
+                "statusCode": 500,
+                "headers": CORS_HEADERS,
+                "body": json.dumps({"message": f"Error al actualizar empleado: {str(e)}"})
+            }
+
+    cache.empleados.observar(empleado)
+    busqueda.reindexar(
+        "empleado",
+        empleado_id,
+        anterior=busqueda.datos_empleado(empleado_anterior),
+        nuevo=busqueda.datos_empleado(empleado)
+    )
 
     return {
         "statusCode": 200,
@@ -116,5 +155,5 @@ def lambda_handler(event, context):
         "body": json.dumps({
             "message": "Empleado actualizado correctamente",
             "empleado": empleado
-        })
+        }, default=str)
     }
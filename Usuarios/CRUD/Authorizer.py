@@ -15,6 +15,11 @@ def lambda_handler(event, context):
     if not resultado.get("valido"):
         raise Exception("Unauthorized")
     
+    # La política cubre todos los métodos de la API: API Gateway cachea la
+    # respuesta por token y la reutiliza en los demás endpoints.
+    arn_api = event["methodArn"].split("/", 2)
+    recurso = f"{arn_api[0]}/{arn_api[1]}/*"
+
     # Retornar contexto con información del usuario
     return {
         "principalId": resultado["correo"],
@@ -24,13 +29,14 @@ def lambda_handler(event, context):
                 {
                     "Action": "execute-api:Invoke",
                     "Effect": "Allow",
-                    "Resource": event["methodArn"]
+                    "Resource": recurso
                 }
             ]
         },
         "context": {
             "correo": resultado["correo"],
             "rol": resultado["rol"],
-            "nombre": resultado["nombre"]
+            "nombre": resultado["nombre"],
+            "jti": resultado.get("jti") or ""
         }
     }
\ No newline at end of file
@@ -0,0 +1,56 @@
+import json
+from CRUD import busqueda
+
+CORS_HEADERS = {"Access-Control-Allow-Origin": "*"}
+ROLES_PERMITIDOS = {"personal_administrativo", "autoridad"}
+
+
+def lambda_handler(event, context):
+    authorizer = event.get("requestContext", {}).get("authorizer", {})
+    if authorizer.get("rol") not in ROLES_PERMITIDOS:
+        return {
+            "statusCode": 403,
+            "headers": CORS_HEADERS,
+            "body": json.dumps({"message": "No tienes permiso para buscar usuarios o empleados"})
+        }
+
+    params = event.get("queryStringParameters") or {}
+    texto = (params.get("q") or "").strip()
+    tipo = params.get("tipo") or None
+
+    if len(busqueda.normalizar(texto)) < busqueda.PREFIJO_MIN:
+        return {
+            "statusCode": 400,
+            "headers": CORS_HEADERS,
+            "body": json.dumps({"message": f"q debe tener al menos {busqueda.PREFIJO_MIN} caracteres"})
+        }
+
+    if tipo and tipo not in busqueda.TIPOS:
+        return {
+            "statusCode": 400,
+            "headers": CORS_HEADERS,
+            "body": json.dumps({"message": "tipo inválido (usuario | empleado)"})
+        }
+
+    try:
+        k = max(1, min(int(params.get("k", 10)), 50))
+    except (TypeError, ValueError):
+        k = 10
+
+    try:
+        resultados = busqueda.buscar(texto, tipo=tipo, k=k)
+    except Exception as e:
+        return {
+            "statusCode": 500,
+            "headers": CORS_HEADERS,
+            "body": json.dumps({"message": f"Error al buscar: {str(e)}"})
+        }
+
+    return {
+        "statusCode": 200,
+        "headers": CORS_HEADERS,
+        "body": json.dumps({
+            "resultados": resultados,
+            "count": len(resultados)
+        }, default=str)
+    }
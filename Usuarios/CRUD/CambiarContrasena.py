@@ -3,6 +3,7 @@ import boto3
 import os
 import uuid
 from datetime import datetime, timezone
+from CRUD import contrasenas, cache
 
 CORS_HEADERS = { "Access-Control-Allow-Origin": "*" }
 TABLE_USUARIOS_NAME = os.getenv("TABLE_USUARIOS", "TABLE_USUARIOS")
@@ -166,7 +167,7 @@ def lambda_handler(event, context):
             "body": json.dumps({"message": "No tienes permiso para cambiar la contraseña de este usuario"})
         }
 
-    if requiere_actual and usuario_objetivo.get("contrasena") != contrasena_actual:
+    if requiere_actual and not contrasenas.verificar(contrasena_actual, usuario_objetivo.get("contrasena")):
         _log_event(
             accion="cambiar_contrasena",
             usuario_autenticado=usuario_autenticado,
@@ -183,9 +184,10 @@ def lambda_handler(event, context):
     try:
         usuarios_table.update_item(
             Key={"correo": correo_objetivo},
-            UpdateExpression="SET contrasena = :nueva",
-            ExpressionAttributeValues={":nueva": nueva_contrasena}
+            UpdateExpression="SET contrasena = :nueva ADD version :uno",
+            ExpressionAttributeValues={":nueva": contrasenas.hashear(nueva_contrasena), ":uno": 1}
         )
+        cache.usuarios.invalidar(correo_objetivo)
     except Exception as e:
         _log_event(
             accion="cambiar_contrasena",
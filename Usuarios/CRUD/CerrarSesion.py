@@ -0,0 +1,95 @@
+import json
+import boto3
+import os
+import uuid
+from datetime import datetime, timezone
+from comun import revocacion
+
+CORS_HEADERS = {"Access-Control-Allow-Origin": "*"}
+TABLE_LOGS_NAME = os.getenv("TABLE_LOGS", "TABLE_LOGS")
+
+dynamodb = boto3.resource("dynamodb")
+logs_table = dynamodb.Table(TABLE_LOGS_NAME)
+
+
+def _log_event(accion, usuario_autenticado, resultado, mensaje=None, detalles=None):
+    """
+    Registra un log en DynamoDB.
+    IMPORTANTE: no guardar tokens.
+    """
+    try:
+        item = {
+            "id": str(uuid.uuid4()),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "servicio": "usuarios-cerrar-sesion",
+            "accion": accion,
+            "resultado": resultado,
+        }
+
+        if usuario_autenticado:
+            item["usuario"] = usuario_autenticado.get("correo")
+            item["rol"] = usuario_autenticado.get("rol")
+
+        if mensaje:
+            item["mensaje"] = mensaje
+
+        if detalles:
+            item["detalles"] = detalles
+
+        logs_table.put_item(Item=item)
+    except Exception:
+        pass
+
+
+def lambda_handler(event, context):
+    authorizer = event.get("requestContext", {}).get("authorizer", {})
+
+    if not authorizer:
+        return {
+            "statusCode": 401,
+            "headers": CORS_HEADERS,
+            "body": json.dumps({"message": "Token requerido"})
+        }
+
+    usuario_autenticado = {
+        "correo": authorizer.get("correo"),
+        "rol": authorizer.get("rol")
+    }
+    jti = authorizer.get("jti")
+
+    if not jti:
+        # Tokens emitidos antes de incluir 'jti': solo se pueden revocar todos juntos
+        return {
+            "statusCode": 400,
+            "headers": CORS_HEADERS,
+            "body": json.dumps({"message": "El token no admite cierre de sesión, inicia sesión nuevamente"})
+        }
+
+    try:
+        revocacion.revocar_token(jti, correo=usuario_autenticado["correo"])
+    except Exception as e:
+        _log_event(
+            accion="cerrar_sesion",
+            usuario_autenticado=usuario_autenticado,
+            resultado="error",
+            mensaje="Error al revocar token",
+            detalles={"error": str(e)[:500]}
+        )
+        return {
+            "statusCode": 500,
+            "headers": CORS_HEADERS,
+            "body": json.dumps({"message": "Error al cerrar sesión"})
+        }
+
+    _log_event(
+        accion="cerrar_sesion",
+        usuario_autenticado=usuario_autenticado,
+        resultado="ok",
+        mensaje="Sesión cerrada"
+    )
+
+    return {
+        "statusCode": 200,
+        "headers": CORS_HEADERS,
+        "body": json.dumps({"message": "Sesión cerrada correctamente"})
+    }
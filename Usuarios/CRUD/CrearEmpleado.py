@@ -5,6 +5,8 @@ import boto3
 from botocore.exceptions import ClientError 
 from decimal import Decimal                  
 from datetime import datetime, timezone     
+from CRUD import busqueda, cache, contadores
+from comun import areas
 
 CORS_HEADERS = { "Access-Control-Allow-Origin": "*" }
 TABLE_EMPLEADOS_NAME = os.getenv("TABLE_EMPLEADOS", "TABLE_EMPLEADOS")
@@ -14,7 +16,6 @@ dynamodb = boto3.resource("dynamodb")
 empleados_table = dynamodb.Table(TABLE_EMPLEADOS_NAME)
 logs_table = dynamodb.Table(TABLE_LOGS_NAME) if TABLE_LOGS_NAME else None
 
-TIPOS_AREA = {"mantenimiento", "electricidad", "limpieza", "seguridad", "ti", "logistica", "otros"}
 ESTADOS_VALIDOS = {"activo", "inactivo"}
 
 
@@ -151,7 +152,7 @@ def lambda_handler(event, context):
 
     body = _parse_body(event)
     nombre = body.get("nombre")
-    tipo_area = body.get("tipo_area")
+    tipo_area = areas.normalizar_area(body.get("tipo_area"))
     estado = body.get("estado", "activo")
     contacto = body.get("contacto", {})
 
@@ -168,7 +169,7 @@ def lambda_handler(event, context):
             "body": json.dumps({"message": "nombre y tipo_area son obligatorios"})
         }
 
-    if tipo_area not in TIPOS_AREA:
+    if tipo_area not in areas.TIPOS_AREA:
         return {
             "statusCode": 400,
             "headers": CORS_HEADERS,
@@ -198,7 +199,16 @@ def lambda_handler(event, context):
     }
 
     try:
-        empleados_table.put_item(Item=empleado)
+        dynamodb.meta.client.transact_write_items(TransactItems=[
+            {
+                "Put": {
+                    "TableName": TABLE_EMPLEADOS_NAME,
+                    "Item": empleado,
+                    "ConditionExpression": "attribute_not_exists(empleado_id)"
+                }
+            },
+            contadores.incremento(contadores.clave_empleados(estado), 1)
+        ])
     except Exception as e:
         registrar_log_sistema(
             nivel="ERROR",
@@ -212,6 +222,9 @@ def lambda_handler(event, context):
             "body": json.dumps({"message": f"Error al crear empleado: {str(e)}"})
         }
 
+    cache.empleados.observar(empleado)
+    busqueda.reindexar("empleado", empleado["empleado_id"], nuevo=busqueda.datos_empleado(empleado))
+
     registrar_log_auditoria(
         usuario_correo=correo_actor,
         entidad="empleado",
@@ -3,6 +3,7 @@ import boto3
 import os
 import requests
 from CRUD.utils import generar_token, validar_token, ALLOWED_ROLES
+from CRUD import contrasenas, busqueda, cache
 from botocore.exceptions import ClientError  
 from decimal import Decimal                  
 import uuid                                  
@@ -336,7 +337,7 @@ def lambda_handler(event, context):
     item = {
         "nombre": nombre,
         "correo": correo,
-        "contrasena": contrasena,
+        "contrasena": contrasenas.hashear(contrasena),
         "rol": rol
     }
 
@@ -351,6 +352,9 @@ def lambda_handler(event, context):
         )
         return _response(500, {"message": "Error interno al crear el usuario"})
 
+    cache.usuarios.observar(item)
+    busqueda.reindexar("usuario", correo, nuevo=busqueda.datos_usuario(item))
+
     actor_correo = correo_autenticado or correo
     registrar_log_auditoria(
         usuario_correo=actor_correo,
@@ -358,7 +362,7 @@ def lambda_handler(event, context):
         entidad_id=correo,
         operacion="creacion",
         valores_previos={},
-        valores_nuevos=item
+        valores_nuevos={**item, "contrasena": "***"}
     )
 
     registrar_log_sistema(
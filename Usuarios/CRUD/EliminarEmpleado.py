@@ -4,6 +4,7 @@ import boto3
 import uuid
 from datetime import datetime, timezone
 from botocore.exceptions import ClientError
+from CRUD import busqueda, cache, contadores
 
 TABLE_EMPLEADOS_NAME = os.getenv("TABLE_EMPLEADOS", "TABLE_EMPLEADOS")
 TABLE_LOGS_NAME = os.getenv("TABLE_LOGS", "TABLE_LOGS")
@@ -124,8 +125,21 @@ def lambda_handler(event, context):
             "body": json.dumps({"message": "Empleado no encontrado"})
         }
 
+    # El contador del estado se descuenta solo si el empleado sigue en ese estado
+    estado = resp["Item"].get("estado")
+    operaciones = [{
+        "Delete": {
+            "TableName": TABLE_EMPLEADOS_NAME,
+            "Key": {"empleado_id": empleado_id},
+            "ConditionExpression": "estado = :estado" if estado else "attribute_not_exists(estado)",
+            **({"ExpressionAttributeValues": {":estado": estado}} if estado else {})
+        }
+    }]
+    if estado:
+        operaciones.append(contadores.incremento(contadores.clave_empleados(estado), -1))
+
     try:
-        empleados_table.delete_item(Key={"empleado_id": empleado_id})
+        dynamodb.meta.client.transact_write_items(TransactItems=operaciones)
     except ClientError as e:
         _log_event(
             accion="eliminar_empleado",
@@ -143,6 +157,9 @@ def lambda_handler(event, context):
             "body": json.dumps({"message": f"Error al eliminar empleado: {str(e)}"})
         }
 
+    cache.empleados.invalidar(empleado_id)
+    busqueda.reindexar("empleado", empleado_id, anterior=busqueda.datos_empleado(resp["Item"]))
+
     _log_event(
         accion="eliminar_empleado",
         usuario_autenticado=usuario_autenticado,
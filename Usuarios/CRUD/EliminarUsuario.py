@@ -3,6 +3,8 @@ import boto3
 import os
 import uuid
 from datetime import datetime, timezone
+from comun import revocacion
+from CRUD import busqueda, trabajos, cache
 
 TABLE_USUARIOS_NAME = os.getenv("TABLE_USUARIOS", "TABLE_USUARIOS")
 TABLE_LOGS_NAME = os.getenv("TABLE_LOGS", "TABLE_LOGS")  
@@ -188,8 +190,24 @@ def lambda_handler(event, context):
             "body": json.dumps({"message": "No tienes permiso para eliminar este usuario"})
         }
 
+    # Baja del usuario y trabajo de cascada (conexiones e incidentes) en una
+    # sola transacción; la cascada se ejecuta en segundo plano
+    trabajo = trabajos.nuevo(
+        "eliminar_usuario",
+        correo=correo_a_eliminar,
+        solicitado_por=usuario_autenticado["correo"]
+    )
     try:
-        usuarios_table.delete_item(Key={"correo": correo_a_eliminar})
+        dynamodb.meta.client.transact_write_items(TransactItems=[
+            {
+                "Delete": {
+                    "TableName": TABLE_USUARIOS_NAME,
+                    "Key": {"correo": correo_a_eliminar},
+                    "ConditionExpression": "attribute_exists(correo)"
+                }
+            },
+            trabajos.put_transaccional(trabajo)
+        ])
     except Exception as e:
         _log_event(
             accion="eliminar_usuario",
@@ -207,6 +225,24 @@ def lambda_handler(event, context):
             "body": json.dumps({"message": f"Error al eliminar usuario: {str(e)}"})
         }
 
+    cache.usuarios.invalidar(correo_a_eliminar)
+    busqueda.reindexar("usuario", correo_a_eliminar, anterior=busqueda.datos_usuario(usuario_a_eliminar))
+
+    # Los tokens ya emitidos del usuario dejan de ser válidos
+    try:
+        revocacion.revocar_usuario(correo_a_eliminar)
+    except Exception as e:
+        _log_event(
+            accion="eliminar_usuario",
+            usuario_autenticado=usuario_autenticado,
+            resultado="error",
+            mensaje="Error al revocar tokens del usuario eliminado",
+            detalles={
+                "correo_a_eliminar": correo_a_eliminar,
+                "error": str(e)[:500]
+            }
+        )
+
     _log_event(
         accion="eliminar_usuario",
         usuario_autenticado=usuario_autenticado,
@@ -214,12 +250,16 @@ def lambda_handler(event, context):
         mensaje="Usuario eliminado correctamente",
         detalles={
             "correo_a_eliminar": correo_a_eliminar,
-            "rol_a_eliminar": rol_a_eliminar
+            "rol_a_eliminar": rol_a_eliminar,
+            "trabajo_id": trabajo["trabajo_id"]
         }
     )
 
     return {
-        "statusCode": 200,
+        "statusCode": 202,
         "headers": CORS_HEADERS,
-        "body": json.dumps({"message": "Usuario eliminado correctamente"})
+        "body": json.dumps({
+            "message": "Usuario eliminado correctamente",
+            "trabajo_id": trabajo["trabajo_id"]
+        })
     }
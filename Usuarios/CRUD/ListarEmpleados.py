@@ -1,7 +1,9 @@
 import json
+import base64
 import os
 import boto3
-from boto3.dynamodb.conditions import Attr
+from boto3.dynamodb.conditions import Key
+from CRUD import contadores
 
 TABLE_EMPLEADOS_NAME = os.getenv("TABLE_EMPLEADOS", "TABLE_EMPLEADOS")
 CORS_HEADERS = {"Access-Control-Allow-Origin": "*"}
@@ -10,6 +12,8 @@ dynamodb = boto3.resource("dynamodb")
 empleados_table = dynamodb.Table(TABLE_EMPLEADOS_NAME)
 
 ROLES_PERMITIDOS = {"personal_administrativo", "autoridad"}
+ESTADOS_VALIDOS = ("activo", "inactivo")
+INDICE_ESTADO_NOMBRE = "EstadoNombreIndex"
 
 def _parse_body(event):
     body = event.get("body", {})
@@ -19,6 +23,79 @@ def _parse_body(event):
         body = {}
     return body
 
+# Campos de la LastEvaluatedKey de cada recorrido: ambos usan el mismo cursor
+CAMPOS_CURSOR_ESTADO = {"estado", "nombre", "empleado_id"}
+CAMPOS_CURSOR_TABLA = {"empleado_id"}
+
+
+def _codificar_cursor(clave):
+    return base64.urlsafe_b64encode(json.dumps(clave).encode("utf-8")).decode("ascii")
+
+
+def _decodificar_cursor(cursor, campos):
+    if not isinstance(cursor, str):
+        return None
+    try:
+        clave = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(clave, dict) or set(clave) != campos:
+        return None
+    return clave
+
+
+def _pagina(operacion, kwargs, last_key, campos, total, estado=None):
+    """
+    Ejecuta una página (Query o Scan) continuando desde 'last_key'. El cursor
+    es la LastEvaluatedKey en base64, igual en los dos recorridos.
+    """
+    if last_key:
+        clave = _decodificar_cursor(last_key, campos)
+        if clave is None or (estado and clave["estado"] != estado):
+            return {
+                "statusCode": 400,
+                "headers": CORS_HEADERS,
+                "body": json.dumps({"message": "last_key inválido"})
+            }
+        kwargs["ExclusiveStartKey"] = clave
+
+    try:
+        response = operacion(**kwargs)
+    except Exception as e:
+        return {
+            "statusCode": 500,
+            "headers": CORS_HEADERS,
+            "body": json.dumps({"message": f"Error al listar empleados: {str(e)}"})
+        }
+
+    items = response.get("Items", [])
+    last_evaluated = response.get("LastEvaluatedKey")
+    return {
+        "statusCode": 200,
+        "headers": CORS_HEADERS,
+        "body": json.dumps({
+            "empleados": items,
+            "count": len(items),
+            "total": total,
+            "last_key": _codificar_cursor(last_evaluated) if last_evaluated else None
+        }, default=str)
+    }
+
+
+def _listar_por_estado(estado, limit, last_key, total):
+    """
+    Empleados de un estado ordenados por nombre (Query sobre EstadoNombreIndex).
+    A diferencia de un Scan filtrado, cada página trae 'limit' empleados
+    salvo la última.
+    """
+    query_kwargs = {
+        "IndexName": INDICE_ESTADO_NOMBRE,
+        "KeyConditionExpression": Key("estado").eq(estado),
+        "Limit": limit
+    }
+    return _pagina(empleados_table.query, query_kwargs, last_key, CAMPOS_CURSOR_ESTADO, total, estado)
+
+
 def lambda_handler(event, context):
     authorizer = event.get("requestContext", {}).get("authorizer", {})
     if authorizer.get("rol") not in ROLES_PERMITIDOS:
@@ -38,32 +115,22 @@ def lambda_handler(event, context):
     filtro_estado = body.get("estado")
     last_key = body.get("last_key")
 
-    scan_kwargs = {"Limit": limit}
-    if isinstance(last_key, dict) and "empleado_id" in last_key:
-        scan_kwargs["ExclusiveStartKey"] = {"empleado_id": last_key["empleado_id"]}
-    elif isinstance(last_key, str) and last_key:
-        scan_kwargs["ExclusiveStartKey"] = {"empleado_id": last_key}
-
-    if filtro_estado in {"activo", "inactivo"}:
-        scan_kwargs["FilterExpression"] = Attr("estado").eq(filtro_estado)
-
-    try:
-        response = empleados_table.scan(**scan_kwargs)
-    except Exception as e:
+    if filtro_estado and filtro_estado not in ESTADOS_VALIDOS:
         return {
-            "statusCode": 500,
+            "statusCode": 400,
             "headers": CORS_HEADERS,
-            "body": json.dumps({"message": f"Error al listar empleados: {str(e)}"})
+            "body": json.dumps({"message": "estado inválido"})
         }
 
-    items = response.get("Items", [])
-    last_evaluated = response.get("LastEvaluatedKey")
-    return {
-        "statusCode": 200,
-        "headers": CORS_HEADERS,
-        "body": json.dumps({
-            "empleados": items,
-            "count": len(items),
-            "last_key": last_evaluated
-        })
-    }
+    try:
+        estados = [filtro_estado] if filtro_estado else list(ESTADOS_VALIDOS)
+        totales = contadores.obtener([contadores.clave_empleados(e) for e in estados])
+        total = sum(totales.values())
+    except Exception as e:
+        print("[CONTADORES_ERROR] No se pudo leer el total de empleados:", repr(e))
+        total = None
+
+    if filtro_estado:
+        return _listar_por_estado(filtro_estado, limit, last_key, total)
+
+    return _pagina(empleados_table.scan, {"Limit": limit}, last_key, CAMPOS_CURSOR_TABLA, total)
@@ -1,6 +1,8 @@
 import json
+import base64
 import boto3
 import os
+from boto3.dynamodb.conditions import Key
 
 TABLE_USUARIOS_NAME = os.getenv("TABLE_USUARIOS", "TABLE_USUARIOS")
 CORS_HEADERS = {"Access-Control-Allow-Origin": "*"}
@@ -9,6 +11,11 @@ dynamodb = boto3.resource("dynamodb")
 usuarios_table = dynamodb.Table(TABLE_USUARIOS_NAME)
 
 ROLES_PERMITIDOS = {"personal_administrativo", "autoridad"}
+ROLES_VALIDOS = {"estudiante", "personal_administrativo", "autoridad"}
+INDICE_ROL_NOMBRE = "RolNombreIndex"
+# Campos de cada usuario en el listado: los mismos que proyecta RolNombreIndex
+# (KEYS_ONLY), así el listado con y sin filtro de rol tiene la misma forma.
+CAMPOS_LISTADO = ("correo", "rol", "nombre")
 
 def _parse_body(event):
     body = event.get("body", {})
@@ -18,6 +25,63 @@ def _parse_body(event):
         body = {}
     return body
 
+
+def _codificar_cursor(clave):
+    return base64.urlsafe_b64encode(json.dumps(clave).encode("utf-8")).decode("ascii")
+
+
+def _decodificar_cursor(cursor):
+    try:
+        clave = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(clave, dict) or set(clave) != {"rol", "nombre", "correo"}:
+        return None
+    return clave
+
+
+def _listar_por_rol(rol_filtro, limit, last_key):
+    """
+    Usuarios de un rol ordenados por nombre (Query sobre RolNombreIndex).
+    El cursor es la LastEvaluatedKey del índice codificada en base64.
+    """
+    query_kwargs = {
+        "IndexName": INDICE_ROL_NOMBRE,
+        "KeyConditionExpression": Key("rol").eq(rol_filtro),
+        "Limit": limit
+    }
+    if isinstance(last_key, str) and last_key:
+        clave = _decodificar_cursor(last_key)
+        if clave is None or clave["rol"] != rol_filtro:
+            return {
+                "statusCode": 400,
+                "headers": CORS_HEADERS,
+                "body": json.dumps({"message": "last_key inválido"})
+            }
+        query_kwargs["ExclusiveStartKey"] = clave
+
+    try:
+        response = usuarios_table.query(**query_kwargs)
+    except Exception as e:
+        return {
+            "statusCode": 500,
+            "headers": CORS_HEADERS,
+            "body": json.dumps({"message": f"Error al listar usuarios: {str(e)}"})
+        }
+
+    items = response.get("Items", [])
+    last_evaluated = response.get("LastEvaluatedKey")
+    return {
+        "statusCode": 200,
+        "headers": CORS_HEADERS,
+        "body": json.dumps({
+            "usuarios": items,
+            "count": len(items),
+            "last_key": _codificar_cursor(last_evaluated) if last_evaluated else None
+        })
+    }
+
+
 def lambda_handler(event, context):
     authorizer = event.get("requestContext", {}).get("authorizer", {})
     rol = authorizer.get("rol")
@@ -36,7 +100,18 @@ def lambda_handler(event, context):
         limit = 10
 
     last_key = body.get("last_key")
-    scan_kwargs = {"Limit": limit}
+
+    rol_filtro = body.get("rol")
+    if rol_filtro:
+        if rol_filtro not in ROLES_VALIDOS:
+            return {
+                "statusCode": 400,
+                "headers": CORS_HEADERS,
+                "body": json.dumps({"message": "rol inválido"})
+            }
+        return _listar_por_rol(rol_filtro, limit, last_key)
+
+    scan_kwargs = {"Limit": limit, "ProjectionExpression": ", ".join(CAMPOS_LISTADO)}
     if isinstance(last_key, str) and last_key:
         scan_kwargs["ExclusiveStartKey"] = {"correo": last_key}
 
@@ -50,9 +125,6 @@ def lambda_handler(event, context):
         }
 
     items = response.get("Items", [])
-    for item in items:
-        item.pop("contrasena", None)
-
     last_evaluated = response.get("LastEvaluatedKey")
     return {
         "statusCode": 200,
@@ -61,5 +133,5 @@ def lambda_handler(event, context):
             "usuarios": items,
             "count": len(items),
             "last_key": last_evaluated.get("correo") if last_evaluated else None
-        })
+        }, default=str)
     }
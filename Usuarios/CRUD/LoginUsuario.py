@@ -5,6 +5,7 @@ import uuid
 from datetime import datetime, timezone
 from botocore.exceptions import ClientError
 from CRUD.utils import generar_token, ALLOWED_ROLES
+from CRUD import contrasenas, limitador
 
 TABLE_USUARIOS_NAME = os.getenv("TABLE_USUARIOS", "TABLE_USUARIOS")
 TABLE_LOGS_NAME = os.getenv("TABLE_LOGS", "TABLE_LOGS")  
@@ -111,6 +112,21 @@ def lambda_handler(event, context):
             "body": json.dumps({"message": "correo y contrasena son obligatorios"})
         }
 
+    ip = ((event.get("requestContext") or {}).get("identity") or {}).get("sourceIp")
+    try:
+        espera = limitador.verificar(correo=correo, ip=ip)
+    except ClientError as e:
+        # Si el limitador no está disponible no se bloquea el login
+        print("[RATE_LIMIT_ERROR]", repr(e))
+        espera = 0
+
+    if espera:
+        return {
+            "statusCode": 429,
+            "headers": {**CORS_HEADERS, "Retry-After": str(espera)},
+            "body": json.dumps({"message": "Demasiados intentos, intenta nuevamente más tarde"})
+        }
+
     try:
         resp = usuarios_table.get_item(Key={"correo": correo})
     except ClientError as e:
@@ -155,7 +171,7 @@ def lambda_handler(event, context):
             "body": json.dumps({"message": "Rol de usuario inválido"})
         }
 
-    if usuario.get("contrasena") != contrasena:
+    if not contrasenas.verificar(contrasena, usuario.get("contrasena")):
         _log_event(
             accion="login",
             resultado="error",
@@ -167,7 +183,28 @@ def lambda_handler(event, context):
             "headers": CORS_HEADERS,
             "body": json.dumps({"message": "Credenciales inválidas"})
         }
-    
+
+    # Hash antiguo (texto plano o parámetros por debajo de la calibración actual):
+    # se reemplaza ahora que se conoce la contraseña. Si falla, el login sigue.
+    if contrasenas.necesita_rehash(usuario.get("contrasena")):
+        try:
+            usuarios_table.update_item(
+                Key={"correo": correo},
+                UpdateExpression="SET contrasena = :nueva",
+                ConditionExpression="contrasena = :actual",
+                ExpressionAttributeValues={
+                    ":nueva": contrasenas.hashear(contrasena),
+                    ":actual": usuario.get("contrasena")
+                }
+            )
+        except ClientError as e:
+            _log_event(
+                accion="login",
+                resultado="error",
+                mensaje="No se pudo actualizar el hash de la contraseña",
+                detalles={"correo": correo, "error": str(e)[:500]}
+            )
+
     try:
         token = generar_token(
             correo=usuario["correo"],
@@ -1,13 +1,8 @@
 import json
-import boto3
-import os
+from CRUD import cache
 
-TABLE_USUARIOS_NAME = os.getenv("TABLE_USUARIOS", "TABLE_USUARIOS")
 CORS_HEADERS = {"Access-Control-Allow-Origin": "*"}
 
-dynamodb = boto3.resource("dynamodb")
-usuarios_table = dynamodb.Table(TABLE_USUARIOS_NAME)
-
 def lambda_handler(event, context):
     # Obtener usuario autenticado desde el authorizer
     authorizer = event.get("requestContext", {}).get("authorizer", {})
@@ -35,17 +30,15 @@ def lambda_handler(event, context):
 
     # Obtener información del usuario
     try:
-        resp = usuarios_table.get_item(Key={"correo": correo_solicitado})
+        usuario = cache.usuarios.obtener(correo_solicitado)
         
-        if "Item" not in resp:
+        if usuario is None:
             return {
                 "statusCode": 404,
                 "headers": CORS_HEADERS,
                 "body": json.dumps({"message": "Usuario no encontrado"})
             }
         
-        usuario = resp["Item"]
-        
         # Eliminar la contraseña antes de devolver los datos
         if "contrasena" in usuario:
             del usuario["contrasena"]
@@ -56,7 +49,7 @@ def lambda_handler(event, context):
             "body": json.dumps({
                 "message": "Usuario encontrado",
                 "usuario": usuario
-            })
+            }, default=str)
         }
     except Exception as e:
         return {
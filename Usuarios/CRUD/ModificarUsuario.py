@@ -5,6 +5,7 @@ import uuid
 from datetime import datetime, timezone
 from botocore.exceptions import ClientError
 from CRUD.utils import ALLOWED_ROLES
+from CRUD import contrasenas, busqueda, trabajos, cache
 
 TABLE_USUARIOS_NAME = os.getenv("TABLE_USUARIOS", "TABLE_USUARIOS")
 TABLE_LOGS_NAME = os.getenv("TABLE_LOGS", "TABLE_LOGS")
@@ -133,6 +134,7 @@ def lambda_handler(event, context):
         }
 
     usuario_actual = resp["Item"]
+    cache.usuarios.observar(usuario_actual)
     rol_objetivo = usuario_actual.get("rol", "estudiante")
     rol_solicitante = usuario_autenticado["rol"]
 
@@ -229,7 +231,7 @@ def lambda_handler(event, context):
                 "headers": CORS_HEADERS,
                 "body": json.dumps({"message": "La contraseña debe tener al menos 6 caracteres"})
             }
-        usuario_modificado["contrasena"] = body["contrasena"]
+        usuario_modificado["contrasena"] = contrasenas.hashear(body["contrasena"])
         hubo_cambios = True
         campos_cambiados.append("contrasena")
 
@@ -273,41 +275,7 @@ def lambda_handler(event, context):
                 "headers": CORS_HEADERS,
                 "body": json.dumps({"message": "Correo electrónico inválido"})
             }
-        try:
-            existe_nuevo = usuarios_table.get_item(Key={"correo": nuevo_correo})
-        except Exception as e:
-            _log_event(
-                accion="actualizar_usuario",
-                usuario_autenticado=usuario_autenticado,
-                resultado="error",
-                mensaje="Error al validar nuevo correo",
-                detalles={
-                    "correo_objetivo": correo_objetivo,
-                    "nuevo_correo": nuevo_correo,
-                    "error": str(e)[:500]
-                }
-            )
-            return {
-                "statusCode": 500,
-                "headers": CORS_HEADERS,
-                "body": json.dumps({"message": f"Error al validar correo: {str(e)}"})
-            }
-        if "Item" in existe_nuevo:
-            _log_event(
-                accion="actualizar_usuario",
-                usuario_autenticado=usuario_autenticado,
-                resultado="error",
-                mensaje="El nuevo correo ya está registrado",
-                detalles={
-                    "correo_objetivo": correo_objetivo,
-                    "nuevo_correo": nuevo_correo
-                }
-            )
-            return {
-                "statusCode": 400,
-                "headers": CORS_HEADERS,
-                "body": json.dumps({"message": "El nuevo correo ya está registrado"})
-            }
+        # La unicidad del nuevo correo la garantiza la condición de la transacción
         usuario_modificado["correo"] = nuevo_correo
         hubo_cambios = True
         campos_cambiados.append("nuevo_correo")
@@ -326,18 +294,75 @@ def lambda_handler(event, context):
             "body": json.dumps({"message": "No hay campos para actualizar"})
         }
 
+    nueva_version, condicion = cache.condicion_version(usuario_actual)
+    usuario_modificado["version"] = nueva_version
+
+    trabajo = None
     try:
         if nuevo_correo and nuevo_correo != correo_objetivo:
-            usuarios_table.put_item(
-                Item=usuario_modificado,
-                ConditionExpression="attribute_not_exists(correo)"
+            # Alta del nuevo correo, baja del anterior y trabajo de propagación
+            # de referencias (incidentes, conexiones): todo o nada
+            trabajo = trabajos.nuevo(
+                "propagar_correo",
+                correo_anterior=correo_objetivo,
+                correo_nuevo=nuevo_correo,
+                solicitado_por=usuario_autenticado["correo"]
             )
-            usuarios_table.delete_item(Key={"correo": correo_objetivo})
+            dynamodb.meta.client.transact_write_items(TransactItems=[
+                {
+                    "Put": {
+                        "TableName": TABLE_USUARIOS_NAME,
+                        "Item": usuario_modificado,
+                        "ConditionExpression": "attribute_not_exists(correo)"
+                    }
+                },
+                {
+                    "Delete": {
+                        "TableName": TABLE_USUARIOS_NAME,
+                        "Key": {"correo": correo_objetivo},
+                        "ConditionExpression": "attribute_exists(correo)"
+                    }
+                },
+                trabajos.put_transaccional(trabajo)
+            ])
             correo_objetivo = nuevo_correo
         else:
-            usuarios_table.put_item(Item=usuario_modificado)
+            # Solo si nadie modificó el usuario desde que se leyó
+            usuarios_table.put_item(Item=usuario_modificado, **condicion)
     except ClientError as e:
-        if e.response.get("Error", {}).get("Code") == "ConditionalCheckFailedException":
+        codigo = e.response.get("Error", {}).get("Code")
+        if codigo == "ConditionalCheckFailedException":
+            cache.usuarios.invalidar(correo_objetivo)
+            _log_event(
+                accion="actualizar_usuario",
+                usuario_autenticado=usuario_autenticado,
+                resultado="error",
+                mensaje="El usuario fue modificado por otra solicitud",
+                detalles={"correo_objetivo": correo_objetivo}
+            )
+            return {
+                "statusCode": 409,
+                "headers": CORS_HEADERS,
+                "body": json.dumps({"message": "El usuario fue modificado por otra solicitud, intenta nuevamente"})
+            }
+        motivos = [r.get("Code") for r in e.response.get("CancellationReasons", [])]
+        if codigo == "TransactionCanceledException" and motivos[1:2] == ["ConditionalCheckFailed"]:
+            _log_event(
+                accion="actualizar_usuario",
+                usuario_autenticado=usuario_autenticado,
+                resultado="error",
+                mensaje="El usuario fue eliminado durante la actualización",
+                detalles={
+                    "correo_objetivo": correo_objetivo,
+                    "nuevo_correo": nuevo_correo
+                }
+            )
+            return {
+                "statusCode": 404,
+                "headers": CORS_HEADERS,
+                "body": json.dumps({"message": "Usuario no encontrado"})
+            }
+        if codigo == "TransactionCanceledException" and motivos[:1] == ["ConditionalCheckFailed"]:
             _log_event(
                 accion="actualizar_usuario",
                 usuario_autenticado=usuario_autenticado,
@@ -387,6 +412,18 @@ def lambda_handler(event, context):
             "body": json.dumps({"message": f"Error al actualizar usuario: {str(e)}"})
         }
 
+    if usuario_actual["correo"] != usuario_modificado["correo"]:
+        cache.usuarios.invalidar(usuario_actual["correo"])
+    cache.usuarios.observar(usuario_modificado)
+
+    busqueda.reindexar(
+        "usuario",
+        usuario_modificado["correo"],
+        anterior=busqueda.datos_usuario(usuario_actual),
+        nuevo=busqueda.datos_usuario(usuario_modificado),
+        entidad_id_anterior=usuario_actual["correo"]
+    )
+
     usuario_modificado.pop("contrasena", None)
 
     _log_event(
@@ -398,15 +435,20 @@ def lambda_handler(event, context):
             "correo_final": usuario_modificado.get("correo"),
             "campos_cambiados": campos_cambiados,
             "rol_antes": rol_objetivo,
-            "rol_despues": usuario_modificado.get("rol", rol_objetivo)
+            "rol_despues": usuario_modificado.get("rol", rol_objetivo),
+            "trabajo_id": trabajo["trabajo_id"] if trabajo else None
         }
     )
 
+    respuesta = {
+        "message": "Usuario actualizado correctamente",
+        "usuario": usuario_modificado
+    }
+    if trabajo:
+        respuesta["trabajo_id"] = trabajo["trabajo_id"]
+
     return {
         "statusCode": 200,
         "headers": CORS_HEADERS,
-        "body": json.dumps({
-            "message": "Usuario actualizado correctamente",
-            "usuario": usuario_modificado
-        })
+        "body": json.dumps(respuesta)
     }
@@ -1,13 +1,8 @@
 import json
-import boto3
-import os
+from CRUD import cache
 
-TABLE_USUARIOS_NAME = os.getenv("TABLE_USUARIOS", "TABLE_USUARIOS")
 CORS_HEADERS = {"Access-Control-Allow-Origin": "*"}
 
-dynamodb = boto3.resource("dynamodb")
-usuarios_table = dynamodb.Table(TABLE_USUARIOS_NAME)
-
 def lambda_handler(event, context):
     authorizer = event.get("requestContext", {}).get("authorizer", {})
     if not authorizer:
@@ -36,20 +31,19 @@ def lambda_handler(event, context):
         }
 
     try:
-        resp = usuarios_table.get_item(Key={"correo": correo_solicitado})
+        usuario = cache.usuarios.obtener(correo_solicitado)
     except Exception as e:
         return {
             "statusCode": 500,
             "body": json.dumps({"message": f"Error al obtener usuario: {str(e)}"})
         }
 
-    if "Item" not in resp:
+    if usuario is None:
         return {
             "statusCode": 404,
             "body": json.dumps({"message": "Usuario no encontrado"})
         }
 
-    usuario = resp["Item"]
     rol_objetivo = usuario.get("rol", "estudiante")
 
     if (
@@ -71,5 +65,5 @@ def lambda_handler(event, context):
         "body": json.dumps({
             "message": "Usuario encontrado",
             "usuario": usuario
-        })
+        }, default=str)
     }
@@ -0,0 +1,259 @@
+import os
+import hashlib
+import boto3
+from concurrent.futures import ThreadPoolExecutor
+from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
+from CRUD import trabajos
+
+TABLE_INCIDENTES_NAME = os.getenv("TABLE_INCIDENTES", "TABLE_INCIDENTES")
+TABLE_CONEXIONES_NAME = os.getenv("TABLE_CONEXIONES", "TABLE_CONEXIONES")
+TABLE_SUSCRIPCIONES_NAME = os.getenv("TABLE_SUSCRIPCIONES", "TABLE_SUSCRIPCIONES")
+TABLE_BANDEJA_NAME = os.getenv("TABLE_BANDEJA", "TABLE_BANDEJA")
+
+# Tamaño de página del índice y actualizaciones concurrentes por página
+TAMANO_PAGINA = int(os.getenv("TRABAJOS_TAMANO_PAGINA", "100"))
+HILOS = int(os.getenv("TRABAJOS_HILOS", "8"))
+# Margen para guardar el progreso antes de que venza el timeout de la Lambda
+MARGEN_MS = 15000
+
+dynamodb = boto3.resource("dynamodb")
+incidentes_table = dynamodb.Table(TABLE_INCIDENTES_NAME)
+conexiones_table = dynamodb.Table(TABLE_CONEXIONES_NAME)
+suscripciones_table = dynamodb.Table(TABLE_SUSCRIPCIONES_NAME)
+bandeja_table = dynamodb.Table(TABLE_BANDEJA_NAME)
+
+# Un trabajo recorre, paso a paso, los items que referencian el correo del
+# usuario: (tabla, pk, atributos, índice). Incidentes y conexiones se leen por
+# UsuarioCorreoIndex (usuario_correo -> pk) proyectando la pk y 'atributos';
+# la bandeja tiene usuario_correo como clave de partición y se lee completa
+# (atributos None) para poder moverla.
+TABLAS = {
+    "incidentes": (incidentes_table, "incidente_id", (), "UsuarioCorreoIndex"),
+    "conexiones": (conexiones_table, "conexion_id", ("temas",), "UsuarioCorreoIndex"),
+    "bandeja": (bandeja_table, "seq", None, None),
+}
+LOTE_BATCH_WRITE = 25
+
+
+def _anonimo(correo):
+    """Referencia estable y sin datos personales para un usuario eliminado."""
+    return "eliminado#" + hashlib.sha256(correo.encode("utf-8")).hexdigest()[:16]
+
+
+def _reasignar_correo(tabla, pk, clave, correo_anterior, correo_nuevo):
+    """True si se actualizó; False si el item ya no apunta al correo anterior."""
+    try:
+        tabla.update_item(
+            Key={pk: clave},
+            UpdateExpression="SET usuario_correo = :nuevo",
+            ConditionExpression="usuario_correo = :anterior",
+            ExpressionAttributeValues={":nuevo": correo_nuevo, ":anterior": correo_anterior},
+        )
+        return True
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") == "ConditionalCheckFailedException":
+            return False
+        raise
+
+
+def _reasignar(tabla, pk, items, correo_anterior, correo_nuevo, executor):
+    claves = [item[pk] for item in items]
+    resultados = list(executor.map(
+        lambda clave: _reasignar_correo(tabla, pk, clave, correo_anterior, correo_nuevo),
+        claves
+    ))
+    actualizados = sum(1 for r in resultados if r)
+    return actualizados, len(resultados) - actualizados
+
+
+def _borrar_lote(tabla, pk, claves):
+    # batch_writer agrupa en BatchWriteItem y reintenta los UnprocessedItems
+    with tabla.batch_writer() as batch:
+        for clave in claves:
+            batch.delete_item(Key={pk: clave})
+    return len(claves)
+
+
+def _borrar(tabla, pk, items, executor):
+    claves = [item[pk] for item in items]
+    lotes = [claves[i:i + LOTE_BATCH_WRITE] for i in range(0, len(claves), LOTE_BATCH_WRITE)]
+    return sum(executor.map(lambda lote: _borrar_lote(tabla, pk, lote), lotes)), 0
+
+
+def _borrar_conexiones(tabla, pk, items, executor):
+    """
+    Borra las conexiones y, antes, sus filas en TABLE_SUSCRIPCIONES (una por
+    tema del atributo 'temas', como al desconectarse). Si se corta a medias,
+    el reintento vuelve a encontrar la conexión con sus temas.
+    """
+    with suscripciones_table.batch_writer() as batch:
+        for item in items:
+            for tema in item.get("temas") or ():
+                batch.delete_item(Key={"tema": tema, "conexion_id": item[pk]})
+    return _borrar(tabla, pk, items, executor)
+
+
+def _borrar_bandeja(tabla, items):
+    """Borra mensajes de la bandeja y su cabecera (clave usuario_correo + seq)."""
+    with tabla.batch_writer() as batch:
+        for item in items:
+            batch.delete_item(Key={"usuario_correo": item["usuario_correo"], "seq": item["seq"]})
+    return len(items), 0
+
+
+def _mover_mensaje(tabla, item, correo_nuevo):
+    """Copia el item al correo nuevo con el mismo seq y borra el original. False si el destino ya existía."""
+    try:
+        tabla.put_item(
+            Item={**item, "usuario_correo": correo_nuevo},
+            ConditionExpression="attribute_not_exists(seq)",
+        )
+        movido = True
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") != "ConditionalCheckFailedException":
+            raise
+        movido = False
+    tabla.delete_item(Key={"usuario_correo": item["usuario_correo"], "seq": item["seq"]})
+    return movido
+
+
+def _mover_bandeja(tabla, items, correo_nuevo, executor):
+    """
+    La bandeja cambia de partición con el correo: cada mensaje (y la cabecera
+    con ultimo_seq/leido_hasta) se copia con el mismo seq, así el since_seq
+    del cliente sigue valiendo. Copiar antes de borrar hace el paso repetible.
+    """
+    resultados = list(executor.map(lambda item: _mover_mensaje(tabla, item, correo_nuevo), items))
+    movidos = sum(1 for r in resultados if r)
+    return movidos, len(resultados) - movidos
+
+
+def _acciones_propagar_correo(trabajo, executor):
+    anterior, nuevo = trabajo["correo_anterior"], trabajo["correo_nuevo"]
+    reasignar = lambda tabla, pk, items: _reasignar(tabla, pk, items, anterior, nuevo, executor)
+    return anterior, [
+        ("incidentes", reasignar),
+        ("conexiones", reasignar),
+        ("bandeja", lambda tabla, pk, items: _mover_bandeja(tabla, items, nuevo, executor)),
+    ]
+
+
+def _acciones_eliminar_usuario(trabajo, executor):
+    """
+    Cascada de la baja: las conexiones se borran con sus suscripciones, la
+    bandeja de notificaciones se borra entera (cabecera incluida) y los
+    incidentes se anonimizan (se conservan para el historial del
+    campus). BatchWriteItem no admite actualizaciones parciales, así que
+    los incidentes usan UpdateItem condicional en paralelo.
+    """
+    correo = trabajo["correo"]
+    return correo, [
+        ("conexiones", lambda tabla, pk, items: _borrar_conexiones(tabla, pk, items, executor)),
+        ("bandeja", lambda tabla, pk, items: _borrar_bandeja(tabla, items)),
+        ("incidentes", lambda tabla, pk, items: _reasignar(tabla, pk, items, correo, _anonimo(correo), executor)),
+    ]
+
+
+ACCIONES = {
+    "propagar_correo": _acciones_propagar_correo,
+    "eliminar_usuario": _acciones_eliminar_usuario,
+}
+
+
+def _ejecutar(trabajo, hay_tiempo):
+    """
+    Recorre por páginas los items del correo en cada paso; cada página se
+    procesa en paralelo (escrituras idempotentes si se reintenta) y el
+    cursor se guarda al terminarla. False si se agotó el tiempo.
+    """
+    with ThreadPoolExecutor(max_workers=HILOS) as executor:
+        correo, pasos = ACCIONES[trabajo["tipo"]](trabajo, executor)
+        nombres = [nombre for nombre, _ in pasos]
+        inicio = nombres.index(trabajo["paso"]) if trabajo.get("paso") in nombres else 0
+        cursor = trabajo.get("cursor")
+
+        for paso, accion in pasos[inicio:]:
+            tabla, pk, atributos, indice = TABLAS[paso]
+            while True:
+                query_kwargs = {
+                    "KeyConditionExpression": Key("usuario_correo").eq(correo),
+                    "Limit": TAMANO_PAGINA,
+                }
+                if indice:
+                    query_kwargs["IndexName"] = indice
+                if atributos is not None:
+                    query_kwargs["ProjectionExpression"] = ", ".join((pk,) + atributos)
+                if cursor:
+                    query_kwargs["ExclusiveStartKey"] = cursor
+                resp = tabla.query(**query_kwargs)
+
+                items = resp.get("Items", [])
+                procesados, omitidos = accion(tabla, pk, items) if items else (0, 0)
+                cursor = resp.get("LastEvaluatedKey")
+                trabajos.registrar_progreso(
+                    trabajo["trabajo_id"], paso, cursor, procesados=procesados, omitidos=omitidos
+                )
+
+                if not cursor:
+                    break
+                if not hay_tiempo():
+                    return False
+            cursor = None
+    return True
+
+
+def procesar(trabajo_id, context):
+    """Ejecuta un trabajo hasta terminarlo o hasta agotar el tiempo de la invocación."""
+    restante_ms = context.get_remaining_time_in_millis() if context else 300000
+    trabajo = trabajos.reclamar(trabajo_id, segundos=restante_ms // 1000 + 5)
+    if trabajo is None:
+        return "omitido"
+
+    if trabajo.get("tipo") not in ACCIONES:
+        trabajos.finalizar(trabajo_id, trabajos.ESTADO_ERROR, error=f"Tipo desconocido: {trabajo.get('tipo')}")
+        return trabajos.ESTADO_ERROR
+
+    def hay_tiempo():
+        return context is None or context.get_remaining_time_in_millis() > MARGEN_MS
+
+    try:
+        terminado = _ejecutar(trabajo, hay_tiempo)
+    except Exception as e:
+        print("[TRABAJO_ERROR]", trabajo_id, trabajo.get("tipo"), repr(e))
+        estado = trabajos.ESTADO_ERROR if trabajo["intentos"] >= trabajos.MAX_INTENTOS else trabajos.ESTADO_PENDIENTE
+        trabajos.finalizar(trabajo_id, estado, error=e)
+        return estado
+
+    if terminado:
+        trabajos.finalizar(trabajo_id, trabajos.ESTADO_COMPLETADO)
+        return trabajos.ESTADO_COMPLETADO
+
+    # Sin terminar: queda pendiente y el barrido programado lo retoma
+    trabajos.finalizar(trabajo_id, trabajos.ESTADO_PENDIENTE, reiniciar_intentos=True)
+    return trabajos.ESTADO_PENDIENTE
+
+
+def lambda_handler(event, context):
+    """
+    Invocado por el stream de la tabla de trabajos (INSERT) o por el
+    barrido programado, que retoma trabajos pendientes o interrumpidos.
+    """
+    if "Records" in event:
+        ids = [
+            record["dynamodb"]["Keys"]["trabajo_id"]["S"]
+            for record in event["Records"]
+            if record.get("eventName") == "INSERT"
+        ]
+    else:
+        ids = trabajos.pendientes()
+
+    resumen = {}
+    for trabajo_id in ids:
+        if context and context.get_remaining_time_in_millis() < MARGEN_MS:
+            break
+        estado = procesar(trabajo_id, context)
+        resumen[estado] = resumen.get(estado, 0) + 1
+
+    print(f"Trabajos: {len(ids)} recibidos -> {resumen}")
+    return resumen
@@ -0,0 +1,199 @@
+import os
+import re
+import time
+import difflib
+import threading
+import unicodedata
+from collections import OrderedDict
+
+import boto3
+from boto3.dynamodb.conditions import Key
+
+TABLE_BUSQUEDA = os.getenv("TABLE_BUSQUEDA", "TABLE_BUSQUEDA")
+
+# Índice de prefijos: una fila por (prefijo, entidad). La clave de ordenamiento
+# empieza con el tipo y el nombre normalizado, así que una Query por prefijo ya
+# devuelve las coincidencias ordenadas por nombre.
+PREFIJO_MIN = 2
+PREFIJO_MAX = 15
+TIPOS = ("usuario", "empleado")
+
+# Caché de resultados en contenedores calientes.
+BUSQUEDA_CACHE_SEGUNDOS = int(os.getenv("BUSQUEDA_CACHE_SEGUNDOS", "30"))
+BUSQUEDA_CACHE_MAX = 256
+# Al buscar difuso se leen los candidatos que comparten las 2 primeras letras.
+CANDIDATOS_DIFUSO = 200
+SIMILITUD_MINIMA = 0.6
+
+dynamodb = boto3.resource("dynamodb")
+busqueda_table = dynamodb.Table(TABLE_BUSQUEDA)
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def normalizar(texto):
+    """'José Pérez' -> 'jose perez' (sin tildes, minúsculas, solo alfanuméricos)."""
+    if not texto:
+        return ""
+    texto = unicodedata.normalize("NFKD", str(texto))
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return re.sub(r"[^a-z0-9]+", " ", texto.lower()).strip()
+
+
+def _tokens(nombre, correo):
+    tokens = normalizar(nombre).split()
+    if correo:
+        local = str(correo).split("@", 1)[0]
+        tokens.extend(normalizar(local).split())
+        tokens.append(normalizar(local).replace(" ", ""))
+    return {t for t in tokens if t}
+
+
+def terminos(nombre, correo):
+    """Edge n-grams (PREFIJO_MIN..PREFIJO_MAX) del nombre y de la parte local del correo."""
+    prefijos = set()
+    for token in _tokens(nombre, correo):
+        for largo in range(PREFIJO_MIN, min(len(token), PREFIJO_MAX) + 1):
+            prefijos.add(token[:largo])
+    return prefijos
+
+
+def _clave(tipo, entidad_id, nombre):
+    return f"{tipo}#{normalizar(nombre)}#{entidad_id}"
+
+
+def _filas(tipo, entidad_id, nombre, correo, extra=None):
+    clave = _clave(tipo, entidad_id, nombre)
+    base = {
+        "clave": clave,
+        "tipo": tipo,
+        "entidad_id": entidad_id,
+        "nombre": nombre or "",
+        "correo": correo or "",
+        **(extra or {}),
+    }
+    return {(p, clave): {"prefijo": p, **base} for p in terminos(nombre, correo)}
+
+
+def reindexar(tipo, entidad_id, anterior=None, nuevo=None, entidad_id_anterior=None):
+    """
+    Sincroniza el índice para una entidad. 'anterior' y 'nuevo' son dicts con
+    nombre, correo y extra (atributos que se muestran en el resultado).
+    Con anterior=None se indexa; con nuevo=None se elimina.
+    No lanza excepciones: un índice desactualizado no debe romper el CRUD.
+    """
+    if anterior == nuevo and entidad_id_anterior in (None, entidad_id):
+        return True
+
+    try:
+        viejas = _filas(tipo, entidad_id_anterior or entidad_id, **anterior) if anterior else {}
+        nuevas = _filas(tipo, entidad_id, **nuevo) if nuevo else {}
+
+        with busqueda_table.batch_writer() as batch:
+            for prefijo, clave in viejas.keys() - nuevas.keys():
+                batch.delete_item(Key={"prefijo": prefijo, "clave": clave})
+            for fila in nuevas.values():
+                batch.put_item(Item=fila)
+        return True
+    except Exception as e:
+        print("[BUSQUEDA_ERROR] No se pudo actualizar el índice:", tipo, entidad_id, repr(e))
+        return False
+
+
+def datos_usuario(usuario):
+    return {
+        "nombre": usuario.get("nombre"),
+        "correo": usuario.get("correo"),
+        "extra": {"rol": usuario.get("rol")},
+    }
+
+
+def datos_empleado(empleado):
+    return {
+        "nombre": empleado.get("nombre"),
+        "correo": (empleado.get("contacto") or {}).get("correo"),
+        "extra": {
+            "tipo_area": empleado.get("tipo_area"),
+            "estado": empleado.get("estado"),
+        },
+    }
+
+
+def _resultado(item):
+    return {k: v for k, v in item.items() if k not in ("prefijo", "clave")}
+
+
+def _consultar(prefijo, tipo, limite):
+    condicion = Key("prefijo").eq(prefijo)
+    if tipo:
+        condicion = condicion & Key("clave").begins_with(f"{tipo}#")
+    resp = busqueda_table.query(KeyConditionExpression=condicion, Limit=limite)
+    return resp.get("Items", [])
+
+
+def _cache_get(clave):
+    with _cache_lock:
+        entrada = _cache.get(clave)
+        if not entrada or entrada[1] < time.time():
+            _cache.pop(clave, None)
+            return None
+        _cache.move_to_end(clave)
+        return entrada[0]
+
+
+def _cache_put(clave, valor):
+    with _cache_lock:
+        _cache[clave] = (valor, time.time() + BUSQUEDA_CACHE_SEGUNDOS)
+        _cache.move_to_end(clave)
+        while len(_cache) > BUSQUEDA_CACHE_MAX:
+            _cache.popitem(last=False)
+
+
+def buscar(texto, tipo=None, k=10):
+    """
+    Devuelve hasta k coincidencias. Primero por prefijo (una Query sobre el
+    token más largo del texto); si no hay resultados, búsqueda difusa sobre
+    los candidatos que comparten las primeras letras.
+    """
+    tokens = normalizar(texto).split()
+    if not tokens:
+        return []
+
+    cache_clave = (" ".join(tokens), tipo, k)
+    en_cache = _cache_get(cache_clave)
+    if en_cache is not None:
+        return en_cache
+
+    principal = max(tokens, key=len)[:PREFIJO_MAX]
+    resultados = []
+    if len(principal) >= PREFIJO_MIN:
+        # Se piden más que k porque los demás tokens se filtran en memoria
+        for item in _consultar(principal, tipo, k * 5):
+            palabras = _tokens(item.get("nombre"), item.get("correo"))
+            if all(any(p.startswith(t) for p in palabras) for t in tokens):
+                resultados.append(_resultado(item))
+            if len(resultados) >= k:
+                break
+
+    if not resultados:
+        buscado = " ".join(tokens)
+        vistos = {}
+        for item in _consultar(principal[:PREFIJO_MIN], tipo, CANDIDATOS_DIFUSO):
+            vistos[item["clave"]] = item
+        puntuados = []
+        for item in vistos.values():
+            similitud = max(
+                difflib.SequenceMatcher(None, buscado, normalizar(item.get("nombre"))).ratio(),
+                difflib.SequenceMatcher(None, buscado, normalizar(str(item.get("correo")).split("@")[0])).ratio(),
+            )
+            if similitud >= SIMILITUD_MINIMA:
+                puntuados.append((similitud, item))
+        puntuados.sort(key=lambda x: (-x[0], x[1]["clave"]))
+        resultados = [
+            {**_resultado(item), "similitud": round(similitud, 3)}
+            for similitud, item in puntuados[:k]
+        ]
+
+    _cache_put(cache_clave, resultados)
+    return resultados
@@ -0,0 +1,145 @@
+import os
+import copy
+import json
+import time
+import threading
+from collections import OrderedDict
+
+import boto3
+
+# Caché de lectura por contenedor para usuarios y empleados. Los perfiles
+# cambian poco y los mismos administradores los consultan una y otra vez.
+# Cada item lleva un atributo 'version' que se incrementa en cada escritura:
+# la caché nunca reemplaza una versión por otra más antigua y las escrituras
+# lo usan como condición para no pisar cambios de otro contenedor.
+CACHE_SEGUNDOS = int(os.getenv("USUARIOS_CACHE_SEGUNDOS", "30"))
+CACHE_NEGATIVO_SEGUNDOS = int(os.getenv("USUARIOS_CACHE_NEGATIVO_SEGUNDOS", "5"))
+CACHE_MAX = int(os.getenv("USUARIOS_CACHE_MAX", "512"))
+METRICAS_INTERVALO = 60
+METRICAS_NAMESPACE = "AlertaUTEC/Usuarios"
+
+_AUSENTE = object()
+
+dynamodb = boto3.resource("dynamodb")
+
+
+def version(item):
+    return int((item or {}).get("version", 0))
+
+
+def condicion_version(item):
+    """
+    Argumentos de put_item para escribir solo si nadie cambió el item desde
+    que se leyó. Devuelve también la siguiente versión a guardar.
+    """
+    actual = version(item)
+    if actual == 0:
+        condicion = "attribute_not_exists(version) OR version = :version"
+    else:
+        condicion = "version = :version"
+    return actual + 1, {
+        "ConditionExpression": condicion,
+        "ExpressionAttributeValues": {":version": actual},
+    }
+
+
+class CacheLectura:
+    """LRU con TTL (y TTL corto para ausencias) sobre get_item de una tabla."""
+
+    def __init__(self, nombre, table_name, clave):
+        self.nombre = nombre
+        self.clave = clave
+        self.tabla = dynamodb.Table(table_name)
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+        self._contadores = {"aciertos": 0, "aciertos_negativos": 0, "fallos": 0, "invalidaciones": 0}
+        self._publicados = dict(self._contadores)
+        self._ultima_publicacion = time.time()
+
+    def _leer(self, valor):
+        ahora = time.time()
+        with self._lock:
+            entrada = self._entradas.get(valor)
+            if entrada is None:
+                return _AUSENTE
+            item, expira = entrada
+            if expira < ahora:
+                del self._entradas[valor]
+                return _AUSENTE
+            self._entradas.move_to_end(valor)
+            return item
+
+    def _escribir(self, valor, item):
+        segundos = CACHE_SEGUNDOS if item is not None else CACHE_NEGATIVO_SEGUNDOS
+        with self._lock:
+            anterior = self._entradas.get(valor)
+            if anterior and anterior[0] is not None and item is not None and version(item) < version(anterior[0]):
+                return
+            self._entradas[valor] = (item, time.time() + segundos)
+            self._entradas.move_to_end(valor)
+            while len(self._entradas) > CACHE_MAX:
+                self._entradas.popitem(last=False)
+
+    def _contar(self, contador):
+        with self._lock:
+            self._contadores[contador] += 1
+            if time.time() - self._ultima_publicacion < METRICAS_INTERVALO:
+                return
+            delta = {k: v - self._publicados[k] for k, v in self._contadores.items()}
+            self._publicados = dict(self._contadores)
+            self._ultima_publicacion = time.time()
+        self._publicar(delta)
+
+    def _publicar(self, delta):
+        """Métricas en formato EMF: CloudWatch las extrae del log sin llamadas a la API."""
+        lecturas = delta["aciertos"] + delta["aciertos_negativos"] + delta["fallos"]
+        print(json.dumps({
+            "_aws": {
+                "Timestamp": int(time.time() * 1000),
+                "CloudWatchMetrics": [{
+                    "Namespace": METRICAS_NAMESPACE,
+                    "Dimensions": [["Cache"]],
+                    "Metrics": [
+                        {"Name": "CacheAciertos", "Unit": "Count"},
+                        {"Name": "CacheFallos", "Unit": "Count"},
+                        {"Name": "CacheInvalidaciones", "Unit": "Count"},
+                        {"Name": "CacheRatioAciertos", "Unit": "Percent"},
+                    ],
+                }],
+            },
+            "Cache": self.nombre,
+            "CacheAciertos": delta["aciertos"] + delta["aciertos_negativos"],
+            "CacheFallos": delta["fallos"],
+            "CacheInvalidaciones": delta["invalidaciones"],
+            "CacheRatioAciertos": round(100.0 * (lecturas - delta["fallos"]) / lecturas, 2) if lecturas else 0.0,
+        }))
+
+    def obtener(self, valor):
+        """Item (copia) o None si no existe. Lee de DynamoDB solo si no está en caché."""
+        item = self._leer(valor)
+        if item is not _AUSENTE:
+            self._contar("aciertos" if item is not None else "aciertos_negativos")
+            return copy.deepcopy(item)
+
+        self._contar("fallos")
+        item = self.tabla.get_item(Key={self.clave: valor}).get("Item")
+        self._escribir(valor, item)
+        return copy.deepcopy(item)
+
+    def observar(self, item):
+        """Registra un item leído o escrito en este contenedor (si no es más antiguo)."""
+        if item and self.clave in item:
+            self._escribir(item[self.clave], copy.deepcopy(item))
+
+    def invalidar(self, valor):
+        with self._lock:
+            self._entradas.pop(valor, None)
+            self._contadores["invalidaciones"] += 1
+
+    def estadisticas(self):
+        with self._lock:
+            return {**self._contadores, "tamano": len(self._entradas)}
+
+
+usuarios = CacheLectura("usuarios", os.getenv("TABLE_USUARIOS", "TABLE_USUARIOS"), "correo")
+empleados = CacheLectura("empleados", os.getenv("TABLE_EMPLEADOS", "TABLE_EMPLEADOS"), "empleado_id")
@@ -0,0 +1,38 @@
+import os
+
+import boto3
+
+TABLE_CONTADORES = os.getenv("TABLE_CONTADORES", "TABLE_CONTADORES")
+
+# Contadores mantenidos en la misma transacción que la escritura que los
+# cambia, para responder totales sin recorrer las tablas.
+dynamodb = boto3.resource("dynamodb")
+
+
+def clave_empleados(estado):
+    return f"empleados#{estado}"
+
+
+def incremento(contador, delta):
+    """Operación 'Update' para incluir en un TransactWriteItems."""
+    return {
+        "Update": {
+            "TableName": TABLE_CONTADORES,
+            "Key": {"contador": contador},
+            "UpdateExpression": "ADD valor :delta",
+            "ExpressionAttributeValues": {":delta": delta},
+        }
+    }
+
+
+def obtener(contadores):
+    """Valores de varios contadores en una sola lectura (0 si no existen)."""
+    if not contadores:
+        return {}
+    resp = dynamodb.batch_get_item(RequestItems={
+        TABLE_CONTADORES: {"Keys": [{"contador": c} for c in set(contadores)]}
+    })
+    valores = {c: 0 for c in contadores}
+    for item in resp.get("Responses", {}).get(TABLE_CONTADORES, []):
+        valores[item["contador"]] = int(item.get("valor", 0))
+    return valores
@@ -0,0 +1,139 @@
+import os
+import time
+import hmac
+import base64
+import hashlib
+
+# Formato almacenado (autodescriptivo):
+#   scrypt$n=<N>,r=<r>,p=<p>$<sal base64>$<hash base64>
+# Los valores que no empiezan con "scrypt$" son contraseñas antiguas en texto
+# plano; se aceptan una vez y se re-hashean en el siguiente login exitoso.
+PREFIJO = "scrypt"
+LARGO_SAL = 16
+LARGO_HASH = 32
+
+SCRYPT_R = 8
+SCRYPT_P = 1
+# Mínimo aceptable aunque el presupuesto de latencia sea menor.
+SCRYPT_N_MIN = 2 ** 14
+SCRYPT_N_MAX = 2 ** 20
+
+# Presupuesto de latencia del hash para el p99 del login y margen sobre la
+# medición (el p99 en Lambda es más lento que una medición aislada).
+PASSWORD_HASH_BUDGET_MS = float(os.getenv("PASSWORD_HASH_BUDGET_MS", "250"))
+MARGEN_P99 = 1.5
+# Fracción de la memoria de la función que puede usar scrypt (128 * r * N bytes).
+FRACCION_MEMORIA = 0.25
+
+_parametros_calibrados = {}
+
+
+def _memoria_scrypt(n, r):
+    return 128 * r * n
+
+
+def _maxmem(n, r, p):
+    # OpenSSL exige un margen sobre 128 * r * N (y 128 * r * p para B).
+    return 128 * r * (n + p) + 2 * 1024 * 1024
+
+
+def _scrypt(contrasena, sal, n, r, p):
+    return hashlib.scrypt(
+        contrasena.encode("utf-8"),
+        salt=sal,
+        n=n,
+        r=r,
+        p=p,
+        maxmem=_maxmem(n, r, p),
+        dklen=LARGO_HASH,
+    )
+
+
+def calibrar():
+    """
+    Elige el mayor N (potencia de 2) cuyo tiempo medido, con el margen de p99,
+    entra en PASSWORD_HASH_BUDGET_MS y cuya memoria entra en la fracción
+    permitida de AWS_LAMBDA_FUNCTION_MEMORY_SIZE. Se calcula una vez por
+    contenedor; PASSWORD_SCRYPT_N fija el valor sin medir.
+    """
+    if _parametros_calibrados:
+        return dict(_parametros_calibrados)
+
+    n_fijo = os.getenv("PASSWORD_SCRYPT_N")
+    if n_fijo:
+        n = max(SCRYPT_N_MIN, int(n_fijo))
+    else:
+        memoria_mb = int(os.getenv("AWS_LAMBDA_FUNCTION_MEMORY_SIZE", "512"))
+        memoria_max = memoria_mb * 1024 * 1024 * FRACCION_MEMORIA
+
+        n = SCRYPT_N_MIN
+        sal = os.urandom(LARGO_SAL)
+        while n < SCRYPT_N_MAX:
+            siguiente = n * 2
+            if _memoria_scrypt(siguiente, SCRYPT_R) > memoria_max:
+                break
+            inicio = time.perf_counter()
+            _scrypt("calibracion", sal, n, SCRYPT_R, SCRYPT_P)
+            duracion_ms = (time.perf_counter() - inicio) * 1000
+            # El costo de scrypt es lineal en N: el siguiente tarda ~el doble.
+            if duracion_ms * 2 * MARGEN_P99 > PASSWORD_HASH_BUDGET_MS:
+                break
+            n = siguiente
+
+    _parametros_calibrados.update({"n": n, "r": SCRYPT_R, "p": SCRYPT_P})
+    print(f"Parámetros scrypt calibrados: {_parametros_calibrados}")
+    return dict(_parametros_calibrados)
+
+
+def _b64(datos):
+    return base64.b64encode(datos).decode("ascii")
+
+
+def hashear(contrasena):
+    parametros = calibrar()
+    sal = os.urandom(LARGO_SAL)
+    derivada = _scrypt(contrasena, sal, parametros["n"], parametros["r"], parametros["p"])
+    return (
+        f"{PREFIJO}$n={parametros['n']},r={parametros['r']},p={parametros['p']}"
+        f"${_b64(sal)}${_b64(derivada)}"
+    )
+
+
+def _parsear(almacenado):
+    """Devuelve (parametros, sal, hash) o None si no es un hash scrypt."""
+    if not isinstance(almacenado, str) or not almacenado.startswith(PREFIJO + "$"):
+        return None
+    try:
+        _, params, sal, derivada = almacenado.split("$")
+        parametros = {k: int(v) for k, v in (x.split("=") for x in params.split(","))}
+        return parametros, base64.b64decode(sal), base64.b64decode(derivada)
+    except (ValueError, KeyError):
+        return None
+
+
+def verificar(contrasena, almacenado):
+    if not contrasena or not almacenado:
+        return False
+
+    partes = _parsear(almacenado)
+    if partes is None:
+        # Contraseña antigua en texto plano
+        return hmac.compare_digest(str(almacenado).encode("utf-8"), contrasena.encode("utf-8"))
+
+    parametros, sal, derivada = partes
+    calculada = _scrypt(contrasena, sal, parametros["n"], parametros["r"], parametros["p"])
+    return hmac.compare_digest(calculada, derivada)
+
+
+def necesita_rehash(almacenado):
+    """True si es texto plano o si sus parámetros son menores que los calibrados."""
+    partes = _parsear(almacenado)
+    if partes is None:
+        return True
+    parametros = partes[0]
+    objetivo = calibrar()
+    return (
+        parametros.get("n", 0) < objetivo["n"]
+        or parametros.get("r") != objetivo["r"]
+        or parametros.get("p") != objetivo["p"]
+    )
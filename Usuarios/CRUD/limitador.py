@@ -0,0 +1,144 @@
+import os
+import math
+import time
+import threading
+
+import boto3
+from botocore.exceptions import ClientError
+
+TABLE_RATE_LIMIT = os.getenv("TABLE_RATE_LIMIT", "TABLE_RATE_LIMIT")
+
+# Cubetas por clave: 'rafaga' intentos seguidos y luego 'por_minuto' de recarga.
+LIMITES = {
+    "correo": {
+        "rafaga": int(os.getenv("LOGIN_RAFAGA_CORREO", "5")),
+        "por_minuto": float(os.getenv("LOGIN_POR_MINUTO_CORREO", "5")),
+    },
+    "ip": {
+        "rafaga": int(os.getenv("LOGIN_RAFAGA_IP", "20")),
+        "por_minuto": float(os.getenv("LOGIN_POR_MINUTO_IP", "20")),
+    },
+}
+
+BLOQUEOS_MAX = 10000
+
+dynamodb = boto3.resource("dynamodb")
+limites_table = dynamodb.Table(TABLE_RATE_LIMIT)
+
+# Claves bloqueadas recientemente en este contenedor: clave -> bloqueado_hasta (ms)
+_bloqueados = {}
+_lock = threading.Lock()
+
+
+def _ahora_ms():
+    return int(time.time() * 1000)
+
+
+def _bloqueo_local(clave, ahora):
+    with _lock:
+        hasta = _bloqueados.get(clave)
+        if hasta is None:
+            return 0
+        if hasta <= ahora:
+            del _bloqueados[clave]
+            return 0
+        return hasta - ahora
+
+
+def _recordar_bloqueo(clave, hasta):
+    with _lock:
+        if len(_bloqueados) >= BLOQUEOS_MAX:
+            ahora = _ahora_ms()
+            for k in [k for k, v in _bloqueados.items() if v <= ahora]:
+                del _bloqueados[k]
+            if len(_bloqueados) >= BLOQUEOS_MAX:
+                _bloqueados.clear()
+        _bloqueados[clave] = hasta
+
+
+def _consumir(clave, rafaga, por_minuto):
+    """
+    Cubeta de tokens en forma GCRA: cada clave guarda 'tat' (ms), el instante
+    en que la cubeta vuelve a estar llena. Se consume con UpdateItem
+    condicionales, sin leer antes:
+      1) tat en [ahora, ahora + (rafaga - 1) * intervalo] -> tat += intervalo
+      2) tat ausente o en el pasado (cubeta llena)       -> tat = ahora + intervalo
+    Si ambas fallan, la cubeta está vacía.
+
+    Returns:
+        int: 0 si se permite, o milisegundos hasta el próximo intento permitido.
+    """
+    intervalo = int(60000 / por_minuto)
+    ahora = _ahora_ms()
+    limite = ahora + (rafaga - 1) * intervalo
+    ttl = math.ceil((limite + intervalo) / 1000) + 60
+
+    try:
+        limites_table.update_item(
+            Key={"clave": clave},
+            UpdateExpression="SET tat = tat + :intervalo, #ttl = :ttl",
+            ConditionExpression="tat BETWEEN :ahora AND :limite",
+            ExpressionAttributeNames={"#ttl": "ttl"},
+            ExpressionAttributeValues={
+                ":intervalo": intervalo,
+                ":ahora": ahora,
+                ":limite": limite,
+                ":ttl": ttl,
+            },
+        )
+        return 0
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            raise
+
+    try:
+        limites_table.update_item(
+            Key={"clave": clave},
+            UpdateExpression="SET tat = :nuevo, #ttl = :ttl",
+            ConditionExpression="attribute_not_exists(tat) OR tat < :ahora",
+            ExpressionAttributeNames={"#ttl": "ttl"},
+            ExpressionAttributeValues={
+                ":nuevo": ahora + intervalo,
+                ":ahora": ahora,
+                ":ttl": ttl,
+            },
+            ReturnValuesOnConditionCheckFailure="ALL_OLD",
+        )
+        return 0
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            raise
+        tat = int(e.response.get("Item", {}).get("tat", {}).get("N", limite + intervalo))
+
+    # Próximo token disponible cuando tat vuelva a entrar en el límite.
+    return max(1, tat - limite)
+
+
+def verificar(**claves):
+    """
+    Consume un intento para cada clave (p. ej. correo=..., ip=...).
+    Primero revisa los bloqueos en memoria para no tocar DynamoDB.
+
+    Returns:
+        int: 0 si se permite, o segundos a esperar (para Retry-After).
+    """
+    ahora = _ahora_ms()
+    pendientes = [
+        (tipo, f"{tipo}#{str(valor).strip().lower()}")
+        for tipo, valor in claves.items() if valor
+    ]
+
+    for _, clave in pendientes:
+        espera = _bloqueo_local(clave, ahora)
+        if espera:
+            return math.ceil(espera / 1000)
+
+    for tipo, clave in pendientes:
+        limites = LIMITES[tipo]
+        espera = _consumir(clave, limites["rafaga"], limites["por_minuto"])
+        if espera:
+            _recordar_bloqueo(clave, ahora + espera)
+            print(f"[RATE_LIMIT] {clave} bloqueado por {espera} ms")
+            return math.ceil(espera / 1000)
+
+    return 0
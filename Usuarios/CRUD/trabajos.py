@@ -0,0 +1,165 @@
+import os
+import json
+import time
+import uuid
+from datetime import datetime, timezone
+
+import boto3
+from botocore.exceptions import ClientError
+
+TABLE_TRABAJOS = os.getenv("TABLE_TRABAJOS", "TABLE_TRABAJOS")
+
+# Trabajos en segundo plano (propagación de cambios de correo, etc.).
+# Un trabajo se crea en la misma transacción que el cambio que lo origina;
+# el stream de la tabla lo entrega a ProcesarTrabajo y un barrido programado
+# retoma los que quedaron a medias.
+ESTADO_PENDIENTE = "pendiente"
+ESTADO_EN_PROGRESO = "en_progreso"
+ESTADO_COMPLETADO = "completado"
+ESTADO_ERROR = "error"
+
+MAX_INTENTOS = int(os.getenv("TRABAJOS_MAX_INTENTOS", "5"))
+TRABAJOS_RETENCION_DIAS = int(os.getenv("TRABAJOS_RETENCION_DIAS", "7"))
+
+dynamodb = boto3.resource("dynamodb")
+trabajos_table = dynamodb.Table(TABLE_TRABAJOS)
+
+
+def _ahora_iso():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def nuevo(tipo, **datos):
+    """Item de un trabajo pendiente. 'datos' son los parámetros propios del tipo."""
+    ahora = _ahora_iso()
+    return {
+        "trabajo_id": str(uuid.uuid4()),
+        "tipo": tipo,
+        "estado": ESTADO_PENDIENTE,
+        "paso": None,
+        "cursor": None,
+        "procesados": 0,
+        "omitidos": 0,
+        "intentos": 0,
+        "bloqueado_hasta": 0,
+        "creado_en": ahora,
+        "actualizado_en": ahora,
+        "ttl": int(time.time()) + TRABAJOS_RETENCION_DIAS * 86400,
+        **datos,
+    }
+
+
+def put_transaccional(trabajo):
+    """Operación 'Put' para incluir el trabajo dentro de un TransactWriteItems."""
+    return {
+        "Put": {
+            "TableName": TABLE_TRABAJOS,
+            "Item": trabajo,
+            "ConditionExpression": "attribute_not_exists(trabajo_id)",
+        }
+    }
+
+
+def reclamar(trabajo_id, segundos):
+    """
+    Toma el trabajo por 'segundos' si no está completado ni tomado por otra
+    ejecución (stream y barrido pueden coincidir). Devuelve el item o None.
+    """
+    ahora = int(time.time())
+    try:
+        resp = trabajos_table.update_item(
+            Key={"trabajo_id": trabajo_id},
+            UpdateExpression=(
+                "SET estado = :en_progreso, bloqueado_hasta = :hasta, "
+                "actualizado_en = :ts ADD intentos :uno"
+            ),
+            ConditionExpression=(
+                "attribute_exists(trabajo_id) AND estado IN (:pendiente, :en_progreso) "
+                "AND bloqueado_hasta < :ahora"
+            ),
+            ExpressionAttributeValues={
+                ":en_progreso": ESTADO_EN_PROGRESO,
+                ":pendiente": ESTADO_PENDIENTE,
+                ":hasta": ahora + segundos,
+                ":ahora": ahora,
+                ":ts": _ahora_iso(),
+                ":uno": 1,
+            },
+            ReturnValues="ALL_NEW",
+        )
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") == "ConditionalCheckFailedException":
+            return None
+        raise
+
+    trabajo = resp["Attributes"]
+    if trabajo.get("cursor"):
+        trabajo["cursor"] = json.loads(trabajo["cursor"])
+    return trabajo
+
+
+def registrar_progreso(trabajo_id, paso, cursor, procesados=0, omitidos=0):
+    """Guarda el paso y la posición alcanzada para poder retomar desde ahí."""
+    trabajos_table.update_item(
+        Key={"trabajo_id": trabajo_id},
+        UpdateExpression=(
+            "SET paso = :paso, #cursor = :cursor, actualizado_en = :ts "
+            "ADD procesados :procesados, omitidos :omitidos"
+        ),
+        ExpressionAttributeNames={"#cursor": "cursor"},
+        ExpressionAttributeValues={
+            ":paso": paso,
+            ":cursor": json.dumps(cursor) if cursor else None,
+            ":ts": _ahora_iso(),
+            ":procesados": procesados,
+            ":omitidos": omitidos,
+        },
+    )
+
+
+def finalizar(trabajo_id, estado, error=None, reiniciar_intentos=False):
+    """
+    Marca el trabajo como completado/error o lo libera (pendiente) para otro
+    intento. 'reiniciar_intentos' se usa cuando solo se agotó el tiempo.
+    """
+    valores = {
+        ":estado": estado,
+        ":ts": _ahora_iso(),
+        ":cero": 0,
+    }
+    expresion = "SET estado = :estado, actualizado_en = :ts, bloqueado_hasta = :cero"
+    if error:
+        expresion += ", ultimo_error = :error"
+        valores[":error"] = str(error)[:500]
+    if reiniciar_intentos:
+        expresion += ", intentos = :cero"
+    trabajos_table.update_item(
+        Key={"trabajo_id": trabajo_id},
+        UpdateExpression=expresion,
+        ExpressionAttributeValues=valores,
+    )
+
+
+def pendientes():
+    """
+    Ids de trabajos sin terminar cuyo bloqueo expiró. La tabla es pequeña
+    (los terminados expiran por TTL), así que basta un Scan filtrado.
+    """
+    ahora = int(time.time())
+    scan_kwargs = {
+        "FilterExpression": "estado IN (:pendiente, :en_progreso) AND bloqueado_hasta < :ahora",
+        "ExpressionAttributeValues": {
+            ":pendiente": ESTADO_PENDIENTE,
+            ":en_progreso": ESTADO_EN_PROGRESO,
+            ":ahora": ahora,
+        },
+        "ProjectionExpression": "trabajo_id",
+    }
+    ids = []
+    while True:
+        resp = trabajos_table.scan(**scan_kwargs)
+        ids.extend(item["trabajo_id"] for item in resp.get("Items", []))
+        lek = resp.get("LastEvaluatedKey")
+        if not lek:
+            return ids
+        scan_kwargs["ExclusiveStartKey"] = lek
@@ -1,77 +1,16 @@
-import jwt
-import os
-from datetime import datetime, timedelta
-
-JWT_SECRET = os.getenv("JWT_SECRET", "qwertyuiopmnbvcxz12345lkjh09876gfd4567sa1234")
-JWT_ALGORITHM = "HS256"
-JWT_EXPIRATION_HOURS = int(os.getenv("JWT_EXPIRATION_HOURS", "24"))
-
-ALLOWED_ROLES = {"estudiante", "personal_administrativo", "autoridad"}
-
-
-def generar_token(correo, role, nombre):
-    """
-    Genera un JWT como Spring Boot
-    """
-    if role not in ALLOWED_ROLES:
-        raise ValueError("Rol inválido para token")
-    
-    payload = {
-        "correo": correo,
-        "rol": role,
-        "nombre": nombre,
-        "iat": datetime.utcnow(),
-        "exp": datetime.utcnow() + timedelta(hours=JWT_EXPIRATION_HOURS)
-    }
-    
-    token = jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
-    return token
-
-
-def validar_token(token):
-    """
-    Valida un JWT y retorna información del usuario
-    
-    Returns:
-        dict: {
-            "valido": bool,
-            "correo": str,
-            "role": str,
-            "nombre": str,
-            "error": str (opcional)
-        }
-    """
-    if not token:
-        return {"valido": False, "error": "Token es obligatorio"}
-
-    try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        rol = payload.get("rol", payload.get("role"))
-        if rol not in ALLOWED_ROLES:
-            return {"valido": False, "error": "Rol inválido en token"}
-        
-        return {
-            "valido": True,
-            "correo": payload.get("correo"),
-            "rol": rol,
-            "nombre": payload.get("nombre", "")
-        }
-    except jwt.ExpiredSignatureError:
-        return {"valido": False, "error": "Token expirado"}
-    except jwt.InvalidTokenError:
-        return {"valido": False, "error": "Token inválido"}
+from comun.autenticacion import ALLOWED_ROLES, generar_token, validar_token
 
 
 def verificar_rol(usuario_autenticado, roles_permitidos):
     """
     Verifica si el usuario tiene uno de los roles permitidos
-    
+
     Args:
         usuario_autenticado: dict con 'role' del token
         roles_permitidos: list de roles permitidos, ej: ["Admin", "Gerente"]
-    
+
     Returns:
         bool: True si tiene permiso
     """
     role_usuario = usuario_autenticado.get("rol")
-    return role_usuario in roles_permitidos
\ No newline at end of file
+    return role_usuario in roles_permitidos
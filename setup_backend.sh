@@ -57,6 +57,10 @@ prepare_dependencies() {
     echo -e "${YELLOW}📥 Instalando dependencias Python (forzado)...${NC}"
     pip3 install -r ../requirements.txt -t python/ --upgrade --quiet
     echo -e "${GREEN}✅ Dependencias instaladas en python-dependencies/python/${NC}"
+
+    # Módulos compartidos entre microservicios (import comun.*)
+    cp -r ../comun python/comun
+    echo -e "${GREEN}✅ Módulos compartidos copiados en python-dependencies/python/comun${NC}"
     
     cd ../..
 }
@@ -121,6 +125,31 @@ upload_airflow_dag() {
   echo -e "${GREEN}✅ DAG actualizado${NC}"
 }
 
+# Exporta los ARN de los streams de DynamoDB que usan los consumidores
+stream_arn() {
+    local arn
+    arn=$(aws dynamodb describe-table --table-name "$1" --query 'Table.LatestStreamArn' --output text)
+    if [ -z "${arn}" ] || [ "${arn}" = "None" ]; then
+        echo -e "${RED}❌ La tabla $1 no tiene stream habilitado (ejecute la opción 3)${NC}" >&2
+        return 1
+    fi
+    echo "${arn}"
+}
+
+export_stream_arns() {
+    TABLE_LOGS_STREAM_ARN=$(stream_arn "${TABLE_LOGS}") || return 1
+    export TABLE_LOGS_STREAM_ARN
+    echo -e "${GREEN}✅ Stream de logs: ${TABLE_LOGS_STREAM_ARN}${NC}"
+
+    TABLE_TRABAJOS_STREAM_ARN=$(stream_arn "${TABLE_TRABAJOS}") || return 1
+    export TABLE_TRABAJOS_STREAM_ARN
+    echo -e "${GREEN}✅ Stream de trabajos: ${TABLE_TRABAJOS_STREAM_ARN}${NC}"
+
+    TABLE_INCIDENTES_STREAM_ARN=$(stream_arn "${TABLE_INCIDENTES}") || return 1
+    export TABLE_INCIDENTES_STREAM_ARN
+    echo -e "${GREEN}✅ Stream de incidentes: ${TABLE_INCIDENTES_STREAM_ARN}${NC}"
+}
+
 # Función para crear infraestructura
 deploy_infrastructure() {
     echo -e "\n${BLUE}🏗️  Creando recursos de infraestructura (Tablas DynamoDB y Bucket S3)...${NC}"
@@ -142,6 +171,7 @@ deploy_services() {
     ensure_analitica_bucket
     ensure_incidentes_bucket
     upload_airflow_dag
+    export_stream_arns
     sls deploy
     echo -e "${GREEN}✅ Microservicios desplegados${NC}"
 }
@@ -164,6 +194,15 @@ remove_infrastructure() {
     aws dynamodb delete-table --table-name ${TABLE_EMPLEADOS} 2>/dev/null || echo "Tabla ${TABLE_EMPLEADOS} no existe"
     aws dynamodb delete-table --table-name ${TABLE_LOGS} 2>/dev/null || echo "Tabla ${TABLE_LOGS} no existe"
     aws dynamodb delete-table --table-name ${TABLE_CONEXIONES} 2>/dev/null || echo "Tabla ${TABLE_CONEXIONES} no existe"
+    aws dynamodb delete-table --table-name ${TABLE_METRICAS_LOGS} 2>/dev/null || echo "Tabla ${TABLE_METRICAS_LOGS} no existe"
+    aws dynamodb delete-table --table-name ${TABLE_RATE_LIMIT} 2>/dev/null || echo "Tabla ${TABLE_RATE_LIMIT} no existe"
+    aws dynamodb delete-table --table-name ${TABLE_REVOCACIONES} 2>/dev/null || echo "Tabla ${TABLE_REVOCACIONES} no existe"
+    aws dynamodb delete-table --table-name ${TABLE_BUSQUEDA} 2>/dev/null || echo "Tabla ${TABLE_BUSQUEDA} no existe"
+    aws dynamodb delete-table --table-name ${TABLE_TRABAJOS} 2>/dev/null || echo "Tabla ${TABLE_TRABAJOS} no existe"
+    aws dynamodb delete-table --table-name ${TABLE_CONTADORES} 2>/dev/null || echo "Tabla ${TABLE_CONTADORES} no existe"
+    aws dynamodb delete-table --table-name ${TABLE_SUSCRIPCIONES} 2>/dev/null || echo "Tabla ${TABLE_SUSCRIPCIONES} no existe"
+    aws dynamodb delete-table --table-name ${TABLE_COALESCENCIA} 2>/dev/null || echo "Tabla ${TABLE_COALESCENCIA} no existe"
+    aws dynamodb delete-table --table-name ${TABLE_BANDEJA} 2>/dev/null || echo "Tabla ${TABLE_BANDEJA} no existe"
     
     # Eliminar bucket S3 de datos
     echo -e "${YELLOW}Eliminando bucket S3 de datos...${NC}"